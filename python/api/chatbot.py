@@ -1,9 +1,35 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from openai import OpenAI
+from openai import AsyncOpenAI, RateLimitError
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional
+import asyncio
 import json
-from search.search_charities import search_charities
+import random
+import re
+import uuid
+import numpy as np
+from search.batcher import SearchJob
+from search.metadata_store import loads
+from search.query_cache import QueryEmbeddingCache, normalize_query
+from search.search_charities import (
+    cached_search,
+    encode_queries,
+    is_relevant,
+    relevance_calibrated,
+)
+from search.telemetry import log_event, record_tokens, span
+from api.dependencies import require_search_ready
+from api.completion_cache import SemanticCompletionCache, context_key
+from api.history import (
+    HistoryBudgetExceeded,
+    HistoryManager,
+    TokenCounter,
+    TokenUsage,
+    summary_prompt,
+)
 from dotenv import load_dotenv
 import os
 
@@ -21,20 +47,52 @@ chatbot_app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Initialize OpenAI client; async so completions never block the event loop
+client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+CHAT_MODEL = "gpt-4o-mini"
+
+# Completions are reused for near-identical messages in the same conversation context
+completion_cache = SemanticCompletionCache(
+    max_entries=int(os.getenv("CHAT_CACHE_SIZE", "2048")),
+    ttl_seconds=float(os.getenv("CHAT_CACHE_TTL", "3600")),
+    threshold=float(os.getenv("CHAT_CACHE_THRESHOLD", "0.95")),
+)
+# Chat messages get their own embedding LRU so they don't push out search queries
+chat_embedding_cache = QueryEmbeddingCache(
+    max_size=int(os.getenv("CHAT_EMBEDDING_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("CHAT_CACHE_TTL", "3600")),
+)
+# Most recent history messages that must match exactly for a cache hit
+CACHE_HISTORY_TURNS = int(os.getenv("CHAT_CACHE_HISTORY_TURNS", "2"))
+# Answer pure DermaNow questions without asking the model which tool to call
+INFO_FAST_PATH = os.getenv("CHAT_INFO_FAST_PATH", "1") == "1"
+
+# Token budget for one /chat prompt; older history is summarized to stay under it
+CHAT_TOKEN_BUDGET = int(os.getenv("CHAT_TOKEN_BUDGET", "6000"))
+# Part of the budget held back for tool results and the reply
+CHAT_RESERVE_TOKENS = int(os.getenv("CHAT_RESERVE_TOKENS", "1500"))
+# Most recent history messages sent verbatim
+HISTORY_WINDOW_TURNS = int(os.getenv("CHAT_HISTORY_TURNS", "6"))
+HISTORY_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "300"))
+
+NO_RESULTS_MESSAGE = "I couldn’t find any projects right now. Could you try terms like 'education' or 'water'?"
+FALLBACK_MESSAGE = "Could you clarify what you’re looking for?"
 
 
 # Pydantic models
 class ChatRequest(BaseModel):
     message: str
     history: list[dict] | None = None
+    # Scopes cached completions to one conversation; requests without it share a scope
+    session_id: str | None = None
 
 
 class ChatResponse(BaseModel):
     message: str
     donation_intent: bool
     charities: list | None = None
+    usage: dict | None = None
 
 
 class DescriptionRequest(BaseModel):
@@ -80,15 +138,12 @@ fetch_dermanow_info_function = {
     },
 }
 
+CHAT_TOOLS = [
+    {"type": "function", "function": search_charities_function},
+    {"type": "function", "function": fetch_dermanow_info_function},
+]
 
-@chatbot_app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
-    try:
-        # Prepare messages with updated system prompt
-        messages = [
-            {
-                "role": "system",
-                "content": f"""
+SYSTEM_PROMPT = """
 You are DermaBot, helping users learn about and donate to Shariah-compliant charity projects on DermaNow. Follow these guidelines:
 
 1. **Scope**:
@@ -113,12 +168,12 @@ You are DermaBot, helping users learn about and donate to Shariah-compliant char
      - Amount needed (MYR).
    - Exclude: image links, raw descriptions, or technical fields.
    - End with a question, e.g., "Would you like to support this project?"
-   - If the top result returned by search_charities isn't relevant to the user's query, acknowledge and present it as a suggestion.
+   - If the top result returned by search_charities has "relevant" set to false, or has no "relevant" field and isn't relevant to the user's query, acknowledge that it isn't a close match and present it as a suggestion.
 
 4. **Refined Donation Queries**:
    - If the user refines (e.g., "No, I want something for education"), call search_charities with the new query (e.g., "education").
    - Acknowledge naturally, then present the new top charity as above.
-   - If the top result is still not relevant, acknowledge and suggest the top result as an alternative.
+   - If the top result still has "relevant" set to false, or has no "relevant" field and still isn't relevant, acknowledge and suggest the top result as an alternative.
 
 5. **Tone**:
    - Be friendly, empathetic, and professional.
@@ -128,135 +183,25 @@ You are DermaBot, helping users learn about and donate to Shariah-compliant char
 6. **Error Handling**:
    - If donation intent is detected but no specific cause is mentioned, use a default query like 'education/medical/food' for search_charities to give some suggestions.
    - Always prioritize trust and integrity; avoid speculation.
-""",
-            }
-        ]
-
-        # Sanitize history
-        if request.history:
-            sanitized_history = [
-                msg
-                for msg in request.history
-                if msg.get("role") in ["user", "assistant"] and msg.get("content")
-            ]
-            messages.extend(sanitized_history)
-
-        # Add user message
-        messages.append({"role": "user", "content": request.message})
-
-        # Initial completion request
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            tools=[
-                {"type": "function", "function": search_charities_function},
-                {"type": "function", "function": fetch_dermanow_info_function},
-            ],
-            tool_choice="auto",
-        )
-
-        message = response.choices[0].message
-        donation_intent = False
-        charities = None
-
-        # Handle function calls
-        if message.tool_calls:
-            messages.append(
-                {
-                    "role": "assistant",
-                    "content": message.content,
-                    "tool_calls": [
-                        {
-                            "id": tool_call.id,
-                            "type": "function",
-                            "function": {
-                                "name": tool_call.function.name,
-                                "arguments": tool_call.function.arguments,
-                            },
-                        }
-                        for tool_call in message.tool_calls
-                    ],
-                }
-            )
-
-            for tool_call in message.tool_calls:
-                if tool_call.function.name == "search_charities":
-                    donation_intent = True
-                    args = json.loads(tool_call.function.arguments)
-                    query = args.get("query")
-
-                    # Fallback for empty query
-                    if not query or query.strip() == "":
-                        query = "charity"
-                        args["query"] = query
-                        messages[-1]["tool_calls"][0]["function"]["arguments"] = (
-                            json.dumps(args)
-                        )
-
-                    # Log the query for debugging
-                    print(f"Calling search_charities with query: {query}")
-
-                    # Call search_charities
-                    charities = search_charities(query)
-
-                    # Filter out completed projects and limit to top result
-                    if charities:
-                        filtered_charities = [
-                            charity
-                            for charity in charities
-                            if not charity.get("funding_complete", False)
-                        ]
-                        charities = filtered_charities[:1]
-
-                    # Append tool result
-                    messages.append(
-                        {
-                            "role": "tool",
-                            "content": json.dumps(charities),
-                            "tool_call_id": tool_call.id,
-                        }
-                    )
+"""
 
-                    # If no results or low relevance, try a general search
-                    if not charities or len(charities) == 0:
-                        general_charities = search_charities("charity")
-                        if general_charities:
-                            filtered_general = [
-                                charity
-                                for charity in general_charities
-                                if not charity.get("funding_complete", False)
-                            ]
-                            charities = filtered_general[:1]
-                            messages[-1] = {
-                                "role": "tool",
-                                "content": json.dumps(charities),
-                                "tool_call_id": tool_call.id,
-                            }
-                        else:
-                            donation_intent = False
-                            charities = None
-
-                elif tool_call.function.name == "fetch_dermanow_info":
-                    args = json.loads(tool_call.function.arguments)
-                    query = args.get("query", request.message)
-
-                    # Static DermaNow info based on the provided document
-                    dermanow_info = {
-                        "overview": """
+# Static DermaNow info based on the provided document
+DERMANOW_INFO = {
+    "overview": """
 DermaNow is Malaysia’s first Shariah-compliant, blockchain-powered charity platform, designed to make donations transparent, efficient, and aligned with Islamic financial ethics. It bridges the trust gap in charitable giving by using Ethereum blockchain to ensure donors can track how, where, and when their funds are used.
 """,
-                        "mission_vision": """
+    "mission_vision": """
 **Mission**: Create a Shariah-compliant ecosystem supporting Zakat, Sadaqah, Waqf, and Mudarabah, ensuring ethical and transparent fund use.
 **Vision**: Revolutionize charity by addressing transparency issues, high intermediary costs, and limited donor engagement.
 """,
-                        "blockchain_usage": """
+    "blockchain_usage": """
 DermaNow uses Ethereum blockchain for:
 - **Transparency**: All transactions are recorded on-chain, verifiable via Etherscan.
 - **Milestone-Based Funding**: Funds are released only after verified milestones, reducing misuse.
 - **Direct Payments**: Donations go directly to verified service providers (e.g., caterers, construction teams).
 - **Security**: Smart contracts manage donations and staking, ensuring tamper-proof operations.
 """,
-                        "shariah_compliance": """
+    "shariah_compliance": """
 DermaNow ensures compliance with Islamic principles:
 - **Ethical Guidelines**: Projects are vetted by Islamic authorities and an AI-powered compliance checker.
 - **Halal Investments**: Staking uses Mudarabah-based profit-sharing, investing in ethical platforms like Firoza Finance and HAQQ Blockchain.
@@ -264,7 +209,7 @@ DermaNow ensures compliance with Islamic principles:
 - **Amanah (Trust)**: 100% of donations go to projects with no deductions.
 - **Periodic Reviews**: Shariah advisors regularly review the framework.
 """,
-                        "functionalities": """
+    "functionalities": """
 Key features include:
 - **Donations**: Browse verified projects, donate to milestones via local payments (e.g., Touch ‘n Go, converted to ETH), and generate tax relief receipts.
 - **Staking**: Stake ETH in a halal pool for 2-5% annual rewards, with at least 20% donated to charity.
@@ -272,82 +217,616 @@ Key features include:
 - **DermaBot**: AI chatbot guides users, suggests projects, and facilitates donations.
 - **Transparency**: On-chain milestone tracking and DAO committee voting ensure accountability.
 """,
-                        "technical_architecture": """
+    "technical_architecture": """
 - **Frontend**: Next.js, TailwindCSS, Shadcn/UI.
 - **Backend**: Supabase (PostgreSQL), Python for AI/ML.
 - **Blockchain**: Solidity smart contracts on Ethereum (Sepolia testnet for development).
 - **AI**: OpenAI for DermaBot, Hugging Face for ML models.
 - **Infrastructure**: Cloudflare, Infura, Docker.
 """,
-                    }
+}
 
-                    # Tailor response based on query focus (if specific)
-                    response_content = dermanow_info["overview"]
-                    if "mission" in query.lower() or "vision" in query.lower():
-                        response_content += dermanow_info["mission_vision"]
-                    elif "blockchain" in query.lower():
-                        response_content += dermanow_info["blockchain_usage"]
-                    elif "shariah" in query.lower() or "islamic" in query.lower():
-                        response_content += dermanow_info["shariah_compliance"]
-                    elif (
-                        "function" in query.lower()
-                        or "feature" in query.lower()
-                        or "work" in query.lower()
-                    ):
-                        response_content += dermanow_info["functionalities"]
-                    elif "tech" in query.lower() or "architecture" in query.lower():
-                        response_content += dermanow_info["technical_architecture"]
-                    else:
-                        # General query, include a bit of everything
-                        response_content += (
-                            dermanow_info["mission_vision"]
-                            + dermanow_info["blockchain_usage"]
-                            + dermanow_info["shariah_compliance"]
-                            + dermanow_info["functionalities"]
-                        )
-
-                    # Append tool result
-                    messages.append(
-                        {
-                            "role": "tool",
-                            "content": json.dumps({"info": response_content}),
-                            "tool_call_id": tool_call.id,
-                        }
-                    )
+def fetch_dermanow_info(query: str) -> str:
+    """Pick the DermaNow info sections relevant to ``query``."""
+    query = query.lower()
+
+    # Tailor response based on query focus (if specific)
+    response_content = DERMANOW_INFO["overview"]
+    if "mission" in query or "vision" in query:
+        response_content += DERMANOW_INFO["mission_vision"]
+    elif "blockchain" in query:
+        response_content += DERMANOW_INFO["blockchain_usage"]
+    elif "shariah" in query or "islamic" in query:
+        response_content += DERMANOW_INFO["shariah_compliance"]
+    elif "function" in query or "feature" in query or "work" in query:
+        response_content += DERMANOW_INFO["functionalities"]
+    elif "tech" in query or "architecture" in query:
+        response_content += DERMANOW_INFO["technical_architecture"]
+    else:
+        # General query, include a bit of everything
+        response_content += (
+            DERMANOW_INFO["mission_vision"]
+            + DERMANOW_INFO["blockchain_usage"]
+            + DERMANOW_INFO["shariah_compliance"]
+            + DERMANOW_INFO["functionalities"]
+        )
+    return response_content
+
+
+# Words that mark a question about the platform itself, and ones that mean the
+# user may want a project instead; only the first kind takes the fast path.
+# Matched as whole words, so "admission" isn't "mission" and "helpful" isn't "help"
+DERMANOW_INFO_TERMS = frozenset(
+    {
+        "dermanow",
+        "blockchain",
+        "shariah",
+        "syariah",
+        "islamic",
+        "mission",
+        "vision",
+        "staking",
+        "architecture",
+    }
+)
+# Multi-word terms, matched as consecutive words
+DERMANOW_INFO_PHRASES = ("smart contract", "smart contracts")
+DONATION_TERMS = frozenset(
+    {
+        "donate",
+        "donating",
+        "donation",
+        "donations",
+        "support",
+        "supporting",
+        "contribute",
+        "contributing",
+        "contribution",
+        "give",
+        "giving",
+        "help",
+        "helping",
+        "fund",
+        "funds",
+        "funding",
+        "project",
+        "projects",
+        "charity",
+        "charities",
+        "charitable",
+        "sponsor",
+        "sponsoring",
+    }
+)
 
-            # Second completion with tool results
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                tools=[
-                    {"type": "function", "function": search_charities_function},
-                    {"type": "function", "function": fetch_dermanow_info_function},
-                ],
-                tool_choice="auto",
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+def is_dermanow_info_question(message: str) -> bool:
+    """Whether ``message`` only asks about DermaNow itself, with no donation intent."""
+    words = _WORD_RE.findall(message.lower())
+    # Padded so phrases only match on word boundaries
+    text = f" {' '.join(words)} "
+    asks_about_platform = not DERMANOW_INFO_TERMS.isdisjoint(words) or any(
+        f" {phrase} " in text for phrase in DERMANOW_INFO_PHRASES
+    )
+    return asks_about_platform and DONATION_TERMS.isdisjoint(words)
+
+
+async def summarize_history(
+    previous: Optional[str], messages: List[Dict], usage: Optional[TokenUsage]
+) -> str:
+    """Fold messages that left the history window into the running summary."""
+    system, user = summary_prompt(previous, messages)
+    with span("chat.summarize"):
+        response = await client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": user},
+            ],
+            max_tokens=HISTORY_SUMMARY_TOKENS,
+            temperature=0,
+        )
+    if usage is not None:
+        usage.add(response.usage)
+    return response.choices[0].message.content or ""
+
+
+token_counter = TokenCounter(CHAT_MODEL)
+history_manager = HistoryManager(
+    token_counter,
+    summarize_history,
+    budget_tokens=CHAT_TOKEN_BUDGET,
+    window_turns=HISTORY_WINDOW_TURNS,
+    reserve_tokens=CHAT_RESERVE_TOKENS,
+    summary_tokens=HISTORY_SUMMARY_TOKENS,
+    # Tool schemas are sent with every completion but aren't a message
+    reserve_text=json.dumps(CHAT_TOOLS),
+)
+
+
+async def build_chat_messages(request: ChatRequest, usage: TokenUsage) -> List[Dict]:
+    """
+    System prompt, compacted history and the new user message.
+
+    Raises:
+        HistoryBudgetExceeded: If the message alone doesn't fit the token budget.
+    """
+    system = [{"role": "system", "content": SYSTEM_PROMPT}]
+    message = {"role": "user", "content": request.message}
+
+    # Sanitize history
+    history = [
+        {"role": msg["role"], "content": msg["content"]}
+        for msg in request.history or []
+        if msg.get("role") in ["user", "assistant"] and msg.get("content")
+    ]
+
+    compacted = await history_manager.compact(history, system, message, usage)
+    usage.history = compacted.report()
+    return (
+        system
+        + history_manager.summary_messages(compacted)
+        + compacted.recent
+        + [message]
+    )
+
+
+@dataclass
+class ToolOutcome:
+    """Result of running one tool call requested by the model."""
+
+    tool_call: Dict
+    content: str
+    donation_intent: bool = False
+    charities: Optional[list] = None
+
+
+async def search_charities_tool(query: str) -> Optional[list]:
+    """
+    Top project still raising funds for ``query``.
+
+    With a fitted calibration curve loaded the hit is flagged ``relevant``
+    from its confidence. Otherwise the confidence is an uncalibrated distance
+    mapping, so relevance is left to the model and an empty search falls back
+    to a general one, as before.
+    """
+    # Call search_charities for the top project still raising funds
+    body, _ = await cached_search(SearchJob(query, k=1, filters={"funding_complete": False}))
+    charities = loads(body)
+    if relevance_calibrated():
+        for charity in charities:
+            charity["relevant"] = is_relevant(charity["confidence"])
+    elif not charities:
+        # If no results, try a general search
+        body, _ = await cached_search(
+            SearchJob("charity", k=1, filters={"funding_complete": False})
+        )
+        charities = loads(body)
+    return charities or None
+
+
+async def run_tool_call(tool_call: Dict, user_message: str) -> ToolOutcome:
+    """
+    Execute one ``search_charities`` or ``fetch_dermanow_info`` call.
+
+    ``tool_call`` is the assistant message's tool call dict; an empty search
+    query is replaced in place so the history sent back to the model matches
+    what was actually searched.
+    """
+    function = tool_call["function"]
+    args = json.loads(function["arguments"] or "{}")
+
+    if function["name"] == "search_charities":
+        query = args.get("query")
+
+        # Fallback for empty query
+        if not query or query.strip() == "":
+            query = "charity"
+            args["query"] = query
+            function["arguments"] = json.dumps(args)
+
+        log_event("tool_call", tool="search_charities", query=query)
+
+        charities = await search_charities_tool(query)
+        return ToolOutcome(
+            tool_call=tool_call,
+            content=json.dumps(charities or []),
+            donation_intent=charities is not None,
+            charities=charities,
+        )
+
+    if function["name"] == "fetch_dermanow_info":
+        info = fetch_dermanow_info(args.get("query", user_message))
+        return ToolOutcome(tool_call=tool_call, content=json.dumps({"info": info}))
+
+    return ToolOutcome(
+        tool_call=tool_call,
+        content=json.dumps({"error": f"Unknown tool {function['name']}"}),
+    )
+
+
+async def run_tool_calls(
+    messages: List[Dict],
+    content: Optional[str],
+    tool_calls: List[Dict],
+    user_message: str,
+) -> List[ToolOutcome]:
+    """
+    Run the model's tool calls concurrently and append their results to ``messages``.
+
+    The assistant turn is appended first, then one ``tool`` message per call in
+    the order the model asked for them.
+    """
+    outcomes = await asyncio.gather(
+        *(run_tool_call(tool_call, user_message) for tool_call in tool_calls)
+    )
+    messages.append(
+        {"role": "assistant", "content": content, "tool_calls": tool_calls}
+    )
+    messages.extend(
+        {
+            "role": "tool",
+            "content": outcome.content,
+            "tool_call_id": outcome.tool_call["id"],
+        }
+        for outcome in outcomes
+    )
+    return outcomes
+
+
+@dataclass
+class TurnPlan:
+    """The first round-trip's result: assistant text and the tool calls to run."""
+
+    content: Optional[str]
+    tool_calls: List[Dict]
+
+
+@dataclass
+class TurnContext:
+    """What a turn's cache entries are keyed on: session, recent history and the message."""
+
+    vector: np.ndarray
+    window: List[Dict]
+    scope: str
+    message: str
+
+
+async def turn_context(request: ChatRequest, messages: List[Dict]) -> TurnContext:
+    # The search encoder embeds the user message, cached apart from search queries
+    vectors = await asyncio.to_thread(
+        encode_queries, [request.message], chat_embedding_cache
+    )
+    window = messages[1:-1][-CACHE_HISTORY_TURNS:] if CACHE_HISTORY_TURNS > 0 else []
+    return TurnContext(
+        vector=vectors[0],
+        window=window,
+        scope=request.session_id or "",
+        message=normalize_query(request.message),
+    )
+
+
+def new_tool_call(name: str, arguments: str) -> Dict:
+    return {
+        "id": f"call_{uuid.uuid4().hex[:24]}",
+        "type": "function",
+        "function": {"name": name, "arguments": arguments},
+    }
+
+
+def plan_without_model(request: ChatRequest, turn: TurnContext) -> Optional[TurnPlan]:
+    """
+    Decide the first round-trip locally when possible.
+
+    Pure DermaNow questions go straight to ``fetch_dermanow_info``; otherwise a
+    cached decision for the same normalized message in the same session and
+    context is replayed with fresh tool call ids. Decisions carry tool
+    arguments taken from the message ("donate to kids" searches "kids"), so
+    unlike answers they are never shared between merely similar messages.
+    Returns None if the model must decide.
+    """
+    if INFO_FAST_PATH and is_dermanow_info_question(request.message):
+        arguments = json.dumps({"query": request.message})
+        return TurnPlan(None, [new_tool_call("fetch_dermanow_info", arguments)])
+
+    cached = completion_cache.lookup(decision_context(turn), turn.vector)
+    if cached is None:
+        return None
+    return TurnPlan(
+        cached["content"],
+        [new_tool_call(name, arguments) for name, arguments in cached["tool_calls"]],
+    )
+
+
+def decision_context(turn: TurnContext) -> str:
+    """Cache context for the tool decision, which includes the exact message."""
+    return context_key("decision", turn.scope, turn.window, turn.message)
+
+
+def remember_plan(turn: TurnContext, plan: TurnPlan):
+    completion_cache.store(
+        decision_context(turn),
+        turn.vector,
+        {
+            "content": plan.content,
+            "tool_calls": [
+                (call["function"]["name"], call["function"]["arguments"])
+                for call in plan.tool_calls
+            ],
+        },
+    )
+
+
+def answer_context(turn: TurnContext, outcomes: List[ToolOutcome]) -> str:
+    """Cache context for the final answer: session, history window and what the tools returned."""
+    results = []
+    for outcome in outcomes:
+        if outcome.charities is not None:
+            # Confidence varies between phrasings but doesn't change the answer
+            results.append(
+                [
+                    {k: v for k, v in charity.items() if k != "confidence"}
+                    for charity in outcome.charities
+                ]
             )
+        else:
+            results.append(outcome.content)
+    return context_key("answer", turn.scope, turn.window, results)
+
+
+def merge_outcomes(outcomes: List[ToolOutcome]):
+    """Donation intent and charities across tool calls; the last search wins."""
+    donation_intent = False
+    charities = None
+    for outcome in outcomes:
+        if outcome.tool_call["function"]["name"] == "search_charities":
+            donation_intent = outcome.donation_intent
+            charities = outcome.charities
+    return donation_intent, charities
+
+
+@chatbot_app.post(
+    "/chat", response_model=ChatResponse, dependencies=[Depends(require_search_ready)]
+)
+async def chat_endpoint(request: ChatRequest):
+    try:
+        usage = TokenUsage()
+        with span("chat.history"):
+            messages = await build_chat_messages(request, usage)
+        with span("chat.embed"):
+            turn = await turn_context(request, messages)
+        donation_intent = False
+        charities = None
+
+        plan = plan_without_model(request, turn)
+        if plan is None:
+            # Initial completion request
+            with span("chat.openai_plan"):
+                response = await client.chat.completions.create(
+                    model=CHAT_MODEL,
+                    messages=messages,
+                    tools=CHAT_TOOLS,
+                    tool_choice="auto",
+                )
+            usage.add(response.usage)
             message = response.choices[0].message
+            plan = TurnPlan(
+                message.content,
+                [
+                    {
+                        "id": tool_call.id,
+                        "type": "function",
+                        "function": {
+                            "name": tool_call.function.name,
+                            "arguments": tool_call.function.arguments,
+                        },
+                    }
+                    for tool_call in message.tool_calls or []
+                ],
+            )
+            remember_plan(turn, plan)
+        content = plan.content
+
+        # Handle function calls
+        if plan.tool_calls:
+            with span("chat.tools"):
+                outcomes = await run_tool_calls(
+                    messages, plan.content, plan.tool_calls, request.message
+                )
+            donation_intent, charities = merge_outcomes(outcomes)
+
+            answer_key = answer_context(turn, outcomes)
+            content = completion_cache.lookup(answer_key, turn.vector)
+            if content is None:
+                # Second completion with tool results
+                with span("chat.openai_answer"):
+                    response = await client.chat.completions.create(
+                        model=CHAT_MODEL,
+                        messages=messages,
+                        tools=CHAT_TOOLS,
+                        tool_choice="auto",
+                    )
+                usage.add(response.usage)
+                content = response.choices[0].message.content
+                if content:
+                    completion_cache.store(answer_key, turn.vector, content)
 
         # Handle empty charities case
         if donation_intent and (not charities or len(charities) == 0):
-            message.content = "I couldn’t find any projects right now. Could you try terms like 'education' or 'water'?"
+            content = NO_RESULTS_MESSAGE
             donation_intent = False
             charities = None
 
         return ChatResponse(
-            message=message.content or "Could you clarify what you’re looking for?",
+            message=content or FALLBACK_MESSAGE,
             donation_intent=donation_intent,
             charities=charities,
+            usage=usage.as_dict(),
         )
 
+    except HistoryBudgetExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
 
-@chatbot_app.post("/generate-description", response_model=DescriptionResponse)
-async def generate_description_endpoint(request: DescriptionRequest):
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_completion(messages: List[Dict], state: Dict) -> AsyncIterator[str]:
+    """
+    Stream one completion as ``token`` events.
+
+    Text deltas are forwarded as they arrive and collected in ``state["content"]``;
+    tool call fragments are reassembled by index into ``state["tool_calls"]``,
+    and token usage is left in ``state["usage"]``.
+    """
+    stream = await client.chat.completions.create(
+        model=CHAT_MODEL,
+        messages=messages,
+        tools=CHAT_TOOLS,
+        tool_choice="auto",
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    parts: List[str] = []
+    tool_calls: Dict[int, Dict] = {}
+    state["usage"] = None
+    async for chunk in stream:
+        # Usage arrives on a final chunk with no choices
+        if chunk.usage is not None:
+            state["usage"] = chunk.usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            parts.append(delta.content)
+            yield sse_event("token", {"content": delta.content})
+        for fragment in delta.tool_calls or []:
+            tool_call = tool_calls.setdefault(
+                fragment.index,
+                {"id": "", "type": "function", "function": {"name": "", "arguments": ""}},
+            )
+            if fragment.id:
+                tool_call["id"] = fragment.id
+            if fragment.function:
+                if fragment.function.name:
+                    tool_call["function"]["name"] += fragment.function.name
+                if fragment.function.arguments:
+                    tool_call["function"]["arguments"] += fragment.function.arguments
+    state["content"] = "".join(parts)
+    state["tool_calls"] = [tool_calls[i] for i in sorted(tool_calls)]
+
+
+async def chat_event_stream(request: ChatRequest) -> AsyncIterator[str]:
+    """
+    DermaBot turn as a sequence of Server-Sent Events.
+
+    Events are ``token`` (a text delta), ``tool_call`` and ``tool_result`` (tool
+    progress), ``charities`` (the matched projects), then a final ``done`` with
+    the full message, donation intent and token usage, or ``error`` if the turn failed.
+    """
     try:
-        # Prepare the prompt for OpenAI
-        system_prompt = """
+        usage = TokenUsage()
+        with span("chat.history"):
+            messages = await build_chat_messages(request, usage)
+        with span("chat.embed"):
+            turn = await turn_context(request, messages)
+        donation_intent = False
+        charities = None
+
+        plan = plan_without_model(request, turn)
+        if plan is None:
+            # Initial completion request; text is streamed straight through
+            state: Dict = {}
+            with span("chat.openai_plan"):
+                async for event in stream_completion(messages, state):
+                    yield event
+            usage.add(state["usage"])
+            plan = TurnPlan(state["content"] or None, state["tool_calls"])
+            remember_plan(turn, plan)
+        elif plan.content:
+            yield sse_event("token", {"content": plan.content})
+        content = plan.content
+
+        # Handle function calls
+        if plan.tool_calls:
+            for tool_call in plan.tool_calls:
+                yield sse_event(
+                    "tool_call",
+                    {"id": tool_call["id"], "name": tool_call["function"]["name"]},
+                )
+            with span("chat.tools"):
+                outcomes = await run_tool_calls(
+                    messages, plan.content, plan.tool_calls, request.message
+                )
+            for outcome in outcomes:
+                yield sse_event(
+                    "tool_result",
+                    {
+                        "id": outcome.tool_call["id"],
+                        "name": outcome.tool_call["function"]["name"],
+                    },
+                )
+            donation_intent, charities = merge_outcomes(outcomes)
+            if charities:
+                yield sse_event("charities", {"charities": charities})
+
+            answer_key = answer_context(turn, outcomes)
+            content = completion_cache.lookup(answer_key, turn.vector)
+            if content is not None:
+                yield sse_event("token", {"content": content})
+            else:
+                # Second completion with tool results
+                state = {}
+                with span("chat.openai_answer"):
+                    async for event in stream_completion(messages, state):
+                        yield event
+                usage.add(state["usage"])
+                content = state["content"]
+                if content:
+                    completion_cache.store(answer_key, turn.vector, content)
+
+        if not content:
+            content = FALLBACK_MESSAGE
+            yield sse_event("token", {"content": content})
+
+        yield sse_event(
+            "done",
+            {
+                "message": content,
+                "donation_intent": donation_intent,
+                "charities": charities,
+                "usage": usage.as_dict(),
+            },
+        )
+
+    except HistoryBudgetExceeded as e:
+        yield sse_event("error", {"detail": str(e)})
+    except Exception as e:
+        yield sse_event("error", {"detail": f"Error processing chat: {str(e)}"})
+
+
+@chatbot_app.post("/chat/stream", dependencies=[Depends(require_search_ready)])
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Streaming variant of ``/chat`` delivered as Server-Sent Events.
+
+    Tokens are sent as the model produces them, so the user sees the reply
+    start before the tool round-trip and second completion finish.
+    """
+    return StreamingResponse(
+        chat_event_stream(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+DESCRIPTION_PROMPT = """
 You are an assistant helping users create compelling descriptions for charity projects on DermaNow, a platform for Shariah-compliant charity projects. Your task is to generate or refine a project description based on the provided title, optional user instructions, and any existing description. Follow these guidelines:
 
 1. **Tone**: Write in a professional, empathetic, and engaging tone that inspires trust and motivates donations.
@@ -365,25 +844,152 @@ You are an assistant helping users create compelling descriptions for charity pr
 If no current description is provided, create a new one from scratch based on the title and optional instructions.
 """
 
-        # Construct the user prompt
-        user_prompt = f"Project Title: {request.title}\n"
-        user_prompt += f"User Instructions: {request.user_instruction if request.user_instruction else 'None'}\n"
-        user_prompt += f"Current Description: {request.current_description if request.current_description else 'None'}\n"
+# Concurrent description completions across all requests, and retries on rate limits
+DESCRIPTION_CONCURRENCY = int(os.getenv("DESCRIPTION_CONCURRENCY", "4"))
+DESCRIPTION_MAX_RETRIES = int(os.getenv("DESCRIPTION_MAX_RETRIES", "5"))
+DESCRIPTION_BACKOFF_SECONDS = float(os.getenv("DESCRIPTION_BACKOFF_SECONDS", "1"))
+DESCRIPTION_BACKOFF_MAX_SECONDS = 30.0
+DESCRIPTION_BATCH_LIMIT = int(os.getenv("DESCRIPTION_BATCH_LIMIT", "100"))
 
-        # Call OpenAI API
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-        )
+description_slots = asyncio.Semaphore(DESCRIPTION_CONCURRENCY)
+
+
+class DescriptionBatchRequest(BaseModel):
+    requests: list[DescriptionRequest]
 
-        generated_description = response.choices[0].message.content.strip()
 
+def description_key(request: DescriptionRequest) -> tuple:
+    """Requests with the same key would send the model the same prompt."""
+    return tuple(
+        (value or "").strip()
+        for value in (request.title, request.user_instruction, request.current_description)
+    )
+
+
+def retry_delay(error: RateLimitError, attempt: int) -> float:
+    """The server's Retry-After if it sent one, else exponential backoff with jitter."""
+    retry_after = error.response.headers.get("retry-after") if error.response else None
+    try:
+        return min(float(retry_after), DESCRIPTION_BACKOFF_MAX_SECONDS)
+    except (TypeError, ValueError):
+        delay = DESCRIPTION_BACKOFF_SECONDS * 2**attempt
+        return min(delay, DESCRIPTION_BACKOFF_MAX_SECONDS) * random.uniform(0.5, 1.0)
+
+
+async def generate_description(request: DescriptionRequest) -> str:
+    """
+    Generate or refine one project description.
+
+    Holds one of ``DESCRIPTION_CONCURRENCY`` slots while calling the model and
+    retries rate-limit errors up to ``DESCRIPTION_MAX_RETRIES`` times,
+    releasing the slot while it backs off.
+    """
+    # Construct the user prompt
+    user_prompt = f"Project Title: {request.title}\n"
+    user_prompt += f"User Instructions: {request.user_instruction if request.user_instruction else 'None'}\n"
+    user_prompt += f"Current Description: {request.current_description if request.current_description else 'None'}\n"
+
+    for attempt in range(DESCRIPTION_MAX_RETRIES + 1):
+        try:
+            async with description_slots:
+                with span("description.openai"):
+                    response = await client.chat.completions.create(
+                        model=CHAT_MODEL,
+                        messages=[
+                            {"role": "system", "content": DESCRIPTION_PROMPT},
+                            {"role": "user", "content": user_prompt},
+                        ],
+                    )
+            record_tokens("description", response.usage)
+            return (response.choices[0].message.content or "").strip()
+        except RateLimitError as e:
+            if attempt == DESCRIPTION_MAX_RETRIES:
+                raise
+            delay = retry_delay(e, attempt)
+            print(f"Description generation rate limited, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+@chatbot_app.post("/generate-description", response_model=DescriptionResponse)
+async def generate_description_endpoint(request: DescriptionRequest):
+    try:
+        generated_description = await generate_description(request)
         return DescriptionResponse(generated_description=generated_description)
 
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error generating description: {str(e)}"
         )
+
+
+async def description_event_stream(requests: List[DescriptionRequest]) -> AsyncIterator[str]:
+    """
+    Batch results as Server-Sent Events, in completion order.
+
+    Each input index gets one ``result`` (with ``generated_description``) or
+    ``error`` event; duplicate inputs share a single completion and are all
+    answered when it finishes. A final ``done`` event carries the counts.
+    """
+    indices: Dict[tuple, List[int]] = {}
+    for index, request in enumerate(requests):
+        indices.setdefault(description_key(request), []).append(index)
+
+    async def run(key: tuple, request: DescriptionRequest):
+        try:
+            return key, await generate_description(request), None
+        except Exception as e:
+            return key, None, str(e)
+
+    tasks = [
+        asyncio.create_task(run(key, requests[positions[0]]))
+        for key, positions in indices.items()
+    ]
+    succeeded = failed = 0
+    try:
+        for finished in asyncio.as_completed(tasks):
+            key, description, error = await finished
+            for index in indices[key]:
+                if error is None:
+                    succeeded += 1
+                    yield sse_event(
+                        "result", {"index": index, "generated_description": description}
+                    )
+                else:
+                    failed += 1
+                    yield sse_event(
+                        "error",
+                        {"index": index, "detail": f"Error generating description: {error}"},
+                    )
+        yield sse_event(
+            "done",
+            {
+                "total": len(requests),
+                "unique": len(indices),
+                "succeeded": succeeded,
+                "failed": failed,
+            },
+        )
+    finally:
+        # The client went away: don't keep spending completions on it
+        for task in tasks:
+            task.cancel()
+
+
+@chatbot_app.post("/generate-descriptions")
+async def generate_descriptions_endpoint(request: DescriptionBatchRequest):
+    """
+    Generate descriptions for many projects in one call, streamed as Server-Sent Events.
+
+    Completions run concurrently, bounded by ``DESCRIPTION_CONCURRENCY``, and
+    each result is sent as soon as it is ready, tagged with its input index.
+    """
+    if len(request.requests) > DESCRIPTION_BATCH_LIMIT:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {DESCRIPTION_BATCH_LIMIT} descriptions per batch",
+        )
+    return StreamingResponse(
+        description_event_stream(request.requests),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+
+def context_key(stage: str, *parts: Any) -> str:
+    """Exact-match part of a cache key: the stage plus hashed context (history, tool results)."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return f"{stage}:{hashlib.sha1(payload.encode('utf-8')).hexdigest()}"
+
+
+class SemanticCompletionCache:
+    """
+    TTL cache of chat completions looked up by embedding similarity.
+
+    Each entry sits under an exact context key (the conversation window and,
+    for final answers, the tool results) and carries the embedding of the
+    user message that produced it. A lookup returns the closest entry in the
+    same context whose cosine similarity clears ``threshold``, so rephrasings
+    of a frequent question ("what is dermanow?" / "what's DermaNow") share
+    one completion while anything with different history or data misses.
+    """
+
+    def __init__(
+        self, max_entries: int = 2048, ttl_seconds: float = 3600, threshold: float = 0.95
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, np.ndarray, Any]]" = OrderedDict()
+        self._by_context: Dict[str, Set[Tuple[str, int]]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, context: str, vector: np.ndarray) -> Optional[Any]:
+        vector = _unit(vector)
+        now = time.monotonic()
+        with self._lock:
+            keys: List[Tuple[str, int]] = []
+            for key in list(self._by_context.get(context, ())):
+                if self._entries[key][0] <= now:
+                    self._remove(key)
+                else:
+                    keys.append(key)
+            if keys:
+                matrix = np.vstack([self._entries[key][1] for key in keys])
+                similarities = matrix @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self._entries.move_to_end(keys[best])
+                    self.hits += 1
+                    return self._entries[keys[best]][2]
+            self.misses += 1
+            return None
+
+    def store(self, context: str, vector: np.ndarray, value: Any):
+        if self.max_entries <= 0:
+            return
+        vector = _unit(vector)
+        vector.setflags(write=False)
+        with self._lock:
+            key = (context, self._next_id)
+            self._next_id += 1
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, vector, value)
+            self._by_context.setdefault(context, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: Tuple[str, int]):
+        del self._entries[key]
+        siblings = self._by_context.get(key[0])
+        if siblings is not None:
+            siblings.discard(key)
+            if not siblings:
+                del self._by_context[key[0]]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_context.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
@@ -0,0 +1,18 @@
+import os
+
+from fastapi import HTTPException
+
+from search.search_charities import search_service
+
+# Seconds clients are told to wait before retrying while the index warms up
+RETRY_AFTER_SECONDS = int(os.getenv("SEARCH_RETRY_AFTER", "5"))
+
+
+def require_search_ready():
+    """Fail fast with 503 and ``Retry-After`` until the search index is built."""
+    if not search_service.ready:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Search index is {search_service.state}, try again shortly",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        )
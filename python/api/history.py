@@ -0,0 +1,327 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from search.telemetry import record_tokens
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - tiktoken is optional, a length estimate is the fallback
+    tiktoken = None
+
+# Chat format overhead per message (role and separators), per OpenAI's cookbook
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_PRIMING_TOKENS = 3
+
+
+class TokenCounter:
+    """
+    Local token counts for chat messages.
+
+    Uses the model's tiktoken encoding when tiktoken is installed and falls
+    back to a four-characters-per-token estimate otherwise, which errs high
+    for English text and so keeps the budget conservative. The encoding is
+    loaded on first use, since tiktoken may download it, so constructing a
+    counter at import time costs nothing.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self._encoding = None
+        self._resolved = tiktoken is None
+        self._lock = threading.Lock()
+
+    def _get_encoding(self):
+        if not self._resolved:
+            with self._lock:
+                if not self._resolved:
+                    try:
+                        self._encoding = tiktoken.encoding_for_model(self.model)
+                    except KeyError:
+                        self._encoding = tiktoken.get_encoding("o200k_base")
+                    self._resolved = True
+        return self._encoding
+
+    @property
+    def exact(self) -> bool:
+        return self._get_encoding() is not None
+
+    def count(self, text: Optional[str]) -> int:
+        if not text:
+            return 0
+        encoding = self._get_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        return (len(text) + 3) // 4
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """The longest prefix of ``text`` that counts as at most ``max_tokens`` tokens."""
+        if self.count(text) <= max_tokens:
+            return text
+        encoding = self._get_encoding()
+        if encoding is not None:
+            tokens = encoding.encode(text, disallowed_special=())
+            # A cut can split a multi-byte character, which decodes as U+FFFD
+            text = encoding.decode(tokens[: max(0, max_tokens)]).rstrip("\ufffd")
+            while text and self.count(text) > max_tokens:
+                text = text[:-1]
+            return text
+        return text[: max(0, max_tokens) * 4]
+
+    def message(self, message: Dict) -> int:
+        tokens = MESSAGE_OVERHEAD_TOKENS + self.count(message.get("content"))
+        for tool_call in message.get("tool_calls") or []:
+            tokens += self.count(tool_call["function"]["name"])
+            tokens += self.count(tool_call["function"]["arguments"])
+        return tokens
+
+    def messages(self, messages: List[Dict]) -> int:
+        return sum(self.message(m) for m in messages) + REPLY_PRIMING_TOKENS
+
+
+@dataclass
+class CompactHistory:
+    """History ready for the prompt: a running summary plus the recent turns kept verbatim."""
+
+    summary: Optional[str]
+    recent: List[Dict]
+    summarized_turns: int = 0
+    dropped_turns: int = 0
+    prompt_tokens: int = 0
+
+    def report(self) -> Dict:
+        return {
+            "kept_turns": len(self.recent),
+            "summarized_turns": self.summarized_turns,
+            "dropped_turns": self.dropped_turns,
+            "estimated_prompt_tokens": self.prompt_tokens,
+        }
+
+
+@dataclass
+class TokenUsage:
+    """Prompt/completion tokens summed over every completion made for one request."""
+
+    operation: str = "chat"
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    completions: int = 0
+    history: Dict = field(default_factory=dict)
+
+    def add(self, usage):
+        """Add an OpenAI ``usage`` object (or None, e.g. for cached answers)."""
+        if usage is None:
+            return
+        record_tokens(self.operation, usage)
+        self.prompt_tokens += usage.prompt_tokens or 0
+        self.completion_tokens += usage.completion_tokens or 0
+        self.completions += 1
+
+    def as_dict(self) -> Dict:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            "completions": self.completions,
+            "history": self.history,
+        }
+
+
+class HistoryBudgetExceeded(ValueError):
+    """Raised when the fixed part of a prompt alone doesn't fit the token budget."""
+
+
+# (previous_summary, new_messages, usage) -> updated summary
+Summarizer = Callable[[Optional[str], List[Dict], Optional["TokenUsage"]], Awaitable[str]]
+
+
+class HistoryManager:
+    """
+    Token-aware compaction of ``ChatRequest.history``.
+
+    The last ``window_turns`` messages are sent verbatim; anything older is
+    folded into a running summary produced by ``summarize(previous_summary,
+    new_messages, usage)``. Summaries are cached by a chained hash of the
+    messages they cover, so each turn of a long conversation only summarizes
+    the messages that have newly slid out of the window, on top of the
+    summary already built for the prefix before them.
+
+    ``compact`` then enforces ``budget_tokens`` for the whole prompt (fixed
+    messages, summary, recent turns, the new message and ``reserve_tokens``
+    held back for tool results and the reply, plus the tokens of
+    ``reserve_text``, such as tool schemas, counted on first use), moving
+    further turns out of the window until it fits. A summary longer than
+    ``summary_tokens`` is cut to that length. If summarization fails, the
+    older turns are dropped instead so a chat never fails because of its
+    history.
+    """
+
+    def __init__(
+        self,
+        counter: TokenCounter,
+        summarize: Summarizer,
+        budget_tokens: int = 6000,
+        window_turns: int = 6,
+        reserve_tokens: int = 1500,
+        summary_tokens: int = 300,
+        cache_size: int = 1024,
+        reserve_text: str = "",
+    ):
+        self.counter = counter
+        self.summarize = summarize
+        self.budget_tokens = budget_tokens
+        self.window_turns = window_turns
+        self.reserve_tokens = reserve_tokens
+        self.reserve_text = reserve_text
+        self._reserve_text_tokens: Optional[int] = None
+        self.summary_tokens = summary_tokens
+        self.cache_size = cache_size
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.summary_hits = 0
+        self.summary_misses = 0
+
+    async def compact(
+        self,
+        history: List[Dict],
+        fixed: List[Dict],
+        message: Dict,
+        usage: Optional[TokenUsage] = None,
+    ) -> CompactHistory:
+        """
+        Fit ``history`` between the ``fixed`` leading messages and the new ``message``.
+
+        Raises:
+            HistoryBudgetExceeded: If ``fixed`` plus ``message`` plus the
+            reserve already exceed the budget.
+        """
+        if self._reserve_text_tokens is None:
+            self._reserve_text_tokens = self.counter.count(self.reserve_text)
+        available = (
+            self.budget_tokens
+            - self.reserve_tokens
+            - self._reserve_text_tokens
+            - self.counter.messages(fixed + [message])
+        )
+        if available < 0:
+            raise HistoryBudgetExceeded(
+                f"Message needs {self.budget_tokens - available} tokens, "
+                f"budget is {self.budget_tokens}"
+            )
+
+        costs = [self.counter.message(m) for m in history]
+        cut = max(0, len(history) - self.window_turns)
+        # Worst case the summary costs summary_tokens; leave room for it if there will be one
+        while cut < len(history) and sum(costs[cut:]) + (
+            self.summary_tokens + MESSAGE_OVERHEAD_TOKENS if cut else 0
+        ) > available:
+            cut += 1
+
+        summary = None
+        dropped = 0
+        if cut:
+            try:
+                summary = await self._summary_for(history, cut, usage)
+            except Exception as e:
+                print(f"History summarization failed, dropping {cut} older messages: {e}")
+                dropped = cut
+
+        compacted = CompactHistory(
+            summary=summary,
+            recent=history[cut:],
+            summarized_turns=cut - dropped,
+            dropped_turns=dropped,
+        )
+        compacted.prompt_tokens = self.counter.messages(
+            fixed + self.summary_messages(compacted) + compacted.recent + [message]
+        )
+        return compacted
+
+    @staticmethod
+    def summary_messages(compacted: CompactHistory) -> List[Dict]:
+        if not compacted.summary:
+            return []
+        return [
+            {
+                "role": "system",
+                "content": f"Summary of the earlier conversation:\n{compacted.summary}",
+            }
+        ]
+
+    async def _summary_for(
+        self, history: List[Dict], cut: int, usage: Optional[TokenUsage]
+    ) -> str:
+        keys = _prefix_keys(history[:cut])
+        # Longest already-summarized prefix of the messages being folded away
+        start, previous = 0, None
+        with self._lock:
+            for end in range(cut, 0, -1):
+                cached = self._summaries.get(keys[end - 1])
+                if cached is not None:
+                    self._summaries.move_to_end(keys[end - 1])
+                    start, previous = end, cached
+                    break
+        if start == cut:
+            self.summary_hits += 1
+            return previous
+        self.summary_misses += 1
+
+        summary = (await self.summarize(previous, history[start:cut], usage)).strip()
+        if self.counter.count(summary) > self.summary_tokens:
+            # A summarizer that ignores its limit mustn't break the budget; keep its opening
+            print(f"History summary over {self.summary_tokens} tokens, truncating it")
+            summary = self.counter.truncate(summary, self.summary_tokens)
+        with self._lock:
+            self._summaries[keys[cut - 1]] = summary
+            while len(self._summaries) > self.cache_size:
+                self._summaries.popitem(last=False)
+        return summary
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.summary_hits + self.summary_misses
+            return {
+                "budget_tokens": self.budget_tokens,
+                "window_turns": self.window_turns,
+                "exact_token_counts": self.counter.exact,
+                "cached_summaries": len(self._summaries),
+                "summary_hits": self.summary_hits,
+                "summary_misses": self.summary_misses,
+                "hit_rate": self.summary_hits / lookups if lookups else 0.0,
+            }
+
+
+def _prefix_keys(messages: List[Dict]) -> List[str]:
+    """Chained hash of every prefix: ``keys[i]`` identifies ``messages[: i + 1]``."""
+    keys, previous = [], ""
+    for message in messages:
+        payload = json.dumps(
+            [previous, message.get("role"), message.get("content")], ensure_ascii=False
+        )
+        previous = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+        keys.append(previous)
+    return keys
+
+
+def format_transcript(messages: List[Dict]) -> str:
+    return "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+
+
+def summary_prompt(previous: Optional[str], messages: List[Dict]) -> Tuple[str, str]:
+    """System and user prompt for folding ``messages`` into ``previous``."""
+    system = (
+        "You maintain a running summary of a conversation between a user and "
+        "DermaBot, the assistant of the DermaNow charity platform. Update the "
+        "summary with the new messages. Keep the user's goals, interests "
+        "(causes, locations, projects mentioned) and any answers they still "
+        "rely on; drop pleasantries. Reply with the summary only, in a few "
+        "short sentences."
+    )
+    user = (
+        f"Current summary:\n{previous or '(none)'}\n\n"
+        f"New messages:\n{format_transcript(messages)}"
+    )
+    return system, user
@@ -0,0 +1,142 @@
+import json
+import os
+import platform
+import subprocess
+import time
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# Vocabulary for synthetic projects; close enough to the real catalogue that
+# BM25 postings and filter bitmaps have realistic shapes
+CAUSES = [
+    ("Clean Water", "tube wells and filtration systems for villages without safe drinking water"),
+    ("Meals for Orphans", "daily nutritious meals for children living in orphanages"),
+    ("School Renovation", "repairing classrooms, roofs and toilets at a rural primary school"),
+    ("Dialysis Support", "covering dialysis treatment costs for low-income kidney patients"),
+    ("Flood Relief", "emergency food packs, blankets and hygiene kits for displaced families"),
+    ("Quran Learning Centre", "teachers and materials for a community Quran and literacy class"),
+    ("Mosque Solar Panels", "solar panels to cut electricity bills at a village mosque"),
+    ("B40 Scholarships", "university scholarships for students from low-income households"),
+    ("Mobile Health Clinic", "a van-based clinic bringing checkups and vaccines to remote communities"),
+    ("Refugee Education", "classes in English, maths and vocational skills for refugee youth"),
+    ("Elderly Care Home", "new beds, wheelchairs and a kitchen for a home caring for senior citizens"),
+    ("Food Bank", "a cold room and delivery van so the food bank can rescue surplus food"),
+    ("Laptops for Students", "refurbished laptops and internet access for students studying from home"),
+    ("Transitional Housing", "transitional housing and job support for homeless families"),
+    ("Waqf Hospital Ward", "endowing a hospital ward that treats patients regardless of ability to pay"),
+    ("Mangrove Planting", "planting mangroves to protect coastal villages from erosion"),
+]
+CATEGORIES = ["Education", "Health", "Environment", "Disaster Relief", "Poverty", "Religious"]
+LOCATIONS = [
+    "Kuala Lumpur", "Selangor", "Kelantan", "Sabah", "Sarawak", "Penang",
+    "Johor", "Perak", "Terengganu", "Kedah",
+]
+ORGANIZATIONS = [
+    "Yayasan Harapan", "Amanah Care", "Rahmah Foundation", "Ihsan Relief",
+    "Nur Community Trust", "Barakah Aid",
+]
+QUERIES = [
+    "I want to help kids get food",
+    "clean drinking water",
+    "support education for poor students",
+    "medical treatment for patients",
+    "disaster relief after floods",
+    "help the elderly",
+    "environment and climate",
+    "homeless families in Kuala Lumpur",
+    "islamic learning",
+    "computers for students",
+]
+
+
+def synthetic_rows(count: int, seed: int = 0) -> List[Dict]:
+    """``count`` charity_projects rows with every field /search returns."""
+    rng = np.random.default_rng(seed)
+    cause = rng.integers(0, len(CAUSES), count)
+    category = rng.integers(0, len(CATEGORIES), count)
+    location = rng.integers(0, len(LOCATIONS), count)
+    organization = rng.integers(0, len(ORGANIZATIONS), count)
+    funding = rng.uniform(0, 100, count)
+    supporters = rng.integers(0, 5000, count)
+    rows = []
+    for i in range(count):
+        title, description = CAUSES[cause[i]]
+        place = LOCATIONS[location[i]]
+        rows.append(
+            {
+                "id": i + 1,
+                "created_at": "2025-01-01T00:00:00+00:00",
+                "title": f"{title} in {place} #{i + 1}",
+                "description": f"{description.capitalize()} in {place}.",
+                "image": f"https://example.org/images/{i + 1}.jpg",
+                "funding_percentage": round(float(funding[i]), 2),
+                "supporters": int(supporters[i]),
+                "amount": int(funding[i] * 1000),
+                "category": [CATEGORIES[category[i]]],
+                "in_progress": True,
+                "progress_percentage": round(float(funding[i]), 2),
+                "funding_complete": bool(funding[i] > 95),
+                "smart_contract_address": f"0x{i + 1:040x}",
+                "verified": bool(i % 3),
+                "goal_amount": 100_000,
+                "location": place,
+                "organization_name": ORGANIZATIONS[organization[i]],
+                "document_urls": [],
+                "overview": [description],
+                "objective": [f"Deliver {title.lower()} to {place}"],
+                "impact_stats": [{"icon": "users", "title": "Beneficiaries", "subtitle": "500+"}],
+                "timeline": [{"desc": "Launch", "step": 1, "color": "green", "title": "Start"}],
+            }
+        )
+    return rows
+
+
+def latency_summary(latencies_ms: Sequence[float]) -> Dict:
+    """Count, mean and p50/p95/p99 of a list of latencies in milliseconds."""
+    if not latencies_ms:
+        return {"count": 0}
+    values = np.asarray(latencies_ms, dtype=np.float64)
+    return {
+        "count": int(len(values)),
+        "mean_ms": round(float(values.mean()), 4),
+        "p50_ms": round(float(np.percentile(values, 50)), 4),
+        "p95_ms": round(float(np.percentile(values, 95)), 4),
+        "p99_ms": round(float(np.percentile(values, 99)), 4),
+        "max_ms": round(float(values.max()), 4),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_report(path: str, benchmark: str, config: Dict, results: List[Dict]):
+    """
+    Save results with what's needed to compare runs: commit, machine and config.
+
+    ``compare.py`` matches rows of two reports on their non-metric fields.
+    """
+    report = {
+        "benchmark": benchmark,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": git_commit(),
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "config": config,
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {path}")
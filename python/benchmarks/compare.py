@@ -0,0 +1,98 @@
+# Compare two benchmark reports and flag regressions:
+#   python -m benchmarks.compare baseline.json candidate.json --threshold 0.1
+# Exits with status 1 if any metric got worse by more than the threshold.
+import argparse
+import json
+import sys
+from typing import Dict, List, Tuple
+
+# Metrics where higher is better; every other metric is a latency or a duration
+HIGHER_IS_BETTER = {"throughput_rps", "mrr"}
+# Ranking quality from benchmarks.relevance, e.g. recall@5 and ndcg@10
+QUALITY_PREFIXES = ("recall@", "ndcg@")
+IGNORED = {"count", "statuses", "stats", "duration_seconds"}
+
+
+def higher_is_better(key: str) -> bool:
+    return key in HIGHER_IS_BETTER or key.startswith(QUALITY_PREFIXES)
+
+
+def is_metric(key: str) -> bool:
+    return (
+        higher_is_better(key)
+        or key.endswith("_ms")
+        or key.endswith("_seconds")
+        or key == "error_rate"
+    )
+
+
+def row_key(row: Dict) -> Tuple:
+    """What identifies a measurement across runs: every field that isn't a metric."""
+    return tuple(
+        sorted(
+            (k, v)
+            for k, v in row.items()
+            if k not in IGNORED and not is_metric(k) and isinstance(v, (str, int, float, bool))
+        )
+    )
+
+
+def compare(baseline: List[Dict], candidate: List[Dict], threshold: float) -> List[Dict]:
+    before = {row_key(row): row for row in baseline}
+    changes = []
+    for row in candidate:
+        old = before.get(row_key(row))
+        if old is None:
+            continue
+        for metric, value in row.items():
+            if metric in IGNORED or not is_metric(metric) or not isinstance(value, (int, float)):
+                continue
+            previous = old.get(metric)
+            if not isinstance(previous, (int, float)) or previous == 0:
+                continue
+            change = (value - previous) / previous
+            worse = -change if higher_is_better(metric) else change
+            changes.append(
+                {
+                    "measurement": dict(row_key(row)),
+                    "metric": metric,
+                    "baseline": previous,
+                    "candidate": value,
+                    "change": round(change, 4),
+                    "regression": worse > threshold,
+                }
+            )
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two benchmark JSON reports")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change that counts as a regression")
+    parser.add_argument("--all", action="store_true", help="Print unchanged metrics too")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    if baseline["benchmark"] != candidate["benchmark"]:
+        parser.error(f"Can't compare a {baseline['benchmark']} report with a {candidate['benchmark']} one")
+
+    print(f"{baseline['git_commit']} -> {candidate['git_commit']}")
+    changes = compare(baseline["results"], candidate["results"], args.threshold)
+    for change in changes:
+        if args.all or change["regression"] or abs(change["change"]) > args.threshold:
+            flag = "REGRESSION" if change["regression"] else "improved" if abs(change["change"]) > args.threshold else ""
+            print(
+                f"{flag:>10}  {change['metric']:<22} {change['baseline']:>12} -> {change['candidate']:<12} "
+                f"({change['change']:+.1%})  {change['measurement']}"
+            )
+    regressions = sum(change["regression"] for change in changes)
+    print(f"{len(changes)} metrics compared, {regressions} regressions over {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
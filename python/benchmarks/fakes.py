@@ -0,0 +1,291 @@
+# Local stand-ins for Supabase and the OpenAI API, so benchmarks are
+# reproducible and cost nothing. Run both and point the API at them:
+#   python -m benchmarks.fakes --rows 5000 --openai-latency-ms 300
+# then export the printed NEXT_PUBLIC_SUPABASE_* and OPENAI_* variables.
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.common import synthetic_rows
+from search.supabase_loader import SUPABASE_KEY_ENV, SUPABASE_URL_ENV
+
+# supabase-py rejects keys that don't look like a JWT
+FAKE_SUPABASE_KEY = "bench.bench.bench"
+FAKE_OPENAI_KEY = "sk-bench"
+
+DONATION_WORDS = ("donate", "help", "support", "fund", "give", "charity", "project")
+
+
+class _FakeServer:
+    """A ThreadingHTTPServer on a background thread."""
+
+    handler = BaseHTTPRequestHandler
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.httpd = ThreadingHTTPServer((host, port), self.handler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self.httpd.serve_forever, name=type(self).__name__, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, payload, status: int = 200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self) -> Dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+
+class _SupabaseHandler(_JSONHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        if not url.path.startswith("/rest/v1/"):
+            self.send_json({"message": "not found"}, 404)
+            return
+        table = url.path[len("/rest/v1/") :]
+        rows = self.server.fake.tables.get(table)
+        if rows is None:
+            self.send_json({"message": f"relation {table} does not exist"}, 404)
+            return
+        self.send_json(query_rows(rows, parse_qs(url.query)))
+
+
+def query_rows(rows: List[Dict], params: Dict[str, List[str]]) -> List[Dict]:
+    """
+    The PostgREST subset the loaders use: ``select`` column lists,
+    ``<col>=gt.<n>`` / ``in.(...)`` filters, ``order=<col>.asc``, ``limit`` and ``offset``.
+    """
+    selected = rows
+    for column, values in params.items():
+        if column in ("select", "order", "limit", "offset"):
+            continue
+        operator, _, operand = values[0].partition(".")
+        if operator == "gt":
+            selected = [r for r in selected if r.get(column) is not None and r[column] > int(operand)]
+        elif operator == "eq":
+            selected = [r for r in selected if str(r.get(column)).lower() == operand.lower()]
+        elif operator == "in":
+            wanted = {v.strip('"') for v in operand.strip("()").split(",")}
+            selected = [r for r in selected if str(r.get(column)) in wanted]
+    if "order" in params:
+        column, _, direction = params["order"][0].partition(".")
+        selected = sorted(selected, key=lambda r: r[column], reverse=direction.startswith("desc"))
+    offset = int(params.get("offset", ["0"])[0])
+    limit = params.get("limit")
+    selected = selected[offset : offset + int(limit[0])] if limit else selected[offset:]
+
+    columns = params.get("select", ["*"])[0]
+    if columns != "*":
+        names = [c.strip() for c in columns.split(",")]
+        selected = [{name: row.get(name) for name in names} for row in selected]
+    return selected
+
+
+class FakeSupabase(_FakeServer):
+    """Serves ``charity_projects`` (synthetic by default) over the PostgREST API."""
+
+    handler = _SupabaseHandler
+
+    def __init__(self, rows: Optional[List[Dict]] = None, rows_count: int = 1000, **kwargs):
+        super().__init__(**kwargs)
+        self.tables = {"charity_projects": rows if rows is not None else synthetic_rows(rows_count)}
+
+    def env(self) -> Dict[str, str]:
+        # The names supabase_client() reads, so a spawned server talks to this fake
+        return {
+            SUPABASE_URL_ENV: self.url,
+            SUPABASE_KEY_ENV: FAKE_SUPABASE_KEY,
+        }
+
+
+class _OpenAIHandler(_JSONHandler):
+    def do_POST(self):
+        if urlparse(self.path).path != "/v1/chat/completions":
+            self.send_json({"error": {"message": "not found"}}, 404)
+            return
+        fake: FakeOpenAI = self.server.fake
+        request = self.read_json()
+        reply = fake.reply(request)
+        time.sleep(fake.latency_ms / 1000)
+        if request.get("stream"):
+            self.stream(request, reply)
+        else:
+            self.send_json(completion(request, reply))
+
+    def stream(self, request: Dict, reply: Dict):
+        fake: FakeOpenAI = self.server.fake
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send(payload):
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        if reply["content"]:
+            for word in reply["content"].split(" "):
+                time.sleep(fake.token_ms / 1000)
+                send(chunk(request, {"content": word + " "}))
+        if reply["tool_calls"]:
+            deltas = [dict(call, index=i) for i, call in enumerate(reply["tool_calls"])]
+            send(chunk(request, {"tool_calls": deltas}))
+        send(chunk(request, {}, finish_reason=reply["finish_reason"]))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            send(chunk(request, None, usage=reply["usage"]))
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+def completion(request: Dict, reply: Dict) -> Dict:
+    message = {"role": "assistant", "content": reply["content"]}
+    if reply["tool_calls"]:
+        message["tool_calls"] = reply["tool_calls"]
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "fake"),
+        "choices": [{"index": 0, "message": message, "finish_reason": reply["finish_reason"]}],
+        "usage": reply["usage"],
+    }
+
+
+def chunk(request: Dict, delta: Optional[Dict], finish_reason=None, usage=None) -> Dict:
+    return {
+        "id": "chatcmpl-stream",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": request.get("model", "fake"),
+        "choices": []
+        if delta is None
+        else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        "usage": usage,
+    }
+
+
+class FakeOpenAI(_FakeServer):
+    """
+    Chat completions API with canned, deterministic behaviour.
+
+    With tools offered, a donation-sounding message gets a ``search_charities``
+    call and a DermaNow question a ``fetch_dermanow_info`` call (both, for a
+    message that is both); after a tool
+    result, or without tools, it answers in ``answer_words`` words. Every
+    response waits ``latency_ms``, and streamed ones ``token_ms`` per word.
+    """
+
+    handler = _OpenAIHandler
+
+    def __init__(
+        self,
+        latency_ms: float = 300,
+        token_ms: float = 0,
+        answer_words: int = 60,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.latency_ms = latency_ms
+        self.token_ms = token_ms
+        self.answer_words = answer_words
+
+    def env(self) -> Dict[str, str]:
+        return {"OPENAI_BASE_URL": f"{self.url}/v1", "OPENAI_API_KEY": FAKE_OPENAI_KEY}
+
+    def reply(self, request: Dict) -> Dict:
+        messages = request.get("messages") or []
+        last = messages[-1] if messages else {}
+        text = str(last.get("content") or "")
+        prompt_tokens = sum(len(str(m.get("content") or "")) for m in messages) // 4
+
+        tool_calls = []
+        if request.get("tools") and last.get("role") == "user":
+            lowered = text.lower()
+            # A message asking both gets both calls in one turn, as parallel tool calls
+            if "dermanow" in lowered:
+                tool_calls.append(tool_call("fetch_dermanow_info", {"query": text}))
+            if any(word in lowered for word in DONATION_WORDS):
+                tool_calls.append(tool_call("search_charities", {"query": text}))
+
+        content = None
+        if not tool_calls:
+            content = " ".join(["lorem"] * self.answer_words)
+            if request.get("max_tokens"):
+                content = " ".join(content.split(" ")[: request["max_tokens"]])
+        completion_tokens = len(content.split(" ")) if content else 20
+        return {
+            "content": content,
+            "tool_calls": tool_calls,
+            "finish_reason": "tool_calls" if tool_calls else "stop",
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+
+def tool_call(name: str, arguments: Dict) -> Dict:
+    return {
+        "id": f"call_{uuid.uuid4().hex[:24]}",
+        "type": "function",
+        "function": {"name": name, "arguments": json.dumps(arguments)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run fake Supabase and OpenAI servers")
+    parser.add_argument("--rows", type=int, default=1000, help="Synthetic charity_projects rows")
+    parser.add_argument("--supabase-port", type=int, default=54321)
+    parser.add_argument("--openai-port", type=int, default=54322)
+    parser.add_argument("--openai-latency-ms", type=float, default=300)
+    parser.add_argument("--openai-token-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    supabase = FakeSupabase(rows_count=args.rows, port=args.supabase_port).start()
+    openai = FakeOpenAI(
+        latency_ms=args.openai_latency_ms, token_ms=args.openai_token_ms, port=args.openai_port
+    ).start()
+    for name, value in {**supabase.env(), **openai.env()}.items():
+        print(f"export {name}={value}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        supabase.stop()
+        openai.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Refresh time and peak memory of streaming ingestion from a fake Supabase:
+#   python -m benchmarks.ingest --rows 10000 100000 --page-sizes 500 2000 --output ingest.json
+# Memory is the process's peak RSS from getrusage, so it includes the encoder's
+# native allocations and FAISS. The peak never goes down, so each result also
+# reports how much that refresh raised it; run one size per process to
+# compare sizes from a clean start.
+import argparse
+import json
+import resource
+import sys
+import time
+from typing import Dict
+
+from supabase import create_client
+
+from benchmarks.common import write_report
+from benchmarks.fakes import FAKE_SUPABASE_KEY, FakeSupabase
+from search.index_manager import CharityIndexManager
+from search.search_charities import INDEX_CONFIG, load_search_encoder
+from search.supabase_loader import SupabaseCatalogue
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+def measure_refresh(manager: CharityIndexManager) -> Dict:
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    stats = manager.refresh()
+    elapsed = time.perf_counter() - start
+    peak = peak_rss_mb()
+    return {
+        "seconds": round(elapsed, 3),
+        "peak_rss_mb": round(peak, 1),
+        "peak_rss_growth_mb": round(peak - before, 1),
+        "added": stats["added"],
+        "unchanged": stats["unchanged"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming Supabase ingestion cost")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[1000])
+    parser.add_argument("--encode-batch-size", type=int, default=256)
+    parser.add_argument("--output", default="benchmark-ingest.json")
+    args = parser.parse_args()
+
+    encoder = load_search_encoder()
+    results = []
+    for rows in args.rows:
+        supabase = FakeSupabase(rows_count=rows).start()
+        try:
+            client = create_client(supabase.url, FAKE_SUPABASE_KEY)
+            for page_size in args.page_sizes:
+                catalogue = SupabaseCatalogue(lambda: client, page_size=page_size)
+                manager = CharityIndexManager(
+                    encoder,
+                    catalogue.index_pages,
+                    encoder.model_id,
+                    index_config=INDEX_CONFIG,
+                    hydrate=catalogue.display_fields,
+                    encode_batch_size=args.encode_batch_size,
+                )
+                context = {"rows": rows, "page_size": page_size}
+                # Cold builds the index; warm re-reads the table with nothing to encode
+                for phase in ("cold", "warm"):
+                    results.append({**context, "phase": phase, **measure_refresh(manager)})
+                    print(json.dumps(results[-1]))
+        finally:
+            supabase.stop()
+
+    write_report(args.output, "ingest", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
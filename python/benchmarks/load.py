@@ -0,0 +1,243 @@
+# Load generator for /search and /chatbot/chat.
+#
+# Against a running server:
+#   python -m benchmarks.load --base-url http://localhost:8000 --scenarios search chat
+# Or self-contained: start fake Supabase/OpenAI and a uvicorn server wired to them
+#   python -m benchmarks.load --spawn --rows 2000 --openai-latency-ms 300 --output load.json
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import QUERIES, latency_summary, write_report
+from benchmarks.fakes import FakeOpenAI, FakeSupabase
+
+# Admin token for --spawn servers when ADMIN_API_TOKEN isn't set
+BENCH_ADMIN_TOKEN = "bench-admin"
+
+CHAT_MESSAGES = [
+    "I want to donate to help children get food",
+    "Can you recommend a project supporting clean water?",
+    "I'd like to support education for poor students",
+    "What is DermaNow?",
+    "How does DermaNow use blockchain?",
+    "Hello!",
+]
+
+
+def search_payload(n: int, unique: bool) -> Dict:
+    query = QUERIES[n % len(QUERIES)]
+    return {"query": f"{query} {n}" if unique else query, "k": 10}
+
+
+def chat_payload(n: int, unique: bool) -> Dict:
+    message = CHAT_MESSAGES[n % len(CHAT_MESSAGES)]
+    return {"message": f"{message} (#{n})" if unique else message, "history": []}
+
+
+SCENARIOS = {
+    "search": ("/search", search_payload),
+    "chat": ("/chatbot/chat", chat_payload),
+}
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    name: str,
+    concurrency: int,
+    duration: float,
+    warmup: int,
+    unique: bool,
+) -> Dict:
+    """
+    ``concurrency`` closed-loop clients hitting one endpoint for ``duration`` seconds.
+
+    Throughput is completed requests per second of wall time; latencies cover
+    successful requests only, with failures counted by status.
+    """
+    path, payload = SCENARIOS[name]
+    counter = itertools.count()
+    for _ in range(warmup):
+        await client.post(path, json=payload(next(counter), unique))
+
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            body = payload(next(counter), unique)
+            start = time.perf_counter()
+            try:
+                response = await client.post(path, json=body)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = (time.perf_counter() - start) * 1000
+            statuses[status] += 1
+            if status == "200":
+                latencies.append(elapsed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "unique_inputs": unique,
+        "duration_seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2),
+        "statuses": dict(statuses),
+        "error_rate": round(1 - len(latencies) / max(1, sum(statuses.values())), 4),
+        **latency_summary(latencies),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# --no-caches: every cache the server reads a size from, so each request does the full work
+NO_CACHE_ENV = {
+    "QUERY_CACHE_SIZE": "0",
+    "SEARCH_RESULT_CACHE_BYTES": "0",
+    # A shared Redis result cache inherited from the environment would still serve hits
+    "SEARCH_RESULT_CACHE_REDIS_URL": "",
+    "CHAT_CACHE_SIZE": "0",
+    "CHAT_EMBEDDING_CACHE_SIZE": "0",
+}
+
+
+class SpawnedStack:
+    """Fake Supabase and OpenAI plus a uvicorn server of ``main:app`` wired to them."""
+
+    def __init__(self, args):
+        self.args = args
+        self.supabase = FakeSupabase(rows_count=args.rows).start()
+        self.openai = FakeOpenAI(
+            latency_ms=args.openai_latency_ms, token_ms=args.openai_token_ms
+        ).start()
+        self.port = free_port()
+        env = {
+            **os.environ,
+            **self.supabase.env(),
+            **self.openai.env(),
+            # Start from an empty index and keep the log quiet
+            "SEARCH_CACHE_DIR": "",
+            "REQUEST_LOG": "0",
+            # Lets the run read /cache/stats
+            "ADMIN_API_TOKEN": os.getenv("ADMIN_API_TOKEN") or BENCH_ADMIN_TOKEN,
+        }
+        if args.no_caches:
+            env.update(NO_CACHE_ENV)
+        self.process = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "main:app",
+                "--host", "127.0.0.1",
+                "--port", str(self.port),
+                "--workers", str(args.workers),
+                "--log-level", "warning",
+            ],
+            env=env,
+        )
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def wait_ready(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited with {self.process.returncode}")
+            try:
+                if httpx.get(f"{self.base_url}/health/ready", timeout=2).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.5)
+        raise TimeoutError(f"Server not ready after {timeout}s")
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.supabase.stop()
+        self.openai.stop()
+
+
+async def run(args, base_url: str) -> List[Dict]:
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        admin = {"X-Admin-Token": os.getenv("ADMIN_API_TOKEN") or BENCH_ADMIN_TOKEN}
+        results = []
+        for name in args.scenarios:
+            for concurrency in args.concurrency:
+                result = await run_scenario(
+                    client, name, concurrency, args.duration, args.warmup, args.unique
+                )
+                results.append(result)
+                print(json.dumps(result))
+        try:
+            response = await client.get("/cache/stats", headers=admin)
+            cache_stats = response.json() if response.status_code == 200 else None
+        except (httpx.HTTPError, ValueError):
+            cache_stats = None
+    if cache_stats is not None:
+        results.append({"scenario": "server_cache_stats", "stats": cache_stats})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and latency of /search and /chatbot/chat")
+    parser.add_argument("--base-url", help="Server to load; omit with --spawn")
+    parser.add_argument("--spawn", action="store_true", help="Start fakes and a local server")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per scenario and level")
+    parser.add_argument("--warmup", type=int, default=10, help="Untimed requests per scenario")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument(
+        "--unique", action="store_true", help="Vary every input so caches mostly miss"
+    )
+    parser.add_argument("--rows", type=int, default=2000, help="--spawn: synthetic projects")
+    parser.add_argument("--workers", type=int, default=1, help="--spawn: uvicorn workers")
+    parser.add_argument("--openai-latency-ms", type=float, default=300)
+    parser.add_argument("--openai-token-ms", type=float, default=0)
+    parser.add_argument(
+        "--no-caches", action="store_true", help="--spawn: disable query, result and chat caches"
+    )
+    parser.add_argument("--ready-timeout", type=float, default=300)
+    parser.add_argument("--output", default="benchmark-load.json")
+    args = parser.parse_args()
+    if not args.spawn and not args.base_url:
+        parser.error("pass --base-url or --spawn")
+
+    stack: Optional[SpawnedStack] = None
+    try:
+        if args.spawn:
+            stack = SpawnedStack(args)
+            stack.wait_ready(args.ready_timeout)
+        results = asyncio.run(run(args, stack.base_url if stack else args.base_url))
+    finally:
+        if stack is not None:
+            stack.stop()
+
+    write_report(args.output, "load", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
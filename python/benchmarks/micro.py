@@ -0,0 +1,164 @@
+# Microbenchmarks for the stages of search_charities on synthetic catalogues:
+#   python -m benchmarks.micro --sizes 100 10000 1000000 --output micro.json
+# The index type and metric come from the usual SEARCH_INDEX_* variables.
+import argparse
+import json
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from benchmarks.common import QUERIES, latency_summary, synthetic_rows, write_report
+from index_benchmark import DIMENSION, queries_near, synthetic_catalogue
+from search.batcher import SearchJob
+from search.index_factory import build_index, index_kind
+from search.index_manager import IndexSnapshot
+from search.search_charities import (
+    DEFAULT_K,
+    INDEX_CONFIG,
+    build_page,
+    fuse_keyword_hits,
+    load_search_encoder,
+    query_cache,
+    rank_vectors,
+    search_charities_batch,
+    search_service,
+)
+from search.service import SearchComponents
+
+
+def timed(fn: Callable[[int], object], repeats: int) -> Dict:
+    """Latency summary of ``fn(i)`` for ``i`` in ``range(repeats)``, after one warm-up call."""
+    fn(0)
+    latencies = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        fn(i)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latency_summary(latencies)
+
+
+def encode_results(encoder, repeats: int, batch_sizes: List[int]) -> List[Dict]:
+    results = []
+    for batch_size in batch_sizes:
+        texts = [QUERIES[i % len(QUERIES)] for i in range(batch_size)]
+        results.append(
+            {
+                "stage": "encode",
+                "encoder": encoder.model_id,
+                "batch_size": batch_size,
+                **timed(lambda _: encoder.encode(texts, convert_to_numpy=True), repeats),
+            }
+        )
+    return results
+
+
+def build_snapshot(rows_count: int) -> Tuple[IndexSnapshot, Dict]:
+    """A warmed snapshot of ``rows_count`` synthetic projects, and how long each part took."""
+    timings = {}
+    start = time.perf_counter()
+    vectors = synthetic_catalogue(rows_count, DIMENSION)
+    rows = synthetic_rows(rows_count)
+    ids = np.array([row["id"] for row in rows], dtype=np.int64)
+    timings["generate_seconds"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = build_index(INDEX_CONFIG, vectors, ids)
+    timings["index_build_seconds"] = time.perf_counter() - start
+
+    snapshot = IndexSnapshot(
+        index=index,
+        ids=ids,
+        embeddings=vectors,
+        hashes=[""] * rows_count,
+        rows={row["id"]: row for row in rows},
+        generation=1,
+    )
+    for part in ("filters", "lexical", "metadata", "suggestions"):
+        start = time.perf_counter()
+        getattr(snapshot, part)
+        timings[f"{part}_build_seconds"] = time.perf_counter() - start
+    return snapshot, {k: round(v, 3) for k, v in timings.items()}
+
+
+def stage_results(snapshot: IndexSnapshot, repeats: int, k: int, encoder) -> List[Dict]:
+    """Latency of each search stage, one query at a time, against ``snapshot``."""
+    queries = queries_near(snapshot.embeddings, repeats + 1)
+    texts = [QUERIES[i % len(QUERIES)] for i in range(repeats + 1)]
+    unfiltered = {}
+    for i, query in enumerate(queries):
+        distances, labels = rank_vectors(snapshot, query[None, :], k)
+        unfiltered[i] = (distances[0], labels[0])
+    filters = {"funding_complete": False}
+    mask = snapshot.filters.mask(filters)
+
+    stages = {
+        "faiss": lambda i: rank_vectors(snapshot, queries[i][None, :], k),
+        "faiss_filtered": lambda i: rank_vectors(snapshot, queries[i][None, :], k, filters),
+        "filter_mask": lambda i: snapshot.filters.mask(filters),
+        "bm25_fuse": lambda i: fuse_keyword_hits(
+            snapshot, texts[i], queries[i], *unfiltered[i], k, mask
+        ),
+        "build_page_json": lambda i: build_page(
+            snapshot, *unfiltered[i], k, sorted_by_score=False, raw_json=True
+        ),
+        "build_page_dicts": lambda i: build_page(
+            snapshot, *unfiltered[i], k, sorted_by_score=False
+        ),
+        # Typeahead as the user types: prefixes of 1 to 6 characters
+        "suggest": lambda i: snapshot.suggestions.complete(texts[i][: 1 + i % 6]),
+    }
+    if encoder is not None:
+
+        def full_search(i):
+            # Cold query embedding each time, so this includes the encode
+            query_cache.clear()
+            return search_charities_batch([SearchJob(texts[i], k=k, raw_json=True)])
+
+        stages["search_charities"] = full_search
+
+    return [{"stage": name, **timed(fn, repeats)} for name, fn in stages.items()]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Per-stage latency of search_charities on synthetic catalogues"
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 1_000, 10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--k", type=int, default=DEFAULT_K)
+    parser.add_argument("--encode-batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument(
+        "--no-encoder",
+        action="store_true",
+        help="Skip the encoder and full-search stages (no model download needed)",
+    )
+    parser.add_argument("--output", default="benchmark-micro.json")
+    args = parser.parse_args()
+
+    encoder = None if args.no_encoder else load_search_encoder()
+    # search_charities reads the model and index from the search service
+    index_manager = SimpleNamespace(snapshot=None)
+    search_service.refresh_interval = 0
+    search_service.initialize = lambda: SearchComponents(model=encoder, index_manager=index_manager)
+    search_service.warm_up()
+
+    results = []
+    if encoder is not None:
+        results += encode_results(encoder, args.repeats, args.encode_batch_sizes)
+    for rows in args.sizes:
+        snapshot, build_timings = build_snapshot(rows)
+        index_manager.snapshot = snapshot
+        context = {"rows": rows, "index": index_kind(snapshot.index), **build_timings}
+        for row in stage_results(snapshot, args.repeats, args.k, encoder):
+            results.append({**context, **row})
+            print(json.dumps(results[-1]))
+
+    write_report(args.output, "micro", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# Ranking quality and latency of single-vector, multi-vector and re-ranked search
+# on a labelled query set:
+#   python -m benchmarks.relevance --output relevance.json
+#   python -m benchmarks.relevance --labels my_labels.json --rerank-model ""
+# Labelled projects may carry overview/objective/category like real rows; the
+# bundled calibration set only has titles and short descriptions, so there the
+# multi-vector gain comes from the title/category passage alone.
+import argparse
+import json
+import math
+import time
+from types import SimpleNamespace
+from typing import Dict, List
+
+from benchmarks.common import latency_summary, write_report
+from search.index_manager import CharityIndexManager
+from search.passages import PassageConfig
+from search.rerank import CrossEncoderReranker
+from search.search_charities import (
+    INDEX_CONFIG,
+    RETRIEVAL_MODE,
+    load_search_encoder,
+    passage_budget,
+    search_charities,
+    search_service,
+)
+from search.service import SearchComponents
+
+
+def ranking_metrics(ranked: List[int], relevant: List[int], k: int) -> Dict[str, float]:
+    """Recall@1/@5/@k, reciprocal rank and nDCG@k of one ranked id list."""
+    relevant = set(relevant)
+    if not relevant:
+        return {}
+    gains = [1.0 if pid in relevant else 0.0 for pid in ranked[:k]]
+    dcg = sum(gain / math.log2(rank + 2) for rank, gain in enumerate(gains))
+    ideal = sum(1.0 / math.log2(rank + 2) for rank in range(min(k, len(relevant))))
+    first = next((rank for rank, pid in enumerate(ranked) if pid in relevant), None)
+    return {
+        "recall@1": len(relevant & set(ranked[:1])) / len(relevant),
+        "recall@5": len(relevant & set(ranked[:5])) / len(relevant),
+        f"recall@{k}": len(relevant & set(ranked[:k])) / len(relevant),
+        "mrr": 0.0 if first is None else 1.0 / (first + 1),
+        f"ndcg@{k}": dcg / ideal,
+    }
+
+
+def evaluate(queries: List[Dict], k: int, repeats: int) -> Dict:
+    totals: Dict[str, float] = {}
+    latencies = []
+    for _ in range(repeats):
+        for labelled in queries:
+            start = time.perf_counter()
+            results = search_charities(labelled["query"], k=k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if len(latencies) <= len(queries):
+                ranked = [result["id"] for result in results]
+                for name, value in ranking_metrics(ranked, labelled["relevant"], k).items():
+                    totals[name] = totals.get(name, 0.0) + value
+    scored = sum(1 for labelled in queries if labelled["relevant"])
+    return {
+        **{name: round(value / scored, 4) for name, value in totals.items()},
+        **latency_summary(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Relevance of single- vs multi-vector search, with and without re-ranking"
+    )
+    parser.add_argument("--labels", default="./data/relevance_labels.json")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=5, help="Timed passes over the queries")
+    parser.add_argument(
+        "--rerank-model",
+        default="cross-encoder/ms-marco-MiniLM-L-6-v2",
+        help="Cross-encoder for the re-ranked variants; empty skips them",
+    )
+    parser.add_argument("--rerank-top-n", type=int, default=20)
+    parser.add_argument("--output", default="benchmark-relevance.json")
+    args = parser.parse_args()
+
+    with open(args.labels) as f:
+        labelled = json.load(f)
+    projects, queries = labelled["projects"], labelled["queries"]
+
+    encoder = load_search_encoder()
+    snapshots = {}
+    for mode, passage_config in (("single", None), ("multi", PassageConfig.from_env())):
+        manager = CharityIndexManager(
+            encoder,
+            lambda: [projects],
+            encoder.model_id,
+            index_config=INDEX_CONFIG,
+            passage_config=passage_config,
+        )
+        manager.refresh()
+        snapshots[mode] = manager.snapshot
+
+    reranker = None
+    if args.rerank_model:
+        # No budget: measure what full re-ranking of the top N buys
+        reranker = CrossEncoderReranker(args.rerank_model, top_n=args.rerank_top_n)
+    # Likewise every query takes the passage path in multi mode
+    passage_budget.budget_ms = 0
+
+    index_manager = SimpleNamespace(snapshot=None)
+    search_service.refresh_interval = 0
+    search_service.initialize = lambda: SearchComponents(model=encoder, index_manager=index_manager)
+    components = search_service.warm_up()
+
+    results = []
+    for mode, snapshot in snapshots.items():
+        for rerank in ([False, True] if reranker else [False]):
+            index_manager.snapshot = snapshot
+            components.reranker = reranker if rerank else None
+            result = {
+                "mode": mode,
+                "rerank": rerank,
+                "retrieval": RETRIEVAL_MODE,
+                "vectors": snapshot.passages.size if snapshot.passages else snapshot.size,
+                **evaluate(queries, args.k, args.repeats),
+            }
+            results.append(result)
+            print(json.dumps(result))
+
+    write_report(args.output, "relevance", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
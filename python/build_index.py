@@ -0,0 +1,39 @@
+import argparse
+import os
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from search.search_charities import CACHE_DIR, build_index_manager, load_search_encoder
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the search index and publish it for SEARCH_INDEX_MODE=shared workers"
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=float(os.getenv("SEARCH_REFRESH_INTERVAL", "300")),
+        help="Seconds between refreshes; 0 builds once and exits",
+    )
+    args = parser.parse_args()
+    if not CACHE_DIR:
+        raise SystemExit("SEARCH_CACHE_DIR must be set so workers can attach to the index")
+
+    index_manager = build_index_manager(load_search_encoder())
+    index_manager.load_cache()
+    while True:
+        try:
+            print(f"Published search index: {index_manager.refresh()}")
+        except Exception as e:
+            print(f"Search index refresh failed: {e}")
+        if args.interval <= 0:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+from search.calibration import fit_calibrator
+from search.encoders import BACKENDS, load_encoder
+from search.index_factory import l2_normalize
+from search.index_manager import embedding_text
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fit the cosine-similarity confidence curve on labelled queries"
+    )
+    parser.add_argument("--labels", default="./data/relevance_labels.json")
+    parser.add_argument("--output", default="./data/confidence_calibration.json")
+    parser.add_argument(
+        "--backend", default=os.getenv("SEARCH_ENCODER_BACKEND", "torch"), choices=BACKENDS
+    )
+    parser.add_argument("--onnx-dir", default=os.getenv("SEARCH_ONNX_DIR") or None)
+    args = parser.parse_args()
+
+    with open(args.labels) as f:
+        labelled = json.load(f)
+    projects = labelled["projects"]
+    queries = labelled["queries"]
+
+    encoder = load_encoder(args.backend, MODEL_NAME, onnx_dir=args.onnx_dir)
+    project_vecs = l2_normalize(encoder.encode([embedding_text(p) for p in projects]))
+    query_vecs = l2_normalize(encoder.encode([q["query"] for q in queries]))
+
+    similarities = (query_vecs @ project_vecs.T).ravel()
+    labels = np.array(
+        [p["id"] in q["relevant"] for q in queries for p in projects], dtype=np.float64
+    )
+    calibrator = fit_calibrator(similarities, labels, encoder.model_id)
+    calibrator.save(args.output)
+
+    predicted = calibrator.predict(similarities) >= 0.5
+    accuracy = float((predicted == labels.astype(bool)).mean())
+    print(
+        json.dumps(
+            {
+                "pairs": len(labels),
+                "positives": int(labels.sum()),
+                "slope": round(calibrator.slope, 4),
+                "intercept": round(calibrator.intercept, 4),
+                "similarity_at_0.5": round(-calibrator.intercept / calibrator.slope, 4),
+                "accuracy_at_0.5": round(accuracy, 4),
+                "output": args.output,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
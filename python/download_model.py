@@ -1,9 +1,92 @@
+import argparse
+import json
+import os
+
 from sentence_transformers import SentenceTransformer
 
+from search.encoders import (
+    ONNX_INT8_MODEL_FILE,
+    ONNX_MANIFEST_FILE,
+    ONNX_MODEL_FILE,
+    default_onnx_dir,
+)
+
 # Specify the model name and local directory
 model_name = "all-MiniLM-L6-v2"
 save_path = "./models"  # Directory to save the model
 
-# Download and save the model
-model = SentenceTransformer(model_name, cache_folder=save_path)
-print(f"Model '{model_name}' downloaded and saved to '{save_path}'")
+
+def export_onnx(
+    model: SentenceTransformer, model_name: str, output_dir: str, quantize: bool = True
+):
+    """
+    Export the transformer to ONNX, plus an int8 dynamically quantized copy.
+
+    Pooling and normalization stay outside the graph and are redone by
+    ``search.encoders.OnnxEncoder`` from the manifest written alongside.
+    """
+    import torch
+    from sentence_transformers.models import Normalize, Pooling
+
+    pooling = next(m for m in model if isinstance(m, Pooling))
+    if pooling.get_pooling_mode_str() != "mean":
+        raise ValueError(f"Only mean pooling is supported, got {pooling.get_pooling_mode_str()}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = model.tokenizer
+    tokenizer.save_pretrained(output_dir)
+
+    transformer = model[0].auto_model.eval()
+    dummy = tokenizer(["DermaNow charity search"], return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(dummy[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+    print(f"ONNX model written to '{model_path}'")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        int8_path = os.path.join(output_dir, ONNX_INT8_MODEL_FILE)
+        quantize_dynamic(model_path, int8_path, weight_type=QuantType.QInt8)
+        print(f"Quantized model written to '{int8_path}'")
+
+    manifest = {
+        "model_name": model_name,
+        "dimension": model.get_sentence_embedding_dimension(),
+        "max_seq_length": model.max_seq_length,
+        "normalize": any(isinstance(m, Normalize) for m in model),
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id,
+    }
+    with open(os.path.join(output_dir, ONNX_MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download the search embedding model")
+    parser.add_argument(
+        "--export-onnx",
+        action="store_true",
+        help="Also export ONNX and int8 ONNX copies for SEARCH_ENCODER_BACKEND=onnx/onnx-int8",
+    )
+    parser.add_argument("--no-quantize", action="store_true", help="Skip the int8 export")
+    parser.add_argument("--onnx-dir", default=default_onnx_dir(model_name))
+    args = parser.parse_args()
+
+    # Download and save the model
+    model = SentenceTransformer(model_name, cache_folder=save_path)
+    print(f"Model '{model_name}' downloaded and saved to '{save_path}'")
+
+    if args.export_onnx:
+        export_onnx(model, model_name, args.onnx_dir, quantize=not args.no_quantize)
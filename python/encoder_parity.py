@@ -0,0 +1,134 @@
+import argparse
+import json
+import resource
+import time
+
+import numpy as np
+
+from search.encoders import BACKENDS, load_encoder
+from search.index_manager import embedding_text
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Small built-in catalogue so the check runs without Supabase
+SAMPLE_PROJECTS = [
+    {"title": "Clean Water for Rural Kelantan", "description": "Building tube wells and filtration systems for villages without safe drinking water."},
+    {"title": "Meals for Orphans", "description": "Daily nutritious meals for children living in orphanages across Selangor."},
+    {"title": "School Renovation in Sabah", "description": "Repairing classrooms, roofs and toilets at a rural primary school."},
+    {"title": "Dialysis Support Fund", "description": "Covering dialysis treatment costs for low-income kidney patients."},
+    {"title": "Flood Relief Kits", "description": "Emergency food packs, blankets and hygiene kits for families displaced by floods."},
+    {"title": "Quran Learning Centre", "description": "Funding teachers and materials for a community Quran and literacy class."},
+    {"title": "Mosque Solar Panels", "description": "Installing solar panels to cut electricity bills at a village mosque."},
+    {"title": "Scholarships for B40 Students", "description": "University scholarships for students from low-income households."},
+    {"title": "Mobile Health Clinic", "description": "A van-based clinic bringing checkups and vaccines to remote communities."},
+    {"title": "Refugee Education Programme", "description": "Classes in English, maths and vocational skills for refugee youth."},
+    {"title": "Elderly Care Home Upgrade", "description": "New beds, wheelchairs and a kitchen for a home caring for senior citizens."},
+    {"title": "Food Bank Expansion", "description": "A cold room and delivery van so the food bank can rescue more surplus food."},
+    {"title": "Tech for All Laptops", "description": "Refurbished laptops and internet access for students studying from home."},
+    {"title": "Shelter Plus Housing", "description": "Transitional housing and job support for homeless families in Kuala Lumpur."},
+    {"title": "Waqf Hospital Ward", "description": "Endowing a hospital ward that treats patients regardless of ability to pay."},
+    {"title": "Green Earth Tree Planting", "description": "Planting mangroves to protect coastal villages from erosion."},
+]
+
+SAMPLE_QUERIES = [
+    "I want to help kids get food",
+    "clean drinking water",
+    "support education for poor students",
+    "medical treatment for patients",
+    "disaster relief after floods",
+    "help the elderly",
+    "environment and climate",
+    "homeless families",
+    "islamic learning",
+    "computers for students",
+]
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def timed_encode(encoder, texts, repeats):
+    encoder.encode(texts[:1])  # warm up
+    latencies = []
+    for _ in range(repeats):
+        for text in texts:
+            start = time.perf_counter()
+            encoder.encode([text])
+            latencies.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(latencies, 50)), float(np.percentile(latencies, 99))
+
+
+def top_k(query_vecs, corpus_vecs, k):
+    distances = ((query_vecs[:, None, :] - corpus_vecs[None, :, :]) ** 2).sum(axis=2)
+    return np.argsort(distances, axis=1)[:, :k]
+
+
+def cosine(a, b):
+    a = a / np.clip(np.linalg.norm(a, axis=1, keepdims=True), 1e-12, None)
+    b = b / np.clip(np.linalg.norm(b, axis=1, keepdims=True), 1e-12, None)
+    return (a * b).sum(axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare embedding backends against the torch reference"
+    )
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--onnx-dir", default=None)
+    parser.add_argument("--corpus", help="JSON list of rows with title and description")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = SAMPLE_PROJECTS
+    if args.corpus:
+        with open(args.corpus) as f:
+            rows = json.load(f)
+    corpus = [embedding_text(row) for row in rows]
+    k = min(args.k, len(corpus))
+
+    # Load the lightest backends first so the peak RSS deltas are attributable
+    order = sorted(args.backends, key=lambda b: ["onnx-int8", "onnx", "torch"].index(b))
+    report = {}
+    outputs = {}
+    for backend in order:
+        before = peak_rss_mb()
+        start = time.perf_counter()
+        encoder = load_encoder(backend, MODEL_NAME, onnx_dir=args.onnx_dir)
+        load_seconds = time.perf_counter() - start
+        outputs[backend] = (
+            np.asarray(encoder.encode(corpus), dtype=np.float32),
+            np.asarray(encoder.encode(SAMPLE_QUERIES), dtype=np.float32),
+        )
+        p50, p99 = timed_encode(encoder, SAMPLE_QUERIES, args.repeats)
+        report[backend] = {
+            "load_seconds": round(load_seconds, 3),
+            "peak_rss_delta_mb": round(peak_rss_mb() - before, 1),
+            "query_encode_p50_ms": round(p50, 3),
+            "query_encode_p99_ms": round(p99, 3),
+        }
+
+    if "torch" in outputs:
+        ref_corpus, ref_queries = outputs["torch"]
+        ref_top = top_k(ref_queries, ref_corpus, k)
+        for backend, (corpus_vecs, query_vecs) in outputs.items():
+            if backend == "torch":
+                continue
+            sims = cosine(np.vstack([corpus_vecs, query_vecs]), np.vstack([ref_corpus, ref_queries]))
+            hits = top_k(query_vecs, corpus_vecs, k)
+            overlap = [len(set(a) & set(b)) / k for a, b in zip(hits, ref_top)]
+            report[backend].update(
+                {
+                    "cosine_mean": round(float(sims.mean()), 5),
+                    "cosine_min": round(float(sims.min()), 5),
+                    f"top{k}_overlap_mean": round(float(np.mean(overlap)), 3),
+                    f"top{k}_overlap_min": round(float(np.min(overlap)), 3),
+                }
+            )
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# Multi-worker deployment:
+#   SEARCH_INDEX_MODE=shared SEARCH_CACHE_DIR=/dev/shm/dermanow-search python build_index.py &
+#   SEARCH_INDEX_MODE=shared SEARCH_CACHE_DIR=/dev/shm/dermanow-search gunicorn main:app
+# The builder publishes each index generation; workers memory-map it read-only.
+import gc
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app in the master so the encoder can be loaded once before forking
+preload_app = True
+
+
+def on_starting(server):
+    # Torch weights are shared copy-on-write as long as no inference runs
+    # before the fork. ONNX Runtime sessions own thread pools that don't
+    # survive a fork, so those are created per worker instead.
+    from search.search_charities import ENCODER_BACKEND, load_search_encoder
+
+    if ENCODER_BACKEND == "torch":
+        load_search_encoder()
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far out of the GC's reach; otherwise the
+    # collector's bookkeeping writes touch every page and undo copy-on-write
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    # With PROMETHEUS_MULTIPROC_DIR set (an empty directory, exported before
+    # gunicorn starts), /metrics aggregates all workers; drop a dead worker's
+    # live gauges so its in-flight count doesn't linger
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
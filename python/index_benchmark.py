@@ -0,0 +1,118 @@
+import argparse
+import json
+import time
+
+import faiss
+import numpy as np
+
+from search.index_factory import IndexConfig, build_index, index_kind, search_parameters
+
+DIMENSION = 384  # all-MiniLM-L6-v2
+
+
+def synthetic_catalogue(rows: int, dimension: int, seed: int = 0) -> np.ndarray:
+    """
+    Unit-norm vectors drawn around a few hundred topic centres.
+
+    Uniform random vectors have no neighbourhood structure and make every ANN
+    index look bad; clustered data is closer to real sentence embeddings.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((max(8, int(np.sqrt(rows))), dimension)).astype(np.float32)
+    vectors = np.empty((rows, dimension), dtype=np.float32)
+    for start in range(0, rows, 100_000):
+        stop = min(rows, start + 100_000)
+        topic = rng.integers(0, len(centres), stop - start)
+        noise = rng.standard_normal((stop - start, dimension)).astype(np.float32)
+        vectors[start:stop] = centres[topic] + 0.6 * noise
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def queries_near(vectors: np.ndarray, count: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    picks = vectors[rng.integers(0, len(vectors), count)]
+    queries = picks + 0.3 * rng.standard_normal(picks.shape).astype(np.float32)
+    return (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+
+def index_bytes(index: faiss.Index) -> int:
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def measure(index, config, queries, truth, k):
+    params = search_parameters(index, config)
+    latencies = []
+    labels = np.empty((len(queries), k), dtype=np.int64)
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, found = index.search(query[None, :], k, params=params)
+        latencies.append((time.perf_counter() - start) * 1000)
+        labels[i] = found[0]
+    recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(labels, truth)])
+    return {
+        "recall_at_k": round(float(recall), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 4),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Recall, latency and memory of ANN index types against flat search"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.sizes:
+        vectors = synthetic_catalogue(rows, DIMENSION)
+        ids = np.arange(rows, dtype=np.int64)
+        queries = queries_near(vectors, args.queries)
+
+        flat_config = IndexConfig("flat")
+        flat = build_index(flat_config, vectors, ids)
+        _, truth = flat.search(queries, args.k)
+
+        runs = [(flat_config, {})]
+        runs += [(IndexConfig("hnsw", ef_search=ef), {"ef_search": ef}) for ef in args.ef_search]
+        runs += [(IndexConfig("ivfpq", nprobe=n), {"nprobe": n}) for n in args.nprobe]
+
+        built = {}
+        for config, knobs in runs:
+            if config.effective_type(rows) != config.index_type:
+                # build_index would fall back to flat, so there is nothing to measure
+                print(
+                    f"Skipping {config.index_type} at {rows} rows, "
+                    f"below its minimum of {config.ivfpq_min_rows}"
+                )
+                continue
+            # Search-time knobs don't change the index, so build each type once
+            if config.index_type not in built:
+                start = time.perf_counter()
+                index = flat if config.index_type == "flat" else build_index(config, vectors, ids)
+                built[config.index_type] = (index, time.perf_counter() - start)
+            index, build_seconds = built[config.index_type]
+            row = {
+                "rows": rows,
+                "index": index_kind(index),
+                **knobs,
+                "build_seconds": round(build_seconds, 3),
+                "index_mb": round(index_bytes(index) / 2**20, 2),
+                **measure(index, config, queries, truth, args.k),
+            }
+            results.append(row)
+            print(json.dumps(row))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,37 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
-from api.chatbot import chatbot_app
-from search.search_charities import search_charities
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
+from contextlib import asynccontextmanager
+from api.chatbot import (
+    chat_embedding_cache,
+    chatbot_app,
+    completion_cache,
+    history_manager,
+)
+from api.dependencies import require_search_ready
+from search.batcher import SearchJob
+from search.metadata_store import dumps
+from search.suggest import MAX_SUGGESTIONS
+from search.telemetry import (
+    StatsCollector,
+    TelemetryMiddleware,
+    register_collector,
+    render_metrics,
+    span,
+)
+from search.search_charities import (
+    cached_search,
+    query_cache,
+    result_cache,
+    search_result_key,
+    search_service,
+    search_batcher,
+)
 from dotenv import load_dotenv
+import asyncio
+import hashlib
 import os
 
 # Load environment variables
@@ -12,9 +39,22 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     raise ValueError("OPENAI_API_KEY not found in environment variables")
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the index in the background so the server starts serving liveness
+    # probes immediately; it then stays in sync with Supabase while the server is up
+    search_service.start()
+    search_batcher.start()
+    yield
+    await search_batcher.stop()
+    search_service.stop()
+
 
 # Initialize main FastAPI app
-app = FastAPI(title="DermaNow API")
+app = FastAPI(title="DermaNow API", lifespan=lifespan)
 
 # Enable CORS for frontend
 app.add_middleware(
@@ -25,13 +65,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so its timings cover CORS and the mounted chatbot app too
+app.add_middleware(TelemetryMiddleware)
+
 # Mount chatbot routes
 app.mount("/chatbot", chatbot_app)
 
+CACHE_STATS = {
+    "query_embeddings": query_cache.stats,
+    "search_results": result_cache.stats,
+    "chat_embeddings": chat_embedding_cache.stats,
+    "chat_completions": completion_cache.stats,
+    "chat_history_summaries": history_manager.stats,
+}
+register_collector(StatsCollector(CACHE_STATS, search_service.status))
+
 
 # Pydantic models for search endpoint
+class SearchFilters(BaseModel):
+    category: Optional[List[str]] = None
+    location: Optional[List[str]] = None
+    verified: Optional[bool] = None
+    funding_complete: Optional[bool] = None
+
+
 class SearchRequest(BaseModel):
     query: str
+    k: int = Field(10, ge=1, le=100)
+    offset: int = Field(0, ge=0)
+    min_confidence: float = Field(0.0, ge=0.0, le=1.0)
+    filters: Optional[SearchFilters] = None
 
 
 class ImpactStat(BaseModel):
@@ -73,22 +136,144 @@ class SearchResponse(BaseModel):
     confidence: float
 
 
-@app.post("/search", response_model=List[SearchResponse])
-async def search_endpoint(request: SearchRequest):
+@app.post(
+    "/search",
+    response_model=List[SearchResponse],
+    dependencies=[Depends(require_search_ready)],
+)
+async def search_endpoint(
+    request: SearchRequest, if_none_match: Optional[str] = Header(None)
+):
     """
     Semantic search for DermaNow charities based on a user query.
 
     Args:
-        request (SearchRequest): Contains the search query.
+        request (SearchRequest): Contains the search query, page parameters and filters.
 
     Returns:
-        List[SearchResponse]: List of all matching charities with metadata and confidence scores.
+        List[SearchResponse]: One page of matching charities with metadata and confidence scores.
+        The page is assembled from JSON fragments serialized when the index was
+        built, so it skips per-request model validation. Pages are cached per
+        index snapshot; the ETag changes whenever the index is refreshed, and a
+        matching ``If-None-Match`` gets a 304 without running the search. A
+        page ranked without passages, because the server was busy, carries
+        its own ETag, so it is revalidated into the full ranking later.
+    """
+    job = SearchJob(
+        request.query,
+        k=request.k,
+        offset=request.offset,
+        min_confidence=request.min_confidence,
+        filters=request.filters.model_dump(exclude_none=True) if request.filters else None,
+    )
+    key = search_result_key(job)
+    if etag_matches(if_none_match, result_etag(key)):
+        return Response(status_code=304, headers=search_headers(key))
+
+    # A page from the single-vector fallback comes back with its own key and ETag
+    body, key = await cached_search(job, key)
+    return Response(content=body, media_type="application/json", headers=search_headers(key))
+
+
+SuggestionType = Literal["title", "organization", "category", "location"]
+
+
+class SuggestionResponse(BaseModel):
+    text: str
+    type: SuggestionType
+    count: int
+    project_id: Optional[int] = None
+
+
+@app.get(
+    "/suggest",
+    response_model=List[SuggestionResponse],
+    dependencies=[Depends(require_search_ready)],
+)
+async def suggest_endpoint(
+    q: str = Query(..., max_length=200),
+    limit: int = Query(8, ge=1, le=MAX_SUGGESTIONS),
+    types: Optional[List[SuggestionType]] = Query(None),
+):
+    """
+    Typeahead completions for the search box.
+
+    Matches project titles, organization names, categories and locations
+    containing a word that starts with ``q``, from a prefix index rebuilt with
+    every index refresh. No embedding is computed, so it is cheap enough to
+    call on every keystroke; ``title`` suggestions carry their ``project_id``.
+    """
+    snapshot = search_service.components.index_manager.snapshot
+    with span("suggest.complete"):
+        suggestions = snapshot.suggestions.complete(q, limit, types)
+    return Response(
+        content=dumps(suggestions),
+        media_type="application/json",
+        headers={"Cache-Control": "max-age=60"},
+    )
+
+
+def result_etag(key: str) -> str:
+    return f'"{hashlib.sha1(key.encode()).hexdigest()[:20]}"'
+
+
+def search_headers(key: str) -> Dict[str, str]:
+    return {"ETag": result_etag(key), "Cache-Control": "no-cache"}
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """403 unless the request carries ``ADMIN_API_TOKEN`` in ``X-Admin-Token``."""
+    if not ADMIN_API_TOKEN or x_admin_token != ADMIN_API_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.post("/admin/refresh-index", dependencies=[Depends(require_admin)])
+async def refresh_index_endpoint():
+    """
+    Re-sync the search index with the charity_projects table.
+
+    Only added or edited projects are re-encoded; searches keep using the
+    previous index until the refreshed one is swapped in.
     """
-    results = search_charities(request.query)
-    return results
+    require_search_ready()
+    return await asyncio.to_thread(search_service.components.index_manager.refresh)
 
 
-# Health check
+@app.get("/cache/stats", dependencies=[Depends(require_admin)])
+async def cache_stats_endpoint():
+    """Hit, miss and eviction counters for the search and chat caches."""
+    return {name: stats() for name, stats in CACHE_STATS.items()}
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """
+    Prometheus metrics: request and per-stage latency histograms, in-flight
+    requests, search batch sizes, OpenAI token usage, cache counters and index size.
+    """
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+# Health check; /health is kept as an alias of the liveness probe
 @app.get("/health")
+@app.get("/health/live")
 async def health_check():
+    """Liveness: the process is up and serving requests."""
     return {"status": "healthy"}
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: 200 once the search index is built, 503 while it warms up."""
+    status = search_service.status()
+    if not search_service.ready:
+        return JSONResponse(status_code=503, content=status)
+    return status
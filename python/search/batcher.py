@@ -0,0 +1,168 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable, Dict, List, Optional, Set, Tuple, Union
+
+from search.service import SearchNotReady
+
+
+@dataclass
+class SearchJob:
+    query: str
+    k: int = 10
+    offset: int = 0
+    min_confidence: float = 0.0
+    filters: Optional[Dict] = None
+    # Return the page as serialized JSON bytes (and its ranking mode) instead of a list of dicts
+    raw_json: bool = False
+
+    @property
+    def filters_key(self) -> str:
+        """Jobs with the same key can share one filtered FAISS search."""
+        return json.dumps(self.filters or {}, sort_keys=True)
+
+
+@dataclass
+class _PendingSearch:
+    job: SearchJob
+    future: asyncio.Future = field(repr=False)
+
+
+class SearchBatcher:
+    """
+    Coalesces concurrent searches into batched encode and FAISS calls.
+
+    Requests arriving within ``max_wait_ms`` of each other (up to
+    ``max_batch_size``) are handed to ``process_batch`` together on a worker
+    thread, so the event loop never blocks on the transformer or FAISS and
+    the model sees one large batch instead of many single queries. Both
+    release the GIL, so several batches can run in parallel on a multi-core
+    box.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[SearchJob]], List[Union[List[Dict], bytes]]],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5,
+        max_workers: int = 4,
+    ):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.max_workers = max(1, max_workers)
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        # The loop only keeps weak references to tasks; hold in-flight batches here
+        self._dispatches: Set[asyncio.Task] = set()
+
+    def start(self):
+        """Start collecting batches on the running event loop."""
+        if self._task and not self._task.done():
+            return
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="search-batch"
+        )
+        self._task = asyncio.create_task(self._collect())
+
+    async def stop(self):
+        """
+        Stop batching; every search still waiting fails with ``SearchNotReady``.
+
+        That covers requests still queued, a batch the collector was filling
+        and batches in flight, so no ``submit`` caller is left hanging.
+        """
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._queue:
+            queued = []
+            while not self._queue.empty():
+                queued.append(self._queue.get_nowait())
+            _fail(queued)
+        dispatches = list(self._dispatches)
+        for task in dispatches:
+            task.cancel()
+        await asyncio.gather(*dispatches, return_exceptions=True)
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def submit(self, job: SearchJob) -> Union[List[Dict], Tuple[bytes, str]]:
+        """
+        Queue a search and wait for its page of results.
+
+        With ``raw_json`` set that is the JSON bytes and the ranking mode
+        ``process_batch`` reports alongside them.
+        """
+        if not self._task or self._task.done():
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_PendingSearch(job, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch: List[_PendingSearch] = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                # Wait for a free worker so queued requests keep batching up meanwhile
+                await self._slots.acquire()
+                task = asyncio.create_task(self._dispatch(batch))
+                self._dispatches.add(task)
+                task.add_done_callback(partial(self._dispatch_done, batch))
+                batch = []
+        except asyncio.CancelledError:
+            _fail(batch)
+            raise
+
+    def _dispatch_done(self, batch: List[_PendingSearch], task: asyncio.Task):
+        # Runs even for a task cancelled before it started, so the slot is always returned
+        self._slots.release()
+        self._dispatches.discard(task)
+        _fail(batch)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Search batch dispatch failed: {task.exception()!r}")
+
+    async def _dispatch(self, batch: List[_PendingSearch]):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(
+                self._executor, self.process_batch, [p.job for p in batch]
+            )
+        except Exception as e:
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+        else:
+            for pending, result in zip(batch, results):
+                if not pending.future.done():
+                    pending.future.set_result(result)
+
+
+def _fail(batch: List[_PendingSearch]):
+    """Fail the searches in ``batch`` that haven't been answered yet."""
+    for pending in batch:
+        if not pending.future.done():
+            pending.future.set_exception(SearchNotReady("Search batcher stopped"))
@@ -0,0 +1,53 @@
+import threading
+from typing import Dict, Optional
+
+
+class LatencyBudget:
+    """
+    Millisecond budget for an optional search stage whose cost grows with its input.
+
+    ``record`` folds the time per item of each run (queries, candidate pairs,
+    ...) into an exponentially weighted average, and ``items_within`` says how
+    many items fit the budget at that rate, so under load the stage shrinks its
+    work instead of pushing up every request's latency. It never answers less
+    than ``floor``, so the estimate keeps being measured and the stage recovers
+    once the machine is quiet again. A budget of 0 disables the limit.
+    """
+
+    def __init__(self, budget_ms: float, floor: int = 1, alpha: float = 0.2):
+        self.budget_ms = budget_ms
+        self.floor = floor
+        self.alpha = alpha
+        self.ms_per_item: Optional[float] = None
+        self.runs = 0
+        self.trimmed = 0
+        self._lock = threading.Lock()
+
+    def items_within(self, wanted: int) -> int:
+        if self.budget_ms <= 0 or self.ms_per_item is None or wanted <= self.floor:
+            return wanted
+        fits = max(self.floor, int(self.budget_ms / max(self.ms_per_item, 1e-6)))
+        if fits < wanted:
+            with self._lock:
+                self.trimmed += 1
+            return fits
+        return wanted
+
+    def record(self, elapsed_ms: float, items: int):
+        if items <= 0:
+            return
+        cost = elapsed_ms / items
+        with self._lock:
+            self.runs += 1
+            if self.ms_per_item is None:
+                self.ms_per_item = cost
+            else:
+                self.ms_per_item += self.alpha * (cost - self.ms_per_item)
+
+    def stats(self) -> Dict:
+        return {
+            "budget_ms": self.budget_ms,
+            "ms_per_item": round(self.ms_per_item, 4) if self.ms_per_item is not None else None,
+            "runs": self.runs,
+            "trimmed": self.trimmed,
+        }
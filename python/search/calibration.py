@@ -0,0 +1,67 @@
+import json
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+import numpy as np
+
+
+@dataclass
+class ConfidenceCalibrator:
+    """
+    Logistic curve mapping cosine similarity to a probability of relevance.
+
+    Fitted by ``calibrate_confidence.py`` on the labelled pairs in
+    ``data/relevance_labels.json``. ``model_id`` records which embedding space
+    the curve was fitted in, since similarities aren't comparable across models.
+    """
+
+    slope: float
+    intercept: float
+    model_id: str
+
+    def predict(self, similarities: np.ndarray) -> np.ndarray:
+        logits = self.slope * np.asarray(similarities, dtype=np.float64) + self.intercept
+        return 1.0 / (1.0 + np.exp(-np.clip(logits, -50.0, 50.0)))
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(asdict(self), f, indent=2)
+
+
+def load_calibrator(path: str, model_id: str) -> Optional[ConfidenceCalibrator]:
+    """Load a fitted curve, or None if it is missing or was fitted for another model."""
+    try:
+        with open(path) as f:
+            calibrator = ConfidenceCalibrator(**json.load(f))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Ignoring unusable confidence calibration {path}: {e}")
+        return None
+    if calibrator.model_id != model_id:
+        print(
+            f"Ignoring confidence calibration fitted for {calibrator.model_id}, not {model_id}"
+        )
+        return None
+    return calibrator
+
+
+def fit_calibrator(
+    similarities: np.ndarray, labels: np.ndarray, model_id: str, iterations: int = 50
+) -> ConfidenceCalibrator:
+    """Fit a one-feature logistic regression with Newton's method."""
+    x = np.column_stack([np.asarray(similarities, dtype=np.float64), np.ones(len(labels))])
+    y = np.asarray(labels, dtype=np.float64)
+    weights = np.zeros(2)
+    for _ in range(iterations):
+        p = 1.0 / (1.0 + np.exp(-np.clip(x @ weights, -50.0, 50.0)))
+        gradient = x.T @ (y - p)
+        # Small ridge term keeps the Hessian invertible on separable data
+        hessian = (x * (p * (1 - p))[:, None]).T @ x + 1e-3 * np.eye(2)
+        step = np.linalg.solve(hessian, gradient)
+        weights += step
+        if np.abs(step).max() < 1e-8:
+            break
+    return ConfidenceCalibrator(
+        slope=float(weights[0]), intercept=float(weights[1]), model_id=model_id
+    )
@@ -0,0 +1,181 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import List, Optional, Union
+
+import numpy as np
+
+# Backends selectable with SEARCH_ENCODER_BACKEND
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+# Files written by ``download_model.py --export-onnx``
+ONNX_MANIFEST_FILE = "encoder.json"
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_MODEL_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+def default_onnx_dir(model_name: str) -> str:
+    return os.path.join("./models", "onnx", model_name)
+
+
+class Encoder(ABC):
+    """
+    Sentence encoder used by the search index and query path.
+
+    Backends mirror the slice of the ``SentenceTransformer`` API the search
+    code relies on (``encode`` and ``get_sentence_embedding_dimension``), so
+    the index manager and query cache don't care which one is loaded.
+    ``model_id`` names the embedding space and keys the on-disk index and
+    query caches, so switching backends never mixes vectors.
+    """
+
+    backend = ""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    @property
+    def model_id(self) -> str:
+        if self.backend == "torch":
+            return self.model_name
+        return f"{self.model_name}+{self.backend}"
+
+    @abstractmethod
+    def get_sentence_embedding_dimension(self) -> int:
+        ...
+
+    @abstractmethod
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        **kwargs,
+    ) -> np.ndarray:
+        ...
+
+
+class TorchEncoder(Encoder):
+    """The reference PyTorch ``SentenceTransformer``."""
+
+    backend = "torch"
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, **kwargs):
+        return self.model.encode(
+            sentences, batch_size=batch_size, convert_to_numpy=True, **kwargs
+        ).astype(np.float32)
+
+
+class OnnxEncoder(Encoder):
+    """
+    ONNX Runtime export of the transformer with mean pooling done in numpy.
+
+    Only ``onnxruntime`` and ``tokenizers`` are imported, so the server skips
+    loading torch entirely. ``quantized`` picks the int8 dynamically quantized
+    graph, which is several times faster and smaller on CPU-only hosts.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        model_dir: Optional[str] = None,
+        quantized: bool = False,
+        num_threads: int = 0,
+    ):
+        super().__init__(model_name)
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.backend = "onnx-int8" if quantized else "onnx"
+        model_dir = model_dir or default_onnx_dir(model_name)
+        with open(os.path.join(model_dir, ONNX_MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        if manifest.get("model_name") != model_name:
+            raise ValueError(
+                f"{model_dir} holds an export of {manifest.get('model_name')}, not {model_name}"
+            )
+        self.dimension = int(manifest["dimension"])
+        self.normalize = bool(manifest.get("normalize", False))
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=int(manifest["max_seq_length"]))
+        self.tokenizer.enable_padding(
+            pad_id=int(manifest.get("pad_token_id", 0)),
+            pad_token=manifest.get("pad_token", "[PAD]"),
+        )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        model_file = ONNX_INT8_MODEL_FILE if quantized else ONNX_MODEL_FILE
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, model_file),
+            options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, **kwargs):
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+        embeddings = np.empty((len(sentences), self.dimension), dtype=np.float32)
+
+        # Encode similar lengths together so batches carry little padding
+        order = np.argsort([-len(s) for s in sentences], kind="stable")
+        for start in range(0, len(sentences), batch_size):
+            batch = order[start : start + batch_size]
+            encodings = self.tokenizer.encode_batch([sentences[i] for i in batch])
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.array(
+                    [e.type_ids for e in encodings], dtype=np.int64
+                )
+            hidden = self.session.run(None, feeds)[0]
+
+            mask = attention_mask[:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.normalize:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            embeddings[batch] = pooled
+
+        return embeddings[0] if single else embeddings
+
+
+def load_encoder(
+    backend: str,
+    model_name: str,
+    onnx_dir: Optional[str] = None,
+    num_threads: int = 0,
+) -> Encoder:
+    """
+    Build the encoder for ``backend`` (``torch``, ``onnx`` or ``onnx-int8``).
+
+    The ONNX backends need the export written by ``download_model.py --export-onnx``.
+    """
+    if backend == "torch":
+        return TorchEncoder(model_name)
+    if backend in ("onnx", "onnx-int8"):
+        return OnnxEncoder(
+            model_name,
+            model_dir=onnx_dir,
+            quantized=backend == "onnx-int8",
+            num_threads=num_threads,
+        )
+    raise ValueError(f"Unknown encoder backend {backend!r}, expected one of {BACKENDS}")
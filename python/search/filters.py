@@ -0,0 +1,114 @@
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+# Fields that search results can be filtered on
+VALUE_FIELDS = ("category", "location")
+FLAG_FIELDS = ("verified", "funding_complete")
+
+
+def normalize_value(value) -> str:
+    return str(value).strip().lower()
+
+
+def _as_values(value) -> Iterable:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return value
+    return [value]
+
+
+class FilterBitmaps:
+    """
+    Precomputed boolean masks over the rows of an index snapshot.
+
+    ``category`` and ``location`` get one mask per distinct (lowercased) value,
+    ``verified`` and ``funding_complete`` one mask each, so combining filters at
+    query time is a handful of vectorised ``&``/``|`` operations instead of a
+    scan over the row dicts.
+
+    ``to_arrays``/``from_arrays`` round-trip the masks through plain numpy
+    arrays, so processes can share one copy memory-mapped from disk.
+    """
+
+    def __init__(self, ids: np.ndarray, rows: Dict[int, Dict]):
+        self.size = len(ids)
+        self.values: Dict[str, Dict[str, np.ndarray]] = {f: {} for f in VALUE_FIELDS}
+        self.flags: Dict[str, np.ndarray] = {
+            f: np.zeros(self.size, dtype=bool) for f in FLAG_FIELDS
+        }
+
+        for pos, pid in enumerate(ids.tolist()):
+            row = rows.get(pid)
+            if row is None:
+                continue
+            for field in VALUE_FIELDS:
+                for value in _as_values(row.get(field)):
+                    bitmap = self.values[field].setdefault(
+                        normalize_value(value), np.zeros(self.size, dtype=bool)
+                    )
+                    bitmap[pos] = True
+            for field in FLAG_FIELDS:
+                self.flags[field][pos] = bool(row.get(field))
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        arrays = {
+            "flags": np.array([self.flags[f] for f in FLAG_FIELDS], dtype=bool).reshape(
+                len(FLAG_FIELDS), self.size
+            )
+        }
+        for field in VALUE_FIELDS:
+            keys = sorted(self.values[field])
+            arrays[f"{field}_keys"] = np.array(keys, dtype=str)
+            arrays[f"{field}_masks"] = np.array(
+                [self.values[field][key] for key in keys], dtype=bool
+            ).reshape(len(keys), self.size)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "FilterBitmaps":
+        """Masks from ``to_arrays`` output; rows of the arrays are used as views, not copied."""
+        bitmaps = cls.__new__(cls)
+        bitmaps.size = arrays["flags"].shape[1]
+        bitmaps.flags = dict(zip(FLAG_FIELDS, arrays["flags"]))
+        bitmaps.values = {
+            field: dict(zip(arrays[f"{field}_keys"].tolist(), arrays[f"{field}_masks"]))
+            for field in VALUE_FIELDS
+        }
+        return bitmaps
+
+    def mask(self, filters: Optional[Dict]) -> Optional[np.ndarray]:
+        """
+        Combine the requested filters into a single row mask.
+
+        Value filters accept a string or a list of strings (any may match);
+        flag filters accept a bool. Unset filters are ignored.
+
+        Returns:
+            Optional[np.ndarray]: Boolean mask over snapshot positions, or None
+            if no filter was applied.
+        """
+        if not filters:
+            return None
+
+        mask = None
+        for field in VALUE_FIELDS:
+            wanted = [normalize_value(v) for v in _as_values(filters.get(field))]
+            if not wanted:
+                continue
+            field_mask = np.zeros(self.size, dtype=bool)
+            for value in wanted:
+                bitmap = self.values[field].get(value)
+                if bitmap is not None:
+                    field_mask |= bitmap
+            mask = field_mask if mask is None else mask & field_mask
+
+        for field in FLAG_FIELDS:
+            wanted = filters.get(field)
+            if wanted is None:
+                continue
+            field_mask = self.flags[field] if wanted else ~self.flags[field]
+            mask = field_mask.copy() if mask is None else mask & field_mask
+
+        return mask
@@ -0,0 +1,237 @@
+import json
+import os
+import shutil
+import uuid
+from typing import Dict, Optional, Set
+
+import faiss
+import numpy as np
+
+from search.filters import FilterBitmaps
+from search.index_factory import index_ids
+from search.lexical import BM25Index
+from search.metadata_store import CharityMetadataStore
+from search.passages import PassageIndex
+from search.suggest import PrefixIndex
+
+# Bump when the on-disk layout changes so old caches are rebuilt, not misread
+CACHE_VERSION = 3
+
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+INDEX_FILE = "index.faiss"
+ROWS_FILE = "rows.json"
+CURRENT_FILE = "CURRENT"
+PASSAGE_VECTORS_FILE = "passages.npy"
+PASSAGE_OWNERS_FILE = "passage_owners.npy"
+PASSAGE_INDEX_FILE = "passages.faiss"
+STORES_DIR = "stores"
+
+# Snapshot attribute -> derived store written with each entry as .npy files
+STORE_TYPES = {
+    "filters": FilterBitmaps,
+    "lexical": BM25Index,
+    "metadata": CharityMetadataStore,
+    "suggestions": PrefixIndex,
+}
+
+
+def current_entry(cache_dir: str) -> Optional[str]:
+    """Name of the entry the ``CURRENT`` pointer refers to, or None if there is none."""
+    try:
+        with open(os.path.join(cache_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def save_index_cache(cache_dir: str, snapshot, model_name: str) -> str:
+    """
+    Write a snapshot's index, embeddings and manifest to a new cache directory.
+
+    A multi-vector passage index, if the snapshot has one, is written
+    alongside; entries without one still load, with ``passages`` unset. So
+    are the derived filter, keyword, metadata and typeahead stores, one
+    ``.npy`` file per array under ``stores/``, for readers to memory-map.
+
+    Every save goes to a fresh subdirectory and the ``CURRENT`` pointer is
+    swapped with ``os.replace`` once all files are on disk, so a crash mid-write
+    never leaves a half-written cache behind. Row metadata is written too, so
+    other processes can serve a generation straight from the cache.
+
+    The previous entry is kept until the next save, so readers that resolved
+    ``CURRENT`` just before the swap can still open it.
+
+    Returns:
+        str: Path of the directory that was written.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    name = f"v{CACHE_VERSION}-{snapshot.generation}-{uuid.uuid4().hex[:8]}"
+    target = os.path.join(cache_dir, name)
+    os.makedirs(target)
+
+    np.save(
+        os.path.join(target, EMBEDDINGS_FILE),
+        np.ascontiguousarray(snapshot.embeddings, dtype=np.float32),
+    )
+    faiss.write_index(snapshot.index, os.path.join(target, INDEX_FILE))
+    manifest = {
+        "version": CACHE_VERSION,
+        "model_name": model_name,
+        "dimension": int(snapshot.embeddings.shape[1]),
+        "generation": snapshot.generation,
+        "ids": [int(pid) for pid in snapshot.ids],
+        "hashes": list(snapshot.hashes),
+    }
+    passages = getattr(snapshot, "passages", None)
+    if passages is not None:
+        np.save(
+            os.path.join(target, PASSAGE_VECTORS_FILE),
+            np.ascontiguousarray(passages.vectors, dtype=np.float32),
+        )
+        np.save(os.path.join(target, PASSAGE_OWNERS_FILE), passages.owners)
+        faiss.write_index(passages.index, os.path.join(target, PASSAGE_INDEX_FILE))
+        manifest["passage_hashes"] = {str(pid): h for pid, h in passages.hashes.items()}
+    for store in STORE_TYPES:
+        store_dir = os.path.join(target, STORES_DIR, store)
+        os.makedirs(store_dir)
+        for key, array in getattr(snapshot, store).to_arrays().items():
+            np.save(os.path.join(store_dir, f"{key}.npy"), array)
+    with open(os.path.join(target, ROWS_FILE), "w") as f:
+        json.dump([snapshot.rows[pid] for pid in manifest["ids"] if pid in snapshot.rows], f)
+    with open(os.path.join(target, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f)
+
+    previous = current_entry(cache_dir)
+    pointer = os.path.join(cache_dir, f".{CURRENT_FILE}.{uuid.uuid4().hex[:8]}")
+    with open(pointer, "w") as f:
+        f.write(name)
+    os.replace(pointer, os.path.join(cache_dir, CURRENT_FILE))
+
+    _remove_stale_entries(cache_dir, keep={name, previous})
+    return target
+
+
+def load_index_cache(
+    cache_dir: str,
+    model_name: str,
+    dimension: int,
+    entry_name: Optional[str] = None,
+    mmap_index: bool = False,
+    load_rows: bool = True,
+    load_passages: bool = True,
+) -> Optional[Dict]:
+    """
+    Load a cache entry (the current one by default), memory-mapping the embedding matrix.
+
+    The derived stores are memory-mapped as well. With ``mmap_index`` the
+    FAISS index is opened read-only and, where the installed FAISS supports
+    it, memory-mapped too, so several processes attached to the same entry
+    share its pages instead of each holding a copy. Readers that serve from
+    the stores alone skip parsing the rows with ``load_rows=False``, and
+    ``load_passages=False`` leaves out the passage index.
+
+    Returns:
+        Optional[Dict]: ``index``, ``ids``, ``embeddings``, ``hashes``,
+        ``rows``, ``generation``, ``passages`` and ``stores`` if the cache
+        exists and is consistent, otherwise None so the caller falls back to
+        a full rebuild.
+    """
+    try:
+        entry_name = entry_name or current_entry(cache_dir)
+        if entry_name is None:
+            return None
+        entry = os.path.join(cache_dir, entry_name)
+        with open(os.path.join(entry, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+
+        if manifest.get("version") != CACHE_VERSION:
+            raise ValueError(f"cache version {manifest.get('version')} != {CACHE_VERSION}")
+        if manifest.get("model_name") != model_name:
+            raise ValueError(f"cache built with {manifest.get('model_name')}, not {model_name}")
+        if manifest.get("dimension") != dimension:
+            raise ValueError(f"cache dimension {manifest.get('dimension')} != {dimension}")
+
+        ids = np.array(manifest["ids"], dtype=np.int64)
+        hashes = manifest["hashes"]
+        embeddings = np.load(os.path.join(entry, EMBEDDINGS_FILE), mmap_mode="r")
+        index_flags = 0
+        if mmap_index:
+            index_flags = faiss.IO_FLAG_READ_ONLY | faiss.IO_FLAG_MMAP
+            index_flags |= getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+        index = faiss.read_index(os.path.join(entry, INDEX_FILE), index_flags)
+
+        if embeddings.dtype != np.float32 or embeddings.shape != (len(ids), dimension):
+            raise ValueError(f"embedding matrix has shape {embeddings.shape}")
+        if len(hashes) != len(ids) or index.ntotal != len(ids) or index.d != dimension:
+            raise ValueError("manifest, embeddings and index disagree on row count")
+        if len(ids) and not np.array_equal(
+            np.sort(index_ids(index)),
+            np.sort(ids),
+        ):
+            raise ValueError("index ids do not match manifest")
+
+        stores = _load_stores(entry, len(ids))
+
+        rows = {}
+        rows_path = os.path.join(entry, ROWS_FILE)
+        if load_rows and os.path.exists(rows_path):
+            with open(rows_path) as f:
+                rows = {int(row["id"]): row for row in json.load(f)}
+
+        passages = None
+        if load_passages and "passage_hashes" in manifest:
+            passages = _load_passages(entry, manifest, dimension, index_flags)
+
+        return {
+            "index": index,
+            "ids": ids,
+            "embeddings": embeddings,
+            "hashes": hashes,
+            "rows": rows,
+            "generation": int(manifest.get("generation", 0)),
+            "passages": passages,
+            "stores": stores,
+        }
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Ignoring unusable search index cache in {cache_dir}: {e}")
+        return None
+
+
+def _load_passages(
+    entry: str, manifest: Dict, dimension: int, index_flags: int
+) -> PassageIndex:
+    vectors = np.load(os.path.join(entry, PASSAGE_VECTORS_FILE), mmap_mode="r")
+    owners = np.load(os.path.join(entry, PASSAGE_OWNERS_FILE))
+    index = faiss.read_index(os.path.join(entry, PASSAGE_INDEX_FILE), index_flags)
+    if vectors.shape != (len(owners), dimension) or index.ntotal != len(owners):
+        raise ValueError("passage vectors, owners and index disagree")
+    hashes = {int(pid): h for pid, h in manifest["passage_hashes"].items()}
+    if set(np.unique(owners).tolist()) != set(hashes):
+        raise ValueError("passage owners do not match manifest")
+    return PassageIndex(index, owners, vectors, hashes)
+
+
+def _load_stores(entry: str, size: int) -> Dict:
+    stores = {}
+    for store, store_type in STORE_TYPES.items():
+        store_dir = os.path.join(entry, STORES_DIR, store)
+        arrays = {
+            name[: -len(".npy")]: np.load(os.path.join(store_dir, name), mmap_mode="r")
+            for name in os.listdir(store_dir)
+            if name.endswith(".npy")
+        }
+        stores[store] = store_type.from_arrays(arrays)
+    for store in ("filters", "lexical", "metadata"):
+        if stores[store].size != size:
+            raise ValueError(f"{store} store has {stores[store].size} rows, not {size}")
+    return stores
+
+
+def _remove_stale_entries(cache_dir: str, keep: Set[Optional[str]]):
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name not in keep and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
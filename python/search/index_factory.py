@@ -0,0 +1,218 @@
+import math
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import faiss
+import numpy as np
+
+# Index types selectable with SEARCH_INDEX_TYPE
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+
+# Scoring selectable with SEARCH_METRIC
+METRICS = ("l2", "cosine")
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length so inner product equals cosine similarity."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+@dataclass
+class IndexConfig:
+    """
+    Which FAISS index backs the search snapshot, and how it is tuned.
+
+    ``flat`` is the exact brute-force baseline. ``hnsw`` is a graph index whose
+    recall/latency trade-off is set by ``ef_search``. ``ivfpq`` clusters the
+    vectors into ``nlist`` inverted lists of product-quantized codes and scans
+    ``nprobe`` of them per query; it is trained on the catalogue embeddings and
+    falls back to flat while the catalogue is too small to train on.
+
+    ``metric`` is ``l2`` (raw vectors, L2 distance) or ``cosine`` (unit-length
+    vectors at index and query time, inner-product search).
+    """
+
+    index_type: str = "flat"
+    metric: str = "l2"
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 64
+    nlist: int = 0  # 0 picks ~4 * sqrt(rows)
+    nprobe: int = 16
+    pq_m: int = 0  # 0 picks dimension / 8 sub-quantizers
+    pq_bits: int = 8
+
+    def __post_init__(self):
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(
+                f"Unknown index type {self.index_type!r}, expected one of {INDEX_TYPES}"
+            )
+        if self.metric not in METRICS:
+            raise ValueError(f"Unknown metric {self.metric!r}, expected one of {METRICS}")
+
+    @classmethod
+    def from_env(cls) -> "IndexConfig":
+        return cls(
+            index_type=os.getenv("SEARCH_INDEX_TYPE", "flat"),
+            metric=os.getenv("SEARCH_METRIC", "l2"),
+            hnsw_m=int(os.getenv("SEARCH_HNSW_M", "32")),
+            ef_construction=int(os.getenv("SEARCH_HNSW_EF_CONSTRUCTION", "200")),
+            ef_search=int(os.getenv("SEARCH_HNSW_EF_SEARCH", "64")),
+            nlist=int(os.getenv("SEARCH_IVF_NLIST", "0")),
+            nprobe=int(os.getenv("SEARCH_IVF_NPROBE", "16")),
+            pq_m=int(os.getenv("SEARCH_PQ_M", "0")),
+            pq_bits=int(os.getenv("SEARCH_PQ_BITS", "8")),
+        )
+
+    @property
+    def normalize(self) -> bool:
+        return self.metric == "cosine"
+
+    @property
+    def faiss_metric(self) -> int:
+        return faiss.METRIC_INNER_PRODUCT if self.normalize else faiss.METRIC_L2
+
+    @property
+    def ivfpq_min_rows(self) -> int:
+        """Smallest catalogue the PQ codebooks can be trained on sensibly."""
+        return 4 * 2**self.pq_bits
+
+    def nlist_for(self, rows: int) -> int:
+        if self.nlist > 0:
+            return max(1, min(self.nlist, rows))
+        target = 2 ** round(math.log2(max(1.0, 4 * math.sqrt(rows))))
+        # k-means wants ~39 training points per centroid
+        return max(1, min(target, rows // 39))
+
+    def pq_m_for(self, dimension: int) -> int:
+        if self.pq_m > 0:
+            return self.pq_m
+        return dimension // 8 if dimension % 8 == 0 else dimension // 4
+
+    def effective_type(self, rows: int) -> str:
+        """Index type actually built for a catalogue of ``rows`` vectors."""
+        if self.index_type == "ivfpq" and rows < self.ivfpq_min_rows:
+            return "flat"
+        return self.index_type
+
+
+def index_kind(index: faiss.Index) -> str:
+    """``flat``, ``hnsw`` or ``ivfpq`` for an index built by ``build_index``."""
+    inner = faiss.downcast_index(index)
+    if isinstance(inner, faiss.IndexIDMap):
+        inner = faiss.downcast_index(inner.index)
+    if isinstance(inner, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(inner, faiss.IndexIVF):
+        return "ivfpq"
+    return "flat"
+
+
+def _ivf(index: faiss.Index) -> faiss.IndexIVF:
+    return faiss.extract_index_ivf(index)
+
+
+def index_ids(index: faiss.Index) -> np.ndarray:
+    """Every label stored in an index built by ``build_index``, in storage order."""
+    inner = faiss.downcast_index(index)
+    if isinstance(inner, faiss.IndexIDMap):
+        return faiss.vector_to_array(inner.id_map)
+    invlists = _ivf(inner).invlists
+    ids = [
+        faiss.rev_swig_ptr(invlists.get_ids(n), invlists.list_size(n)).copy()
+        for n in range(invlists.nlist)
+        if invlists.list_size(n)
+    ]
+    return np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+
+
+def empty_index(config: IndexConfig, dimension: int) -> faiss.Index:
+    """Index for an empty catalogue; untrainable types start out flat."""
+    return build_index(
+        config,
+        np.empty((0, dimension), dtype=np.float32),
+        np.empty(0, dtype=np.int64),
+    )
+
+
+def build_index(config: IndexConfig, embeddings: np.ndarray, ids: np.ndarray) -> faiss.Index:
+    """
+    Build an index of the configured type over ``embeddings``, labelled by ``ids``.
+
+    Search labels are project ids and ``remove_ids`` takes project ids,
+    whatever the type. Flat and HNSW are wrapped in ``IndexIDMap``. IVF-PQ
+    stores the ids in its inverted lists itself: ``IndexIDMap.remove_ids``
+    renumbers its id map as if the inner index had compacted, which IVF lists
+    don't, so wrapping one would mislabel every hit after the first delete.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    rows, dimension = embeddings.shape
+    kind = config.effective_type(rows)
+
+    if kind == "hnsw":
+        inner = faiss.IndexHNSWFlat(dimension, config.hnsw_m, config.faiss_metric)
+        inner.hnsw.efConstruction = config.ef_construction
+        inner.hnsw.efSearch = config.ef_search
+    elif kind == "ivfpq":
+        quantizer = faiss.IndexFlat(dimension, config.faiss_metric)
+        inner = faiss.IndexIVFPQ(
+            quantizer,
+            dimension,
+            config.nlist_for(rows),
+            config.pq_m_for(dimension),
+            config.pq_bits,
+            config.faiss_metric,
+        )
+        inner.train(embeddings)
+        inner.nprobe = config.nprobe
+    else:
+        inner = faiss.IndexFlat(dimension, config.faiss_metric)
+
+    index = inner if kind == "ivfpq" else faiss.IndexIDMap(inner)
+    if rows:
+        index.add_with_ids(embeddings, np.ascontiguousarray(ids, dtype=np.int64))
+    return index
+
+
+def needs_rebuild(
+    index: faiss.Index, config: IndexConfig, rows: int, removes: bool
+) -> bool:
+    """
+    Whether a refresh must rebuild the index instead of patching it in place.
+
+    HNSW graphs can't delete vectors, and an IVF-PQ index is retrained once
+    the catalogue has grown or shrunk enough that its list count is off.
+    """
+    kind = index_kind(index)
+    if kind != config.effective_type(rows) or index.metric_type != config.faiss_metric:
+        return True
+    if kind == "hnsw":
+        return removes
+    if kind == "ivfpq":
+        nlist = _ivf(index).nlist
+        wanted = config.nlist_for(rows)
+        return nlist * 2 < wanted or wanted * 2 < nlist
+    return False
+
+
+def search_parameters(
+    index: faiss.Index, config: IndexConfig, selector: Optional[faiss.IDSelector] = None
+) -> Optional[faiss.SearchParameters]:
+    """Per-query tuning knobs (``efSearch``/``nprobe``) plus an optional id filter."""
+    kind = index_kind(index)
+    if kind == "hnsw":
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = config.ef_search
+    elif kind == "ivfpq":
+        params = faiss.SearchParametersIVF()
+        params.nprobe = config.nprobe
+    elif selector is not None:
+        params = faiss.SearchParameters()
+    else:
+        return None
+    if selector is not None:
+        params.sel = selector
+    return params
@@ -0,0 +1,439 @@
+import hashlib
+import threading
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from search.filters import FilterBitmaps
+from search.lexical import BM25Index
+from search.metadata_store import CharityMetadataStore
+from search.passages import PassageConfig, PassageIndex, update_passage_index
+from search.suggest import PrefixIndex
+from search.index_cache import load_index_cache, save_index_cache
+from search.index_factory import (
+    IndexConfig,
+    build_index,
+    empty_index,
+    l2_normalize,
+    needs_rebuild,
+)
+
+
+def embedding_text(row: Dict) -> str:
+    """Text that gets embedded for a charity project."""
+    return f"{row['title']} {row['description']}"
+
+
+def content_hash(row: Dict) -> str:
+    """Hash of the fields that feed the embedding, used to detect edited rows."""
+    text = f"{row.get('title') or ''}\x1f{row.get('description') or ''}"
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class IndexSnapshot:
+    """
+    Immutable view of the index at one point in time.
+
+    Searches grab a reference to the current snapshot and keep using it even if
+    a refresh swaps in a newer one halfway through the request.
+
+    The derived stores are built from ``rows`` on first use, unless ``stores``
+    supplies them already built, e.g. memory-mapped from a cache entry.
+    """
+
+    index: faiss.Index
+    ids: np.ndarray
+    embeddings: np.ndarray
+    hashes: List[str]
+    rows: Dict[int, Dict]
+    generation: int
+    passages: Optional[PassageIndex] = None
+    stores: Optional[Dict[str, object]] = None
+
+    def __post_init__(self):
+        self.positions = {int(pid): pos for pos, pid in enumerate(self.ids)}
+        # Seeds the cached properties below, which read from the instance dict
+        self.__dict__.update(self.stores or {})
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    @cached_property
+    def filters(self) -> FilterBitmaps:
+        return FilterBitmaps(self.ids, self.rows)
+
+    @cached_property
+    def lexical(self) -> BM25Index:
+        return BM25Index(self.ids, self.rows)
+
+    @cached_property
+    def metadata(self) -> CharityMetadataStore:
+        return CharityMetadataStore(self.ids, self.rows)
+
+    @cached_property
+    def suggestions(self) -> PrefixIndex:
+        return PrefixIndex(self.ids, self.rows)
+
+    @property
+    def cache_token(self) -> str:
+        """
+        Identifies this snapshot's content for result caches shared across processes.
+
+        Only the rows go into it, not the per-process refresh ``generation``,
+        so workers that each build their own index from the same table write
+        and read the same keys.
+        """
+        return self.metadata.fingerprint[:24]
+
+    def warm(self) -> "IndexSnapshot":
+        """Build the derived filter, keyword, metadata and typeahead stores before going live."""
+        self.filters
+        self.lexical
+        self.metadata
+        self.suggestions
+        return self
+
+
+def _merge_row(previous: Optional[Dict], fields: Dict) -> Dict:
+    """``previous`` updated with ``fields``, reusing ``previous`` itself if nothing changed."""
+    if previous is None:
+        return fields
+    if all(key in previous and previous[key] == value for key, value in fields.items()):
+        return previous
+    return {**previous, **fields}
+
+
+def _grow(embeddings: np.ndarray, rows: int) -> np.ndarray:
+    """``embeddings`` with room for ``rows`` rows, doubling its capacity when it runs out."""
+    if rows <= len(embeddings):
+        return embeddings
+    grown = np.empty((max(rows, 2 * len(embeddings)), embeddings.shape[1]), dtype=np.float32)
+    grown[: len(embeddings)] = embeddings
+    return grown
+
+
+def index_cache_key(model_name: str, index_config: IndexConfig) -> str:
+    """Model id plus metric, since cosine mode stores normalized embeddings."""
+    if index_config.normalize:
+        return f"{model_name}+cosine"
+    return model_name
+
+
+class CharityIndexManager:
+    """
+    Keeps the FAISS index in sync with the ``charity_projects`` table.
+
+    Each refresh streams the table page by page from ``fetch_pages``,
+    re-encodes only rows whose title or description changed, in batches of
+    ``encode_batch_size`` as the pages arrive, and removes deleted rows by id.
+    The new index is built on a clone of the current one and swapped in
+    atomically, together with the filter bitmaps and BM25 keyword index derived
+    from the same rows, so ``/search`` keeps serving the previous snapshot while
+    a refresh is running.
+
+    If ``cache_dir`` is set, every refresh that changes the index is persisted
+    there and ``load_cache`` restores it on the next start.
+
+    ``index_config`` picks the FAISS index type and metric; in cosine mode
+    embeddings are normalized to unit length before they are stored. Types
+    that can't be patched in place (HNSW after a delete, IVF-PQ whose list
+    count no longer fits the catalogue) are rebuilt from the stored
+    embeddings instead of re-encoded.
+
+    If the pages leave out display-only fields, ``hydrate(ids)`` supplies
+    them lazily: only for new and edited rows on every refresh (unchanged rows
+    keep the values they had, and share their dicts with the previous
+    snapshot), for all rows (``ids=None``) when building from an empty index,
+    and every ``full_hydrate_every`` refreshes (0: never). Rows restored by
+    ``load_cache`` kept their fields in the cache, so they wait for that
+    schedule too. Display-only edits to otherwise unchanged rows can
+    therefore lag by up to ``full_hydrate_every`` refreshes.
+
+    With a ``passage_config`` each snapshot also carries a multi-vector
+    ``PassageIndex``, kept up to date the same way: only projects whose
+    passage text changed are re-encoded. The pages must then include every
+    passage source field, or passage edits wait for the next full hydrate.
+    """
+
+    def __init__(
+        self,
+        model,
+        fetch_pages: Callable[[], Iterable[List[Dict]]],
+        model_name: str,
+        cache_dir: Optional[str] = None,
+        index_config: Optional[IndexConfig] = None,
+        hydrate: Optional[Callable[[Optional[List[int]]], Iterable[Dict]]] = None,
+        encode_batch_size: int = 256,
+        full_hydrate_every: int = 0,
+        passage_config: Optional[PassageConfig] = None,
+    ):
+        self.model = model
+        self.fetch_pages = fetch_pages
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.index_config = index_config or IndexConfig()
+        self.hydrate = hydrate
+        self.encode_batch_size = max(1, encode_batch_size)
+        self.full_hydrate_every = full_hydrate_every
+        self.passage_config = passage_config
+        self._refreshes = 0
+        self.dimension = model.get_sentence_embedding_dimension()
+        self._snapshot = IndexSnapshot(
+            index=empty_index(self.index_config, self.dimension),
+            ids=np.empty(0, dtype=np.int64),
+            embeddings=np.empty((0, self.dimension), dtype=np.float32),
+            hashes=[],
+            rows={},
+            generation=0,
+        )
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._timer_thread: Optional[threading.Thread] = None
+
+    @property
+    def snapshot(self) -> IndexSnapshot:
+        return self._snapshot
+
+    @property
+    def cache_key(self) -> str:
+        return index_cache_key(self.model_name, self.index_config)
+
+    def load_cache(self) -> bool:
+        """
+        Seed the index from the on-disk cache.
+
+        The cached rows may be stale, so the next ``refresh`` is still needed,
+        but it only re-encodes rows whose hash changed since the cache was
+        written.
+
+        Returns:
+            bool: True if a valid cache was loaded.
+        """
+        if not self.cache_dir:
+            return False
+        cached = load_index_cache(
+            self.cache_dir,
+            self.cache_key,
+            self.dimension,
+            load_passages=self.passage_config is not None,
+        )
+        if cached is None:
+            return False
+        if needs_rebuild(
+            cached["index"], self.index_config, len(cached["ids"]), removes=False
+        ):
+            # Index type changed since the cache was written; embeddings still apply
+            cached["index"] = build_index(
+                self.index_config, cached["embeddings"], cached["ids"]
+            )
+        with self._refresh_lock:
+            self._snapshot = IndexSnapshot(**cached).warm()
+        print(f"Loaded {len(cached['ids'])} cached embeddings from {self.cache_dir}")
+        return True
+
+    def refresh(self) -> Dict[str, int]:
+        """
+        Bring the index up to date with the table.
+
+        Returns:
+            Dict[str, int]: Counts of added, updated, removed and unchanged rows,
+            plus the resulting index generation.
+        """
+        with self._refresh_lock:
+            current = self._snapshot
+
+            ids, hashes, rows = [], [], {}
+            stale_ids, stale_positions, pending = [], [], []
+            # Sized for the last catalogue and only grown if the table did, so
+            # encoded batches are written in place, never stacked; untouched
+            # pages of it cost no memory
+            embeddings = np.empty(
+                (max(current.size, self.encode_batch_size), self.dimension), dtype=np.float32
+            )
+            # (new positions, old positions) of unchanged rows, one pair per page
+            kept_pages: List[Tuple[np.ndarray, np.ndarray]] = []
+            unchanged = 0
+            for page in self.fetch_pages():
+                kept, kept_from = [], []
+                for row in page:
+                    pid = int(row["id"])
+                    if pid in rows:
+                        continue
+                    digest = content_hash(row)
+                    pos = current.positions.get(pid)
+                    if pos is None or current.hashes[pos] != digest:
+                        pending.append((len(ids), row))
+                        stale_ids.append(pid)
+                        stale_positions.append(len(ids))
+                    else:
+                        unchanged += 1
+                        kept.append(len(ids))
+                        kept_from.append(pos)
+                        row = _merge_row(current.rows.get(pid), row)
+                    ids.append(pid)
+                    hashes.append(digest)
+                    rows[pid] = row
+                embeddings = _grow(embeddings, len(ids))
+                if kept:
+                    kept_pages.append(
+                        (np.array(kept, dtype=np.int64), np.array(kept_from, dtype=np.int64))
+                    )
+                # Encode as the pages arrive, so texts never pile up for the whole table
+                while len(pending) >= self.encode_batch_size:
+                    self._encode_into(embeddings, pending[: self.encode_batch_size])
+                    del pending[: self.encode_batch_size]
+            if pending:
+                self._encode_into(embeddings, pending)
+            embeddings = embeddings[: len(ids)]
+            self._hydrate_rows(rows, stale_ids, full=self._full_hydrate_due(current))
+            self._refreshes += 1
+            passages = self._refresh_passages(current.passages, ids, rows)
+
+            removed_ids = [pid for pid in current.positions if pid not in rows]
+            updated_ids = [pid for pid in stale_ids if pid in current.positions]
+            stats = {
+                "added": len(stale_ids) - len(updated_ids),
+                "updated": len(updated_ids),
+                "removed": len(removed_ids),
+                "unchanged": unchanged,
+            }
+            if passages is not None:
+                stats["passages"] = passages.size
+
+            if not stale_ids and not removed_ids:
+                # Only display fields (funding, supporters, ...) may have changed
+                self._snapshot = IndexSnapshot(
+                    index=current.index,
+                    ids=current.ids,
+                    embeddings=current.embeddings,
+                    hashes=current.hashes,
+                    rows=rows,
+                    generation=current.generation + 1,
+                    passages=passages,
+                ).warm()
+                stats["generation"] = self._snapshot.generation
+                if self._snapshot.rows != current.rows or passages is not current.passages:
+                    # Processes attached to the cache pick up the new figures
+                    self._save_cache()
+                return stats
+
+            # Unchanged vectors are only copied once the index is known to change
+            for kept, kept_from in kept_pages:
+                embeddings[kept] = current.embeddings[kept_from]
+            del kept_pages
+
+            drop = np.array(updated_ids + removed_ids, dtype=np.int64)
+            if needs_rebuild(current.index, self.index_config, len(ids), len(drop) > 0):
+                index = build_index(
+                    self.index_config, embeddings, np.array(ids, dtype=np.int64)
+                )
+            else:
+                index = faiss.clone_index(current.index)
+                if len(drop):
+                    index.remove_ids(drop)
+                if len(stale_ids):
+                    index.add_with_ids(
+                        embeddings[stale_positions], np.array(stale_ids, dtype=np.int64)
+                    )
+
+            self._snapshot = IndexSnapshot(
+                index=index,
+                ids=np.array(ids, dtype=np.int64),
+                embeddings=embeddings,
+                hashes=hashes,
+                rows=rows,
+                generation=current.generation + 1,
+                passages=passages,
+            ).warm()
+            stats["generation"] = self._snapshot.generation
+            print(f"Search index refreshed: {stats}")
+            self._save_cache()
+            return stats
+
+    def _encode_into(self, embeddings: np.ndarray, pending: List[Tuple[int, Dict]]):
+        """Encode ``(position, row)`` pairs straight into their rows of ``embeddings``."""
+        positions = [pos for pos, _ in pending]
+        embeddings[positions] = self._encode_texts([embedding_text(row) for _, row in pending])
+
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        vectors = self.model.encode(texts, convert_to_numpy=True).astype(np.float32)
+        if self.index_config.normalize:
+            vectors = l2_normalize(vectors)
+        return vectors
+
+    def _refresh_passages(
+        self, previous: Optional[PassageIndex], ids: List[int], rows: Dict[int, Dict]
+    ) -> Optional[PassageIndex]:
+        if self.passage_config is None:
+            return None
+        return update_passage_index(
+            previous,
+            ids,
+            rows,
+            self._encode_texts,
+            self.dimension,
+            self.index_config,
+            self.passage_config,
+            self.encode_batch_size,
+        )
+
+    def _full_hydrate_due(self, current: IndexSnapshot) -> bool:
+        # A cold build needs every row's fields, and one scan beats looking them up by id
+        if current.size == 0:
+            return True
+        # Rows restored by load_cache were hydrated before they were written, so they wait too
+        return (
+            self.full_hydrate_every > 0
+            and self._refreshes > 0
+            and self._refreshes % self.full_hydrate_every == 0
+        )
+
+    def _hydrate_rows(self, rows: Dict[int, Dict], stale_ids: List[int], full: bool):
+        """Merge display fields into ``rows``: every row's if ``full``, else the stale rows'."""
+        if self.hydrate is None or not rows:
+            return
+        if not full and not stale_ids:
+            return
+        for fields in self.hydrate(None if full else stale_ids):
+            pid = int(fields["id"])
+            row = rows.get(pid)
+            if row is not None:
+                # Unchanged rows are shared with the live snapshot, so copy on write
+                rows[pid] = _merge_row(row, fields)
+
+    def _save_cache(self):
+        if not self.cache_dir:
+            return
+        try:
+            save_index_cache(self.cache_dir, self._snapshot, self.cache_key)
+        except Exception as e:
+            print(f"Failed to write search index cache: {e}")
+
+    def start_auto_refresh(self, interval_seconds: float):
+        """Refresh the index every ``interval_seconds`` on a background thread."""
+        if self._timer_thread and self._timer_thread.is_alive():
+            return
+        self._stop_event.clear()
+
+        def run():
+            while not self._stop_event.wait(interval_seconds):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Search index refresh failed: {e}")
+
+        self._timer_thread = threading.Thread(
+            target=run, name="search-index-refresh", daemon=True
+        )
+        self._timer_thread.start()
+
+    def stop_auto_refresh(self):
+        self._stop_event.set()
+        if self._timer_thread:
+            self._timer_thread.join(timeout=5)
+            self._timer_thread = None
@@ -0,0 +1,155 @@
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from search.packed import PackedStrings
+
+# Fields indexed for keyword search, with BM25F-style term frequency weights
+LEXICAL_FIELDS = {
+    "title": 2.0,
+    "organization_name": 2.0,
+    "description": 1.0,
+    "location": 1.0,
+    "category": 1.0,
+}
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from i in is it of on or that the this to want with".split()
+)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def _field_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(v) for v in value)
+    return str(value)
+
+
+class BM25Index:
+    """
+    In-memory inverted index scored with BM25 over the searchable text fields.
+
+    Postings store each term's precomputed BM25 contribution per row, so a
+    query is a few vectorised adds into a score array followed by a partial
+    sort, with no per-document Python work. Row positions line up with the
+    snapshot's ``ids`` so filter masks apply directly.
+
+    The postings live in flat arrays (terms sorted, one slice of
+    ``positions``/``weights`` per term), so ``to_arrays``/``from_arrays`` can
+    hand them to other processes memory-mapped rather than rebuilt.
+    """
+
+    def __init__(
+        self, ids: np.ndarray, rows: Dict[int, Dict], k1: float = 1.2, b: float = 0.75
+    ):
+        self.size = len(ids)
+        counts: List[Counter] = []
+        lengths = np.zeros(self.size, dtype=np.float32)
+        for pos, pid in enumerate(ids.tolist()):
+            row = rows.get(pid) or {}
+            tf: Counter = Counter()
+            for field, weight in LEXICAL_FIELDS.items():
+                for token in tokenize(_field_text(row.get(field))):
+                    tf[token] += weight
+            counts.append(tf)
+            lengths[pos] = sum(tf.values())
+
+        avg_length = float(lengths.mean()) if self.size and lengths.sum() else 1.0
+        norms = k1 * (1 - b + b * lengths / avg_length)
+
+        postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        for pos, tf in enumerate(counts):
+            for token, freq in tf.items():
+                postings[token].append((pos, freq))
+
+        terms = sorted(postings)
+        self.terms = PackedStrings.pack(terms)
+        self.offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum([len(postings[term]) for term in terms])
+        self.positions = np.empty(self.offsets[-1], dtype=np.int64)
+        self.weights = np.empty(self.offsets[-1], dtype=np.float32)
+        for n, term in enumerate(terms):
+            entries = postings[term]
+            start, end = self.offsets[n], self.offsets[n + 1]
+            positions = np.fromiter((p for p, _ in entries), dtype=np.int64, count=len(entries))
+            freqs = np.fromiter((f for _, f in entries), dtype=np.float32, count=len(entries))
+            idf = np.log(1 + (self.size - len(entries) + 0.5) / (len(entries) + 0.5))
+            self.positions[start:end] = positions
+            self.weights[start:end] = idf * freqs * (k1 + 1) / (freqs + norms[positions])
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "size": np.array(self.size, dtype=np.int64),
+            **self.terms.to_arrays("terms"),
+            "offsets": self.offsets,
+            "positions": self.positions,
+            "weights": self.weights,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "BM25Index":
+        index = cls.__new__(cls)
+        index.size = int(arrays["size"])
+        index.terms = PackedStrings.from_arrays(arrays, "terms")
+        index.offsets = arrays["offsets"]
+        index.positions = arrays["positions"]
+        index.weights = arrays["weights"]
+        return index
+
+    def postings(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Row positions and BM25 weights of ``term``, or None if no row contains it."""
+        n = bisect_left(self.terms, term)
+        if n == len(self.terms) or self.terms[n] != term:
+            return None
+        start, end = self.offsets[n], self.offsets[n + 1]
+        return self.positions[start:end], self.weights[start:end]
+
+    def search(
+        self, query: str, top_k: int, mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Best ``top_k`` rows for ``query``, restricted to ``mask`` if given.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: BM25 scores and snapshot positions,
+            best first. Rows that share no term with the query are left out.
+        """
+        terms = [p for p in map(self.postings, set(tokenize(query))) if p is not None]
+        if not terms or top_k <= 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        scores = np.zeros(self.size, dtype=np.float32)
+        for positions, weights in terms:
+            scores[positions] += weights
+        if mask is not None:
+            scores[~mask] = 0.0
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return scores[order], order
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60) -> List[int]:
+    """
+    Merge ranked id lists by summing ``1 / (k + rank)`` across lists.
+
+    Ids ranked highly by either retriever float to the top without having to
+    put BM25 scores and embedding distances on a common scale.
+    """
+    fused: Dict[int, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            fused[item] += 1.0 / (k + rank + 1)
+    return sorted(fused, key=fused.__getitem__, reverse=True)
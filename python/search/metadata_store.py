@@ -0,0 +1,173 @@
+import hashlib
+import json
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from search.packed import PackedStrings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional, json is the fallback
+    orjson = None
+
+# Fields of a search result, in the order /search returns them
+SCALAR_FIELDS = {
+    "id": np.int64,
+    "created_at": object,
+    "title": object,
+    "description": object,
+    "image": object,
+    "funding_percentage": np.float64,
+    "supporters": np.int64,
+    "amount": np.int64,
+    "in_progress": object,
+    "progress_percentage": object,
+    "funding_complete": object,
+    "smart_contract_address": object,
+    "verified": object,
+    "goal_amount": object,
+    "location": object,
+    "organization_name": object,
+}
+NESTED_FIELDS = (
+    "category",
+    "document_urls",
+    "overview",
+    "objective",
+    "impact_stats",
+    "timeline",
+)
+RESULT_FIELDS = (
+    "id",
+    "created_at",
+    "title",
+    "description",
+    "image",
+    "funding_percentage",
+    "supporters",
+    "amount",
+    "category",
+    "in_progress",
+    "progress_percentage",
+    "funding_complete",
+    "smart_contract_address",
+    "verified",
+    "goal_amount",
+    "location",
+    "organization_name",
+    "document_urls",
+    "overview",
+    "objective",
+    "impact_stats",
+    "timeline",
+)
+
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class CharityMetadataStore:
+    """
+    Compact, serialization-ready metadata for the rows of an index snapshot.
+
+    Scalar fields are gathered column-wise (numpy arrays for numeric columns,
+    object arrays for the rest) and nested fields (``timeline``,
+    ``impact_stats``, ...) pre-serialized as JSON. Each row's result
+    object is encoded once, at build time, up to its trailing ``confidence``
+    value, so a page of results is a byte join of cached fragments rather than
+    dict copies pushed through response-model validation on every request.
+
+    Only the fragments are kept, packed into one byte array, so
+    ``to_arrays``/``from_arrays`` can share them between processes
+    memory-mapped from disk.
+    """
+
+    def __init__(self, ids: np.ndarray, rows: Dict[int, Dict]):
+        self.size = len(ids)
+        present = [rows.get(pid) for pid in ids.tolist()]
+        self.present = np.array([row is not None for row in present], dtype=bool)
+
+        columns: Dict[str, np.ndarray] = {}
+        for field, dtype in SCALAR_FIELDS.items():
+            values = [row.get(field) if row else None for row in present]
+            if dtype is object or any(v is None for v in values):
+                column = np.empty(self.size, dtype=object)
+                column[:] = values
+            else:
+                column = np.array(values, dtype=dtype)
+            columns[field] = column
+
+        nested: Dict[str, List[bytes]] = {
+            field: [dumps(row.get(field)) if row else b"null" for row in present]
+            for field in NESTED_FIELDS
+        }
+
+        fragments: List[Optional[bytes]] = []
+        digest = hashlib.sha1()
+        for pos, row in enumerate(present):
+            if row is None:
+                fragments.append(None)
+                digest.update(b"\x00")
+                continue
+            parts = []
+            for field in RESULT_FIELDS:
+                if field in nested:
+                    value = nested[field][pos]
+                else:
+                    value = dumps(_plain(columns[field][pos]))
+                parts.append(b'"' + field.encode() + b'":' + value)
+            fragments.append(b"{" + b",".join(parts) + b',"confidence":')
+            digest.update(fragments[-1])
+        self.fragments = PackedStrings.pack(fragments)
+        # Changes whenever any served field of any row does
+        self.fingerprint = digest.hexdigest()
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "present": self.present,
+            "fingerprint": np.array(self.fingerprint),
+            **self.fragments.to_arrays("fragments"),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "CharityMetadataStore":
+        store = cls.__new__(cls)
+        store.present = arrays["present"]
+        store.size = len(store.present)
+        store.fingerprint = str(arrays["fingerprint"][()])
+        store.fragments = PackedStrings.from_arrays(arrays, "fragments")
+        return store
+
+    def result_json(self, position: int, confidence: float) -> bytes:
+        return self.fragments.raw(position) + repr(float(confidence)).encode() + b"}"
+
+    def page_json(self, positions: Sequence[int], confidences: Sequence[float]) -> bytes:
+        """Serialized JSON array of results, built from the cached fragments."""
+        return (
+            b"["
+            + b",".join(
+                self.result_json(pos, conf) for pos, conf in zip(positions, confidences)
+            )
+            + b"]"
+        )
+
+    def result_dict(self, position: int, confidence: float) -> Dict:
+        """One result as a fresh dict, for callers that post-process it."""
+        return loads(self.result_json(position, confidence))
+
+
+def _plain(value):
+    """numpy scalars to the Python values the JSON encoder expects."""
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
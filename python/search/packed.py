@@ -0,0 +1,47 @@
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+
+class PackedStrings:
+    """
+    A list of strings held as one UTF-8 byte array plus offsets.
+
+    Unlike a list of ``str`` or a fixed-width numpy unicode array, the two
+    arrays can be saved with ``np.save`` and memory-mapped back without
+    padding, so every process attached to a snapshot reads the same pages.
+    Supports ``len``, indexing and ``bisect`` when the strings are sorted.
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def pack(cls, strings: Iterable[Optional[bytes]]) -> "PackedStrings":
+        """Pack byte strings (or ``str``, encoded as UTF-8); None packs as an empty entry."""
+        chunks = [s.encode("utf-8") if isinstance(s, str) else (s or b"") for s in strings]
+        offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(chunk) for chunk in chunks])
+        blob = np.frombuffer(b"".join(chunks), dtype=np.uint8).copy()
+        return cls(blob, offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def raw(self, n: int) -> bytes:
+        return self.blob[self.offsets[n] : self.offsets[n + 1]].tobytes()
+
+    def __getitem__(self, n: int) -> str:
+        if n < 0:
+            n += len(self)
+        if not 0 <= n < len(self):
+            raise IndexError(n)
+        return self.raw(n).decode("utf-8")
+
+    def to_arrays(self, prefix: str) -> Dict[str, np.ndarray]:
+        return {f"{prefix}_blob": self.blob, f"{prefix}_offsets": self.offsets}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], prefix: str) -> "PackedStrings":
+        return cls(arrays[f"{prefix}_blob"], arrays[f"{prefix}_offsets"])
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from search.index_factory import IndexConfig, build_index, needs_rebuild
+
+# Long-form fields split into passages, after the title/category passage
+PASSAGE_FIELDS = ("description", "overview", "objective")
+
+
+@dataclass
+class PassageConfig:
+    """
+    How projects are cut into passages for multi-vector search.
+
+    Each project gets a ``title. category`` passage plus overlapping windows of
+    ``chunk_words`` words over its description, overview and objective, each
+    prefixed with the title so a chunk still says what it belongs to. Windows
+    stay well under MiniLM's 256-wordpiece limit, so nothing is truncated.
+    """
+
+    chunk_words: int = 120
+    overlap_words: int = 30
+    max_passages: int = 16
+
+    def __post_init__(self):
+        if self.max_passages < 1:
+            raise ValueError(f"max_passages must be at least 1, got {self.max_passages}")
+        if not 0 <= self.overlap_words < self.chunk_words:
+            raise ValueError(
+                f"Passage overlap {self.overlap_words} must be below chunk size {self.chunk_words}"
+            )
+
+    @classmethod
+    def from_env(cls) -> "PassageConfig":
+        return cls(
+            chunk_words=int(os.getenv("SEARCH_PASSAGE_WORDS", "120")),
+            overlap_words=int(os.getenv("SEARCH_PASSAGE_OVERLAP", "30")),
+            max_passages=int(os.getenv("SEARCH_MAX_PASSAGES", "16")),
+        )
+
+
+def _text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(v) for v in value if v)
+    return str(value)
+
+
+def chunk_words(text: str, size: int, overlap: int) -> List[str]:
+    """Overlapping windows of ``size`` words, advancing ``size - overlap`` words at a time."""
+    words = text.split()
+    if len(words) <= size:
+        return [" ".join(words)] if words else []
+    step = size - overlap
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start : start + size]))
+        if start + size >= len(words):
+            break
+    return chunks
+
+
+def project_passages(row: Dict, config: PassageConfig) -> List[str]:
+    """The texts embedded for one project, at most ``config.max_passages`` of them."""
+    title = _text(row.get("title")).strip()
+    category = _text(row.get("category")).strip()
+    passages = [f"{title}. {category}" if category else title]
+    for field in PASSAGE_FIELDS:
+        for chunk in chunk_words(_text(row.get(field)), config.chunk_words, config.overlap_words):
+            passages.append(f"{title}: {chunk}")
+    return list(dict.fromkeys(passages))[: config.max_passages]
+
+
+def passage_hash(row: Dict, config: PassageConfig) -> str:
+    """Hash of everything ``project_passages`` reads, so config changes re-encode too."""
+    fields = {field: row.get(field) for field in ("title", "category") + PASSAGE_FIELDS}
+    text = json.dumps([fields, asdict(config)], sort_keys=True, default=str)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def project_spans(owners: np.ndarray) -> Dict[int, Tuple[int, int]]:
+    """``(start, end)`` of each project's run of passages in ``owners``."""
+    if not len(owners):
+        return {}
+    starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+    ends = np.r_[starts[1:], len(owners)]
+    return {int(owners[s]): (s, e) for s, e in zip(starts.tolist(), ends.tolist())}
+
+
+class PassageIndex:
+    """
+    Several vectors per project, searched with max-sim aggregation.
+
+    The FAISS index labels every passage with its project id (``IndexIDMap``
+    and IVF lists allow repeated ids), so filters select projects exactly as on the
+    single-vector index and ``remove_ids`` drops all of a project's passages
+    at once. ``vectors``/``owners`` hold the same passages grouped by project
+    in catalogue order, for refreshes and direct scoring.
+    """
+
+    def __init__(
+        self,
+        index: faiss.Index,
+        owners: np.ndarray,
+        vectors: np.ndarray,
+        hashes: Dict[int, str],
+    ):
+        self.index = index
+        self.owners = owners
+        self.vectors = vectors
+        self.hashes = hashes
+        self.spans = project_spans(owners)
+
+    @property
+    def size(self) -> int:
+        return len(self.owners)
+
+    def project_vectors(self, project_id: int) -> np.ndarray:
+        start, end = self.spans[project_id]
+        return self.vectors[start:end]
+
+    def best_scores(
+        self, project_ids: List[int], query_vec: np.ndarray, normalize: bool
+    ) -> np.ndarray:
+        """Each project's best passage score: max inner product, or min L2 distance."""
+        scores = np.empty(len(project_ids), dtype=np.float32)
+        for n, pid in enumerate(project_ids):
+            vectors = self.project_vectors(pid)
+            if normalize:
+                scores[n] = (vectors @ query_vec).max()
+            else:
+                scores[n] = ((vectors - query_vec) ** 2).sum(axis=1).min()
+        return scores
+
+
+def max_sim(distances: np.ndarray, labels: np.ndarray, top_k: int, normalize: bool):
+    """
+    Collapse passage hits into project hits, keeping each project's best passage.
+
+    FAISS returns hits best first, so the first passage seen per project is its
+    best. Rows are padded like FAISS pads (id -1, worst score) when fewer than
+    ``top_k`` distinct projects were found.
+    """
+    worst = -np.finfo(np.float32).max if normalize else np.finfo(np.float32).max
+    out_distances = np.full((len(labels), top_k), worst, dtype=np.float32)
+    out_labels = np.full((len(labels), top_k), -1, dtype=np.int64)
+    for row in range(len(labels)):
+        seen = set()
+        for distance, pid in zip(distances[row].tolist(), labels[row].tolist()):
+            if pid < 0 or pid in seen:
+                continue
+            out_distances[row, len(seen)] = distance
+            out_labels[row, len(seen)] = pid
+            seen.add(pid)
+            if len(seen) == top_k:
+                break
+    return out_distances, out_labels
+
+
+def update_passage_index(
+    previous: Optional[PassageIndex],
+    ids: List[int],
+    rows: Dict[int, Dict],
+    encode: Callable[[List[str]], np.ndarray],
+    dimension: int,
+    index_config: IndexConfig,
+    config: PassageConfig,
+    batch_size: int = 256,
+) -> PassageIndex:
+    """
+    The passage index for the catalogue ``ids``, re-encoding only changed projects.
+
+    Projects whose passage hash matches ``previous`` reuse its vectors; the
+    FAISS index is patched in place where the index type allows, as for the
+    single-vector index.
+    """
+    hashes = {pid: passage_hash(rows[pid], config) for pid in ids}
+    previous_hashes = previous.hashes if previous is not None else {}
+    stale = [pid for pid in ids if previous_hashes.get(pid) != hashes[pid]]
+    removed = [pid for pid in previous_hashes if pid not in hashes]
+    if previous is not None and not stale and not removed:
+        return previous
+
+    texts, fresh_owners = [], []
+    for pid in stale:
+        passages = project_passages(rows[pid], config)
+        texts += passages
+        fresh_owners += [pid] * len(passages)
+    batches = [encode(texts[i : i + batch_size]) for i in range(0, len(texts), batch_size)]
+    fresh = np.vstack(batches) if batches else np.empty((0, dimension), dtype=np.float32)
+    fresh_owners = np.array(fresh_owners, dtype=np.int64)
+    fresh_spans = project_spans(fresh_owners)
+
+    parts = []
+    for pid in ids:
+        if pid in fresh_spans:
+            start, end = fresh_spans[pid]
+            parts.append(fresh[start:end])
+        else:
+            parts.append(previous.project_vectors(pid))
+    vectors = np.vstack(parts) if parts else np.empty((0, dimension), dtype=np.float32)
+    owners = np.repeat(np.array(ids, dtype=np.int64), [len(part) for part in parts])
+
+    drop = np.array([pid for pid in stale if pid in previous_hashes] + removed, dtype=np.int64)
+    if previous is None or needs_rebuild(previous.index, index_config, len(owners), len(drop) > 0):
+        index = build_index(index_config, vectors, owners)
+    else:
+        index = faiss.clone_index(previous.index)
+        if len(drop):
+            index.remove_ids(drop)
+        if len(fresh_owners):
+            index.add_with_ids(fresh, fresh_owners)
+    return PassageIndex(index, owners, vectors, hashes)
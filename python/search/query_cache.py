@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    """Collapse case and whitespace so trivially different queries share an entry."""
+    return " ".join(query.lower().split())
+
+
+class QueryEmbeddingCache:
+    """
+    Thread-safe LRU cache of query embeddings with a time-to-live.
+
+    Entries are keyed on the model id and the normalized query text, so
+    switching models never serves a vector from the wrong embedding space.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, model_id: str, query: str):
+        key = (model_id, normalize_query(query))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, vector = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return vector
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def put(self, model_id: str, query: str, vector: np.ndarray):
+        if self.max_size <= 0:
+            return
+        key = (model_id, normalize_query(query))
+        # Cached vectors are shared between requests, so make them read-only
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
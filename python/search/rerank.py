@@ -0,0 +1,68 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, List
+
+import numpy as np
+
+
+class CrossEncoderReranker:
+    """
+    Second-stage re-ranker that scores (query, project) pairs jointly.
+
+    A cross-encoder reads the query and the project text together, so it is
+    far more accurate than comparing two independent embeddings, and far too
+    slow to run over the whole catalogue. It only ever sees the first
+    ``top_n`` candidates of the first-stage ranking. The depth is fixed so
+    every page of a query reorders the same head; the resulting order is
+    kept in an LRU of ``cache_size`` entries, so paging through a query
+    scores its head once.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        top_n: int = 20,
+        batch_size: int = 32,
+        max_length: int = 256,
+        cache_size: int = 1024,
+    ):
+        from sentence_transformers import CrossEncoder
+
+        self.model_name = model_name
+        self.model = CrossEncoder(model_name, max_length=max_length)
+        self.top_n = top_n
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._orders: "OrderedDict[Hashable, List[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def scores(self, query: str, texts: List[str]) -> np.ndarray:
+        scores = self.model.predict(
+            [(query, text) for text in texts],
+            batch_size=self.batch_size,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+        )
+        return np.asarray(scores, dtype=np.float32)
+
+    def order(self, key: Hashable, query: str, texts: Callable[[], List[str]]) -> List[int]:
+        """
+        Indices of ``texts()`` from best to worst cross-encoder score.
+
+        ``key`` must identify the candidates as well as the query; ``texts``
+        is only called on a miss.
+        """
+        with self._lock:
+            order = self._orders.get(key)
+            if order is not None:
+                self._orders.move_to_end(key)
+                return order
+        order = np.argsort(-self.scores(query, texts()), kind="stable").tolist()
+        if self.cache_size > 0:
+            with self._lock:
+                self._orders[key] = order
+                self._orders.move_to_end(key)
+                while len(self._orders) > self.cache_size:
+                    self._orders.popitem(last=False)
+        return order
+
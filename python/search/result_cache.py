@@ -0,0 +1,184 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from search.batcher import SearchJob
+from search.query_cache import normalize_query
+
+# Every result page key starts with this
+KEY_PREFIX = "search:"
+
+
+def result_cache_key(token: str, job: SearchJob) -> str:
+    """
+    Key for one page of results.
+
+    ``token`` identifies the ranking setup and the snapshot's content
+    fingerprint, so a refresh that changes the catalogue moves all lookups to
+    fresh keys and stale pages are never served; they simply age out.
+    """
+    request = json.dumps(
+        [
+            normalize_query(job.query),
+            job.k,
+            job.offset,
+            job.min_confidence,
+            job.filters or {},
+        ],
+        sort_keys=True,
+    )
+    digest = hashlib.sha1(request.encode("utf-8")).hexdigest()
+    return f"{KEY_PREFIX}{token}:{digest}"
+
+
+class _CacheStats:
+    """Hit, miss and error counters; caches are read from several threads at once."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def error(self):
+        with self._lock:
+            self.errors += 1
+
+    def as_dict(self) -> Dict:
+        with self._lock:
+            hits, misses, errors = self.hits, self.misses, self.errors
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "errors": errors,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+
+class MemoryResultCache:
+    """
+    In-process LRU of serialized result pages, bounded by total payload bytes.
+
+    Bounding by bytes rather than entry count keeps memory predictable when
+    page sizes vary from one result to a hundred.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 2**20):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = _CacheStats()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._stats.miss()
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hit()
+            return value
+
+    def put(self, key: str, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = value
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "size": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                **self._stats.as_dict(),
+            }
+
+
+class RedisResultCache:
+    """
+    Result cache on a Redis-compatible server, shared by every worker.
+
+    Searches only use ``get`` and ``set(..., ex=...)``, and ``clear`` adds
+    ``scan_iter`` and ``delete``, so any client with that surface works
+    (redis-py, or fakeredis in tests). Eviction is left to the
+    server's ``maxmemory`` policy plus the per-entry TTL. Redis errors count
+    as misses so an unavailable cache never fails a search.
+    """
+
+    def __init__(self, client, ttl_seconds: int = 3600):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self._stats = _CacheStats()
+
+    @classmethod
+    def from_url(cls, url: str, ttl_seconds: int = 3600) -> "RedisResultCache":
+        import redis
+
+        return cls(redis.Redis.from_url(url), ttl_seconds)
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            value = self.client.get(key)
+        except Exception as e:
+            self._stats.error()
+            print(f"Result cache read failed: {e}")
+            value = None
+        if value is None:
+            self._stats.miss()
+            return None
+        self._stats.hit()
+        return value
+
+    def put(self, key: str, value: bytes):
+        try:
+            self.client.set(key, value, ex=self.ttl_seconds)
+        except Exception as e:
+            self._stats.error()
+            print(f"Result cache write failed: {e}")
+
+    def clear(self, chunk_size: int = 500):
+        """Delete every result page, scanning for ``KEY_PREFIX`` keys in chunks."""
+        try:
+            keys = []
+            for key in self.client.scan_iter(match=f"{KEY_PREFIX}*", count=chunk_size):
+                keys.append(key)
+                if len(keys) >= chunk_size:
+                    self.client.delete(*keys)
+                    keys = []
+            if keys:
+                self.client.delete(*keys)
+        except Exception as e:
+            self._stats.error()
+            print(f"Result cache clear failed: {e}")
+
+    def stats(self) -> Dict:
+        return {"backend": "redis", "ttl_seconds": self.ttl_seconds, **self._stats.as_dict()}
@@ -1,63 +1,674 @@
-from sentence_transformers import SentenceTransformer
 import faiss
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple, Union
 from supabase import create_client, Client
+import asyncio
+import hashlib
+import json
 import os
+import time
+from dataclasses import asdict, replace
+from functools import lru_cache, partial
 from dotenv import load_dotenv
+from search.index_manager import CharityIndexManager, embedding_text, index_cache_key
+from search.passages import PASSAGE_FIELDS, PassageConfig, max_sim, project_passages
+from search.budget import LatencyBudget
+from search.rerank import CrossEncoderReranker
+from search.supabase_loader import SupabaseCatalogue
+from search.shared_index import SharedIndexReader
+from search.service import SearchComponents, SearchService
+from search.batcher import SearchBatcher, SearchJob
+from search.query_cache import QueryEmbeddingCache, normalize_query
+from search.encoders import load_encoder
+from search.index_factory import IndexConfig, l2_normalize, search_parameters
+from search.calibration import load_calibrator
+from search.lexical import reciprocal_rank_fusion
+from search.result_cache import MemoryResultCache, RedisResultCache, result_cache_key
+from search.telemetry import SEARCH_BATCH_SIZE, span
 
 load_dotenv()
 
-# Load the embedding model
-model = SentenceTransformer("all-MiniLM-L6-v2")
+# Load the embedding model; "onnx" and "onnx-int8" need download_model.py --export-onnx
+MODEL_NAME = "all-MiniLM-L6-v2"
+ENCODER_BACKEND = os.getenv("SEARCH_ENCODER_BACKEND", "torch")
 
-url = os.getenv("NEXT_PUBLIC_SUPABASE_URL")
-key = os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
+# Directory for the persisted index and embeddings, empty disables the cache
+CACHE_DIR = os.getenv("SEARCH_CACHE_DIR", "./cache/search-index")
 
-supabase: Client = create_client(url, key)
+INDEX_CONFIG = IndexConfig.from_env()
 
+# SEARCH_MULTI_VECTOR=1 also indexes passages (title and category, plus chunks of
+# the description, overview and objective) and ranks projects by their best one
+PASSAGE_CONFIG = PassageConfig.from_env() if os.getenv("SEARCH_MULTI_VECTOR") == "1" else None
+# Passages fetched per requested project, since one project's passages cluster
+PASSAGE_OVERSAMPLE = int(os.getenv("SEARCH_PASSAGE_OVERSAMPLE", "4"))
+# Per search batch; queries that don't fit fall back to the single-vector index
+passage_budget = LatencyBudget(float(os.getenv("SEARCH_MULTI_VECTOR_BUDGET_MS", "20")))
 
-# Add this new function to fetch charities from Supabase
-def fetch_charities_from_supabase():
-    response = supabase.table("charity_projects").select("*").execute()
+# Cross-encoder re-ranking of the top hits, e.g. cross-encoder/ms-marco-MiniLM-L-6-v2;
+# empty disables it
+RERANK_MODEL = os.getenv("SEARCH_RERANK_MODEL", "")
+RERANK_TOP_N = int(os.getenv("SEARCH_RERANK_TOP_N", "20"))
+# Queries whose re-ranked order is kept, so later pages don't score the head again
+RERANK_CACHE_SIZE = int(os.getenv("SEARCH_RERANK_CACHE_SIZE", "1024"))
 
-    if not response.data:
-        print("Supabase fetch error or empty result:", response)
-        return []
+# "local" builds the index in this process; "shared" attaches read-only to the
+# generations build_index.py publishes in CACHE_DIR, for multi-worker servers
+INDEX_MODE = os.getenv("SEARCH_INDEX_MODE", "local")
+SHARED_POLL_SECONDS = float(os.getenv("SEARCH_SHARED_POLL_SECONDS", "5"))
 
-    return response.data
 
+@lru_cache(maxsize=1)
+def load_search_encoder():
+    """
+    The query/catalogue encoder, loaded once per process.
+
+    ``gunicorn.conf.py`` calls this in the master before forking, so workers
+    inherit the weights copy-on-write instead of each loading their own.
+    """
+    return load_encoder(
+        ENCODER_BACKEND,
+        MODEL_NAME,
+        onnx_dir=os.getenv("SEARCH_ONNX_DIR") or None,
+        num_threads=int(os.getenv("SEARCH_ENCODER_THREADS", "0")),
+    )
+
+
+@lru_cache(maxsize=1)
+def supabase_client() -> Client:
+    url = os.getenv(SUPABASE_URL_ENV)
+    key = os.getenv(SUPABASE_KEY_ENV)
+    return create_client(url, key)
+
+
+# Keyset-paged reads, so a refresh never pulls the whole table in one response
+catalogue = SupabaseCatalogue(
+    supabase_client, page_size=int(os.getenv("SUPABASE_PAGE_SIZE", "1000"))
+)
+# Catalogue rows encoded per model call during a refresh
+ENCODE_BATCH_SIZE = int(os.getenv("SEARCH_ENCODE_BATCH_SIZE", "256"))
+# Re-read display fields of unchanged rows every N refreshes (0: never), so
+# edits that leave the indexed columns alone show up within N refresh
+# intervals; new and edited rows are always hydrated as they arrive
+FULL_HYDRATE_EVERY = int(os.getenv("SEARCH_FULL_HYDRATE_EVERY", "12"))
+
+
+def build_index_manager(model) -> CharityIndexManager:
+    """Index manager that streams from Supabase and persists to CACHE_DIR."""
+    fetch_pages = catalogue.index_pages
+    if PASSAGE_CONFIG:
+        # Passages embed overview and objective, so every scan reads them to catch their edits
+        fetch_pages = partial(catalogue.index_pages, PASSAGE_FIELDS)
+    return CharityIndexManager(
+        model,
+        fetch_pages,
+        model.model_id,
+        cache_dir=CACHE_DIR or None,
+        index_config=INDEX_CONFIG,
+        hydrate=catalogue.display_fields,
+        encode_batch_size=ENCODE_BATCH_SIZE,
+        full_hydrate_every=FULL_HYDRATE_EVERY,
+        passage_config=PASSAGE_CONFIG,
+    )
+
+
+def build_search_components() -> SearchComponents:
+    """Load the encoder and build or attach to the FAISS index."""
+    model = load_search_encoder()
+    if INDEX_MODE == "shared":
+        index_manager = SharedIndexReader(
+            CACHE_DIR,
+            index_cache_key(model.model_id, INDEX_CONFIG),
+            model.get_sentence_embedding_dimension(),
+            index_config=INDEX_CONFIG,
+            load_passages=PASSAGE_CONFIG is not None,
+        )
+    else:
+        # Later refreshes only re-encode added or edited rows
+        index_manager = build_index_manager(model)
+        index_manager.load_cache()
+    index_manager.refresh()
+
+    # Logistic fit from calibrate_confidence.py, only used in cosine mode
+    calibrator = load_calibrator(
+        os.getenv("SEARCH_CALIBRATION_FILE", "./data/confidence_calibration.json"),
+        model.model_id,
+    )
+
+    reranker = None
+    if RERANK_MODEL:
+        reranker = CrossEncoderReranker(
+            RERANK_MODEL, top_n=RERANK_TOP_N, cache_size=RERANK_CACHE_SIZE
+        )
+
+    # Everything besides the rows that changes the ranking; part of result cache keys
+    ranking = {
+        "model": model.model_id,
+        "index": asdict(INDEX_CONFIG),
+        "retrieval": RETRIEVAL_MODE,
+        "rrf_k": RRF_K,
+        "fusion_depth": FUSION_DEPTH,
+        "calibrator": asdict(calibrator) if calibrator else None,
+        "passages": asdict(PASSAGE_CONFIG) if PASSAGE_CONFIG else None,
+        "rerank": [RERANK_MODEL, RERANK_TOP_N] if reranker else None,
+    }
+    ranking_tag = hashlib.sha1(json.dumps(ranking, sort_keys=True).encode()).hexdigest()
+    return SearchComponents(model, index_manager, calibrator, ranking_tag[:12], reranker)
+
+
+# Seconds between automatic refreshes, 0 disables the timer
+REFRESH_INTERVAL = float(os.getenv("SEARCH_REFRESH_INTERVAL", "0"))
+
+# Nothing heavy runs at import time; the app's lifespan starts the warm-up
+search_service = SearchService(
+    build_search_components,
+    refresh_interval=SHARED_POLL_SECONDS if INDEX_MODE == "shared" else REFRESH_INTERVAL,
+    retry_seconds=float(os.getenv("SEARCH_WARMUP_RETRY_SECONDS", "10")),
+)
+
+# Confidence at or above which a hit counts as relevant to the query
+RELEVANCE_THRESHOLD = float(os.getenv("SEARCH_RELEVANCE_THRESHOLD", "0.5"))
+
+# "hybrid" fuses BM25 keyword hits with the semantic ranking, "semantic" skips BM25
+RETRIEVAL_MODE = os.getenv("SEARCH_RETRIEVAL", "hybrid")
+RRF_K = int(os.getenv("SEARCH_RRF_K", "60"))
+# Semantic and keyword hits fused per query, whatever the page; pages within
+# this depth are slices of one fused ranking
+FUSION_DEPTH = int(os.getenv("SEARCH_FUSION_DEPTH", "50"))
+
+# Page size when callers don't ask for one
+DEFAULT_K = 10
+
+# Repeated queries (chatbot fallbacks, suggested topics) skip the transformer
+query_cache = QueryEmbeddingCache(
+    max_size=int(os.getenv("QUERY_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("QUERY_CACHE_TTL", "3600")),
+)
+
+# Whole result pages for /search and the chatbot tool, keyed by index snapshot;
+# set SEARCH_RESULT_CACHE_REDIS_URL to share them across workers
+RESULT_CACHE_REDIS_URL = os.getenv("SEARCH_RESULT_CACHE_REDIS_URL")
+if RESULT_CACHE_REDIS_URL:
+    result_cache = RedisResultCache.from_url(
+        RESULT_CACHE_REDIS_URL,
+        ttl_seconds=int(os.getenv("SEARCH_RESULT_CACHE_TTL", "3600")),
+    )
+else:
+    result_cache = MemoryResultCache(
+        max_bytes=int(os.getenv("SEARCH_RESULT_CACHE_BYTES", str(64 * 2**20)))
+    )
+
+
+def encode_queries(
+    queries: List[str], cache: Optional[QueryEmbeddingCache] = None
+) -> np.ndarray:
+    """
+    Embed search queries as an (n, dimension) float32 array.
+
+    Cached queries are served from ``cache`` (the search query cache by
+    default); the rest are encoded in a single batched ``model.encode`` call.
+    """
+    cache = cache or query_cache
+    model = search_service.components.model
+    vectors = [cache.get(model.model_id, query) for query in queries]
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        texts = [normalize_query(queries[i]) for i in missing]
+        encoded = model.encode(texts, convert_to_numpy=True)
+        for i, vector in zip(missing, encoded):
+            cache.put(model.model_id, queries[i], vector)
+            vectors[i] = vector
+    query_vecs = np.vstack(vectors).astype(np.float32)
+    if INDEX_CONFIG.normalize:
+        query_vecs = l2_normalize(query_vecs)
+    return query_vecs
+
+
+def rank_vectors(
+    snapshot, query_vecs: np.ndarray, top_k: int, filters: Optional[Dict] = None
+):
+    """
+    Run one batched FAISS search over the rows allowed by ``filters``.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Distances and project ids, one row per
+        query vector. Ids are -1 where fewer than ``top_k`` rows matched.
+    """
+    empty = no_hits(len(query_vecs))
+    if snapshot.size == 0 or top_k <= 0:
+        return empty
+
+    selector = None
+    candidates = snapshot.size
+    mask = snapshot.filters.mask(filters)
+    if mask is not None:
+        allowed_ids = snapshot.ids[mask]
+        candidates = len(allowed_ids)
+        if candidates == 0:
+            return empty
+        selector = faiss.IDSelectorBatch(allowed_ids)
+
+    search_params = search_parameters(
+        snapshot.index, INDEX_CONFIG, selector
+    )
+    return snapshot.index.search(
+        query_vecs, min(top_k, candidates), params=search_params
+    )
+
+
+def no_hits(queries: int):
+    return (
+        np.empty((queries, 0), dtype=np.float32),
+        np.empty((queries, 0), dtype=np.int64),
+    )
+
+
+def rank_passages(
+    snapshot, query_vecs: np.ndarray, top_k: int, filters: Optional[Dict] = None
+):
+    """
+    ``rank_vectors`` over the snapshot's passages, scoring each project by its best one.
+
+    ``top_k * PASSAGE_OVERSAMPLE`` passages are fetched so enough distinct
+    projects remain once they are collapsed by ``max_sim``.
+    """
+    passages = snapshot.passages
+    if passages.size == 0 or top_k <= 0:
+        return no_hits(len(query_vecs))
+
+    selector = None
+    candidates = passages.size
+    mask = snapshot.filters.mask(filters)
+    if mask is not None:
+        allowed_ids = snapshot.ids[mask]
+        candidates = int(np.isin(passages.owners, allowed_ids).sum())
+        if candidates == 0:
+            return no_hits(len(query_vecs))
+        selector = faiss.IDSelectorBatch(allowed_ids)
+
+    search_params = search_parameters(passages.index, INDEX_CONFIG, selector)
+    distances, labels = passages.index.search(
+        query_vecs, min(top_k * PASSAGE_OVERSAMPLE, candidates), params=search_params
+    )
+    return max_sim(distances, labels, top_k, INDEX_CONFIG.normalize)
+
+
+def rank_queries(
+    snapshot, query_vecs: np.ndarray, top_k: int, filters: Optional[Dict] = None
+) -> List[Tuple[np.ndarray, np.ndarray, bool]]:
+    """
+    Rank each query vector, over passages where the snapshot has them.
+
+    As many queries as fit ``passage_budget`` go through ``rank_passages``,
+    the rest through the single-vector index.
+
+    Returns:
+        List[Tuple[np.ndarray, np.ndarray, bool]]: Distances, project ids and
+        whether passages were used, one entry per query vector.
+    """
+    multi = 0
+    if snapshot.passages is not None:
+        multi = passage_budget.items_within(len(query_vecs))
+    hits = []
+    if multi:
+        with span("search.passages"):
+            start = time.perf_counter()
+            distances, labels = rank_passages(snapshot, query_vecs[:multi], top_k, filters)
+            passage_budget.record((time.perf_counter() - start) * 1000, multi)
+        hits += [(d, l, True) for d, l in zip(distances, labels)]
+    if multi < len(query_vecs):
+        with span("search.faiss"):
+            distances, labels = rank_vectors(snapshot, query_vecs[multi:], top_k, filters)
+        hits += [(d, l, False) for d, l in zip(distances, labels)]
+    return hits
+
+
+def fuse_keyword_hits(
+    snapshot,
+    query: str,
+    query_vec: np.ndarray,
+    distances: np.ndarray,
+    labels: np.ndarray,
+    top_k: int,
+    mask: Optional[np.ndarray] = None,
+    passages=None,
+):
+    """
+    Merge one query's FAISS hits with its BM25 hits by reciprocal-rank fusion.
+
+    Keyword-only hits get their embedding score computed directly from the
+    stored vectors (their best passage when ``passages`` ranked the query), so
+    every result still carries a semantic confidence.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Scores and project ids in fused order.
+    """
+    _, positions = snapshot.lexical.search(query, top_k, mask)
+    keyword_ids = snapshot.ids[positions].tolist()
+    semantic_ids = [pid for pid in labels.tolist() if pid in snapshot.positions]
+    if not keyword_ids:
+        return distances, labels
+
+    scores = dict(zip(labels.tolist(), distances.tolist()))
+    fused = reciprocal_rank_fusion([semantic_ids, keyword_ids], k=RRF_K)
+    missing = [pid for pid in fused if pid not in scores]
+    if missing and passages is not None:
+        extra = passages.best_scores(missing, query_vec, INDEX_CONFIG.normalize)
+        scores.update(zip(missing, extra.tolist()))
+    elif missing:
+        vectors = snapshot.embeddings[[snapshot.positions[pid] for pid in missing]]
+        if INDEX_CONFIG.normalize:
+            extra = vectors @ query_vec
+        else:
+            extra = ((vectors - query_vec) ** 2).sum(axis=1)
+        scores.update(zip(missing, extra.tolist()))
+    return (
+        np.array([scores[pid] for pid in fused], dtype=np.float32),
+        np.array(fused, dtype=np.int64),
+    )
+
+
+def ranking_mode(snapshot, multi_vector: bool = True) -> str:
+    """
+    How a query was ranked: "passages" (max-sim over passages) or "vector".
+
+    Under load ``rank_queries`` falls back to the single-vector index, so the
+    mode is part of result cache and re-rank keys alongside ``ranking_tag``.
+    """
+    return "passages" if multi_vector and snapshot.passages is not None else "vector"
+
+
+def rerank_text(
+    snapshot, project_id: int, pos: int, query_vec: np.ndarray, multi_vector: bool
+) -> str:
+    """
+    The text the cross-encoder reads for one hit.
+
+    With passages, that is the project's passage closest to the query, the
+    one that ranked it; otherwise the title and description it was embedded from.
+    """
+    row = snapshot.metadata.result_dict(pos, 0.0)
+    passages = snapshot.passages if multi_vector else None
+    if passages is not None and PASSAGE_CONFIG is not None and project_id in passages.spans:
+        texts = project_passages(row, PASSAGE_CONFIG)
+        vectors = passages.project_vectors(project_id)
+        # Stored vectors follow project_passages order; skip rows edited since they were embedded
+        if len(texts) == len(vectors):
+            if INDEX_CONFIG.normalize:
+                scores = vectors @ query_vec
+            else:
+                scores = -((vectors - query_vec) ** 2).sum(axis=1)
+            return texts[int(np.argmax(scores))]
+    return embedding_text(row)
 
-# Charities data
-charities = fetch_charities_from_supabase()
 
-# Create embeddings
-texts = [f"{c['title']} {c['description']}" for c in charities]
-embeddings = model.encode(texts, convert_to_numpy=True)
+def rerank_hits(
+    snapshot,
+    reranker: CrossEncoderReranker,
+    job: SearchJob,
+    query_vec: np.ndarray,
+    distances: np.ndarray,
+    labels: np.ndarray,
+    multi_vector: bool = False,
+):
+    """
+    Reorder the head of one query's ranking by cross-encoder score.
+
+    The first ``reranker.top_n`` hits are scored, whatever the load, and
+    the rest follow in their first-stage order. Callers retrieve at least
+    that many hits, so the head doesn't depend on the requested page, and
+    its order is cached per snapshot, ranking mode, query and filters, so
+    paging scores it once. Distances move with their project, so
+    confidences still come from the embedding scores.
+    """
+    metadata = snapshot.metadata
+    rows = [snapshot.positions.get(pid) for pid in labels.tolist()]
+    head = [i for i, pos in enumerate(rows) if pos is not None and metadata.present[pos]]
+    head = head[: reranker.top_n]
+    if len(head) < 2:
+        return distances, labels
+    key = (
+        snapshot.cache_token,
+        ranking_mode(snapshot, multi_vector),
+        normalize_query(job.query),
+        job.filters_key,
+    )
+    order = reranker.order(
+        key,
+        job.query,
+        lambda: [
+            rerank_text(snapshot, int(labels[i]), rows[i], query_vec, multi_vector) for i in head
+        ],
+    )
+    reordered = [head[i] for i in order]
+    scored = set(head)
+    rest = [i for i in range(len(labels)) if i not in scored]
+    order = np.array(reordered + rest, dtype=np.int64)
+    return distances[order], labels[order]
+
+
+def confidence_scores(distances: np.ndarray) -> np.ndarray:
+    """
+    Map FAISS scores to confidences in [0, 1].
+
+    In cosine mode the scores are similarities, mapped through the fitted
+    calibration curve when one is loaded so the result reads as a probability
+    of relevance. Without one the similarity itself is used. In L2 mode the
+    confidence is ``1 - d / (d + 1)`` on the raw distance.
+    """
+    distances = np.asarray(distances, dtype=np.float64)
+    if INDEX_CONFIG.normalize:
+        calibrator = search_service.components.calibrator
+        if calibrator is not None:
+            return calibrator.predict(distances)
+        return np.clip(distances, 0.0, 1.0)
+    distances = np.maximum(distances, 0.0)
+    return 1.0 - distances / (distances + 1.0)
+
+
+def relevance_calibrated() -> bool:
+    """Whether confidences come from a fitted curve, so ``is_relevant`` can be trusted."""
+    return INDEX_CONFIG.normalize and search_service.components.calibrator is not None
+
 
-# Build FAISS index
-dimension = embeddings.shape[1]
-index = faiss.IndexFlatL2(dimension)
-index.add(embeddings)
+def is_relevant(confidence: float) -> bool:
+    return confidence >= RELEVANCE_THRESHOLD
 
 
-def search_charities(query: str) -> List[Dict]:
+def build_page(
+    snapshot,
+    distances: np.ndarray,
+    labels: np.ndarray,
+    k: int,
+    offset: int = 0,
+    min_confidence: float = 0.0,
+    sorted_by_score: bool = True,
+    raw_json: bool = False,
+) -> Union[List[Dict], bytes]:
     """
-    Search for charities based on a query using semantic similarity, returning all results sorted by relevance.
+    Turn one query's ranked hits into a page of charity results with confidence scores.
+
+    Results come from the snapshot's metadata store: serialized JSON bytes
+    when ``raw_json`` is set, otherwise a list of fresh dicts.
+    """
+    metadata = snapshot.metadata
+    positions, confidences = [], []
+    for project_id, confidence in zip(labels.tolist(), confidence_scores(distances)):
+        pos = snapshot.positions.get(project_id)
+        if pos is None or not metadata.present[pos]:
+            continue
+        if confidence < min_confidence:
+            if sorted_by_score:
+                # Results are sorted by score, so the rest score lower still
+                break
+            continue
+        positions.append(pos)
+        confidences.append(confidence)
+
+    positions = positions[offset : offset + k]
+    confidences = confidences[offset : offset + k]
+    if raw_json:
+        return metadata.page_json(positions, confidences)
+    return [metadata.result_dict(pos, conf) for pos, conf in zip(positions, confidences)]
+
+
+def search_charities(
+    query: str,
+    k: int = DEFAULT_K,
+    offset: int = 0,
+    min_confidence: float = 0.0,
+    filters: Optional[Dict] = None,
+) -> List[Dict]:
+    """
+    Search for charities based on a query using semantic similarity, fused with
+    BM25 keyword matches in hybrid mode, returning one page of results sorted by relevance.
 
     Args:
         query (str): The search query.
+        k (int): Maximum number of results to return.
+        offset (int): Number of ranked results to skip, for pagination.
+        min_confidence (float): Drop results scoring below this confidence.
+        filters (Optional[Dict]): Restrict results by ``category``, ``location``,
+            ``verified`` and/or ``funding_complete``.
+
+    Returns:
+        List[Dict]: Matching charity dictionaries with metadata and confidence scores.
+    """
+    return search_charities_batch([SearchJob(query, k, offset, min_confidence, filters)])[0]
+
+
+def search_charities_batch(jobs: List[SearchJob]) -> List[Union[List[Dict], Tuple[bytes, str]]]:
+    """
+    Run several searches with one encode call and one FAISS search per filter set.
 
     Returns:
-        List[Dict]: List of all matching charity dictionaries with metadata and confidence scores.
-    """
-    query_vec = model.encode([query], convert_to_numpy=True)
-    distances, indices = index.search(query_vec, len(charities))
-    results = []
-    for idx, distance in zip(indices[0], distances[0]):
-        if idx < len(charities):
-            confidence = max(0.0, 1.0 - (distance / (distance + 1.0)))
-            charity = charities[idx].copy()
-            charity["confidence"] = float(confidence)
-            results.append(charity)
+        List[Union[List[Dict], Tuple[bytes, str]]]: One result page per job,
+        in the order given; for jobs with ``raw_json`` set, the page as JSON
+        bytes and the ``ranking_mode`` it was ranked with.
+    """
+    snapshot = search_service.components.index_manager.snapshot
+    results: List[Union[List[Dict], Tuple[bytes, str]]] = [
+        (b"[]", ranking_mode(snapshot)) if job.raw_json else [] for job in jobs
+    ]
+    active = [i for i, job in enumerate(jobs) if job.k > 0]
+    if snapshot.size == 0 or not active:
+        return results
+
+    SEARCH_BATCH_SIZE.observe(len(active))
+    with span("search.encode"):
+        query_vecs = encode_queries([jobs[i].query for i in active])
+    groups: Dict[str, List[int]] = {}
+    for row, i in enumerate(active):
+        groups.setdefault(jobs[i].filters_key, []).append(row)
+
+    hybrid = RETRIEVAL_MODE == "hybrid"
+    reranker = search_service.components.reranker
+    for rows in groups.values():
+        group_jobs = [jobs[active[row]] for row in rows]
+        top_k = max(job.offset + job.k for job in group_jobs)
+        if hybrid:
+            # Fuse at a depth that doesn't depend on the page, then paginate
+            top_k = max(top_k, FUSION_DEPTH)
+        if reranker is not None:
+            # Re-rank the same head whatever the page, so pages neither overlap nor skip
+            top_k = max(top_k, reranker.top_n)
+        hits = rank_queries(snapshot, query_vecs[rows], top_k, group_jobs[0].filters)
+        mask = snapshot.filters.mask(group_jobs[0].filters) if hybrid else None
+        for row, job, (job_distances, job_labels, multi) in zip(rows, group_jobs, hits):
+            if hybrid:
+                with span("search.lexical"):
+                    job_distances, job_labels = fuse_keyword_hits(
+                        snapshot,
+                        job.query,
+                        query_vecs[row],
+                        job_distances,
+                        job_labels,
+                        top_k,
+                        mask,
+                        passages=snapshot.passages if multi else None,
+                    )
+            reranked = reranker is not None and job.offset < reranker.top_n
+            if reranked:
+                with span("search.rerank"):
+                    job_distances, job_labels = rerank_hits(
+                        snapshot,
+                        reranker,
+                        job,
+                        query_vecs[row],
+                        job_distances,
+                        job_labels,
+                        multi_vector=multi,
+                    )
+            with span("search.build_page"):
+                page = build_page(
+                    snapshot,
+                    job_distances,
+                    job_labels,
+                    job.k,
+                    job.offset,
+                    job.min_confidence,
+                    sorted_by_score=not hybrid and not reranked,
+                    raw_json=job.raw_json,
+                )
+            results[active[row]] = (page, ranking_mode(snapshot, multi)) if job.raw_json else page
     return results
+
+
+# Concurrent async callers are coalesced into batched encode + search calls
+search_batcher = SearchBatcher(
+    search_charities_batch,
+    max_batch_size=int(os.getenv("SEARCH_BATCH_SIZE", "32")),
+    max_wait_ms=float(os.getenv("SEARCH_BATCH_WAIT_MS", "5")),
+    max_workers=int(os.getenv("SEARCH_WORKER_THREADS", str(os.cpu_count() or 1))),
+)
+
+
+def search_result_key(job: SearchJob, mode: Optional[str] = None) -> str:
+    """
+    Result cache key (and ETag seed) for ``job`` against the current snapshot.
+
+    ``mode`` defaults to the snapshot's preferred ``ranking_mode``; pages
+    ranked by the single-vector fallback get a key of their own.
+    """
+    components = search_service.components
+    snapshot = components.index_manager.snapshot
+    mode = mode or ranking_mode(snapshot)
+    token = f"{components.ranking_tag}.{mode}.{snapshot.cache_token}"
+    return result_cache_key(token, job)
+
+
+async def cached_search(job: SearchJob, key: Optional[str] = None) -> Tuple[bytes, str]:
+    """
+    One page of results as JSON bytes, served from the result cache when possible.
+
+    A refresh moves lookups to new keys, so a cached page is never older than
+    the snapshot it is served for.
+
+    Returns:
+        Tuple[bytes, str]: The page and the result key of the ranking that
+        produced it, which differs from ``key`` when the search fell back to
+        the single-vector index.
+    """
+    key = key or search_result_key(job)
+    with span("search.cache_get"):
+        if isinstance(result_cache, RedisResultCache):
+            body = await asyncio.to_thread(result_cache.get, key)
+        else:
+            body = result_cache.get(key)
+    if body is not None:
+        return body, key
+
+    # Queue wait plus the batch's encode, FAISS and page building
+    with span("search.batch"):
+        body, mode = await search_batcher.submit(replace(job, raw_json=True))
+    served = search_result_key(job, mode)
+    if served != key:
+        # A fallback ranking (or a refresh mid-search) isn't cached under the
+        # preferred key, so the full ranking replaces it once load drops
+        return body, served
+    with span("search.cache_put"):
+        if isinstance(result_cache, RedisResultCache):
+            await asyncio.to_thread(result_cache.put, key, body)
+        else:
+            result_cache.put(key, body)
+    return body, key
\ No newline at end of file
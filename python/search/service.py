@@ -0,0 +1,132 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Union
+
+from search.index_manager import CharityIndexManager
+from search.shared_index import SharedIndexReader
+
+
+class SearchNotReady(RuntimeError):
+    """Raised when a search is attempted before the index has been built."""
+
+
+@dataclass
+class SearchComponents:
+    """Everything a search needs, built once by the warm-up."""
+
+    model: Any
+    index_manager: Union[CharityIndexManager, SharedIndexReader]
+    calibrator: Any = None
+    ranking_tag: str = ""
+    reranker: Any = None
+
+
+class SearchService:
+    """
+    Builds the search stack off the import path and tracks whether it is ready.
+
+    Importing the app only constructs this object. ``start`` loads the
+    encoder, fetches the catalogue and builds the index on a background
+    thread, so the server accepts connections (and answers liveness probes)
+    straight away; until the warm-up finishes ``components`` raises
+    ``SearchNotReady`` and the API answers with 503. A failed warm-up, e.g.
+    Supabase being unreachable, is retried every ``retry_seconds``.
+    """
+
+    def __init__(
+        self,
+        initialize: Callable[[], SearchComponents],
+        refresh_interval: float = 0,
+        retry_seconds: float = 10,
+    ):
+        self.initialize = initialize
+        self.refresh_interval = refresh_interval
+        self.retry_seconds = retry_seconds
+        self.state = "idle"
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.ready_at: Optional[float] = None
+        self._components: Optional[SearchComponents] = None
+        self._lock = threading.Lock()
+        self._ready_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._components is not None
+
+    @property
+    def components(self) -> SearchComponents:
+        components = self._components
+        if components is None:
+            raise SearchNotReady(f"Search index is {self.state}")
+        return components
+
+    def start(self):
+        """Warm up on a background thread; returns immediately."""
+        with self._lock:
+            if self.ready or (self._thread and self._thread.is_alive()):
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="search-warmup", daemon=True
+            )
+            self._thread.start()
+
+    def warm_up(self) -> SearchComponents:
+        """Build the components on the calling thread (scripts, tests, workers)."""
+        with self._lock:
+            if self._components is None:
+                self._build()
+            return self._components
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready_event.wait(timeout)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._components:
+            self._components.index_manager.stop_auto_refresh()
+
+    def status(self) -> Dict:
+        status = {"state": self.state, "ready": self.ready}
+        if self.error:
+            status["error"] = self.error
+        if self.ready_at and self.started_at:
+            status["warmup_seconds"] = round(self.ready_at - self.started_at, 3)
+        if self._components:
+            snapshot = self._components.index_manager.snapshot
+            status["index_size"] = snapshot.size
+            status["generation"] = snapshot.generation
+        return status
+
+    def _build(self):
+        self.state = "warming"
+        self.started_at = time.monotonic()
+        components = self.initialize()
+        if self.refresh_interval > 0:
+            components.index_manager.start_auto_refresh(self.refresh_interval)
+        self._components = components
+        self.ready_at = time.monotonic()
+        self.state = "ready"
+        self.error = None
+        self._ready_event.set()
+        print(f"Search service ready in {self.ready_at - self.started_at:.1f}s")
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                with self._lock:
+                    if self._components is None:
+                        self._build()
+                return
+            except Exception as e:
+                self.state = "failed"
+                self.error = str(e)
+                print(f"Search warm-up failed, retrying in {self.retry_seconds}s: {e}")
+            self._stop_event.wait(self.retry_seconds)
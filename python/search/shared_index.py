@@ -0,0 +1,106 @@
+import threading
+from typing import Dict, Optional
+
+from search.index_cache import current_entry, load_index_cache
+from search.index_factory import IndexConfig
+from search.index_manager import IndexSnapshot
+
+
+class SharedIndexReader:
+    """
+    Read-only view of an index written to ``cache_dir`` by another process.
+
+    One builder (``build_index.py``) fetches the catalogue, encodes it and
+    publishes each generation to the cache directory. Every API worker
+    attaches with this reader instead of building its own index: the
+    embedding matrix, the derived filter, keyword, metadata and typeahead
+    stores and, where FAISS supports it, the index are memory-mapped, so all
+    workers share the same physical pages and per-worker memory doesn't grow
+    with the catalogue. The raw rows are never parsed, and the passage index
+    is only attached with ``load_passages`` (multi-vector search on). ``refresh``
+    checks the ``CURRENT`` pointer and swaps in a new generation atomically
+    when the builder has published one.
+
+    Exposes the same ``snapshot``/``refresh``/auto-refresh surface as
+    ``CharityIndexManager`` so the search path doesn't care which it has.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        cache_key: str,
+        dimension: int,
+        index_config: Optional[IndexConfig] = None,
+        load_passages: bool = False,
+    ):
+        self.cache_dir = cache_dir
+        self.cache_key = cache_key
+        self.dimension = dimension
+        self.index_config = index_config or IndexConfig()
+        self.load_passages = load_passages
+        self._snapshot: Optional[IndexSnapshot] = None
+        self._entry: Optional[str] = None
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._timer_thread: Optional[threading.Thread] = None
+
+    @property
+    def snapshot(self) -> IndexSnapshot:
+        if self._snapshot is None:
+            raise RuntimeError(f"No shared index attached from {self.cache_dir}")
+        return self._snapshot
+
+    def refresh(self) -> Dict[str, int]:
+        """
+        Attach to the newest published generation if it changed.
+
+        Raises:
+            RuntimeError: If nothing has been published yet, or the current
+            entry can't be loaded and no earlier one is attached.
+        """
+        with self._refresh_lock:
+            entry = current_entry(self.cache_dir)
+            if entry is not None and entry != self._entry:
+                cached = load_index_cache(
+                    self.cache_dir,
+                    self.cache_key,
+                    self.dimension,
+                    entry_name=entry,
+                    mmap_index=True,
+                    load_rows=False,
+                    load_passages=self.load_passages,
+                )
+                if cached is not None:
+                    self._snapshot = IndexSnapshot(**cached).warm()
+                    self._entry = entry
+                    print(
+                        f"Attached shared search index generation {self._snapshot.generation} "
+                        f"({self._snapshot.size} rows)"
+                    )
+            if self._snapshot is None:
+                raise RuntimeError(f"No usable shared index in {self.cache_dir} yet")
+            return {"generation": self._snapshot.generation, "size": self._snapshot.size}
+
+    def start_auto_refresh(self, interval_seconds: float):
+        """Poll for new generations every ``interval_seconds`` on a background thread."""
+        if self._timer_thread and self._timer_thread.is_alive():
+            return
+        self._stop_event.clear()
+
+        def run():
+            while not self._stop_event.wait(interval_seconds):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Shared search index poll failed: {e}")
+
+        self._timer_thread = threading.Thread(
+            target=run, name="search-index-attach", daemon=True
+        )
+        self._timer_thread.start()
+
+    def stop_auto_refresh(self):
+        self._stop_event.set()
+        if self._timer_thread:
+            self._timer_thread.join(timeout=5)
+            self._timer_thread = None
@@ -0,0 +1,186 @@
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from search.packed import PackedStrings
+
+# Row field -> suggestion type
+SUGGEST_FIELDS = {
+    "title": "title",
+    "organization_name": "organization",
+    "category": "category",
+    "location": "location",
+}
+SUGGEST_TYPES = tuple(SUGGEST_FIELDS.values())
+
+MAX_SUGGESTIONS = 20
+
+# Matches at the start of a phrase outrank matches on a later word
+_START_BONUS = 1e15
+# Then phrases shared by more projects, then more supporters
+_PROJECT_WEIGHT = 1e6
+_MAX_SUPPORTERS = 999_999
+
+_WORD_RE = re.compile(r"\w+")
+# Sorts after every key that starts with a given prefix
+_PREFIX_END = "\U0010ffff"
+
+
+def normalize_phrase(text) -> str:
+    return " ".join(_WORD_RE.findall(str(text).casefold()))
+
+
+def _values(value) -> Iterable:
+    if value is None:
+        return ()
+    if isinstance(value, (list, tuple)):
+        return value
+    return (value,)
+
+
+class PrefixIndex:
+    """
+    Typeahead completions over the catalogue's titles, organizations, categories and locations.
+
+    Every distinct phrase is normalized (casefolded, punctuation dropped) and
+    stored once per word it contains, as the suffix starting at that word, in
+    one sorted array. A prefix lookup is two bisections plus a partial sort of
+    the scores in that range, so "water" completes "Clean Water for Rural
+    Kelantan" without touching the encoder. The hottest lookups, one- and
+    two-character prefixes whose ranges span much of the array, are answered
+    from a table computed at build time.
+
+    Phrases and keys are packed into byte arrays and the rest are numpy
+    arrays, so ``to_arrays``/``from_arrays`` can share one copy between
+    processes memory-mapped from disk.
+    """
+
+    def __init__(self, ids: np.ndarray, rows: Dict[int, Dict], short_prefix: int = 2):
+        phrase_ids: Dict[tuple, int] = {}
+        texts: List[str] = []
+        types: List[str] = []
+        project_ids: List[int] = []
+        counts: List[int] = []
+        supporters: List[int] = []
+        for pid in ids.tolist():
+            row = rows.get(pid)
+            if not row:
+                continue
+            for field, kind in SUGGEST_FIELDS.items():
+                for value in _values(row.get(field)):
+                    phrase = normalize_phrase(value)
+                    if not phrase:
+                        continue
+                    n = phrase_ids.setdefault((kind, phrase), len(texts))
+                    if n == len(texts):
+                        texts.append(str(value).strip())
+                        types.append(kind)
+                        project_ids.append(pid)
+                        counts.append(0)
+                        supporters.append(0)
+                    counts[n] += 1
+                    supporters[n] += int(row.get("supporters") or 0)
+        self.texts = PackedStrings.pack(texts)
+        self.project_ids = np.array(project_ids, dtype=np.int64)
+        self.counts = np.array(counts, dtype=np.int64)
+        self.type_codes = np.array([SUGGEST_TYPES.index(kind) for kind in types], dtype=np.int8)
+
+        keys, owners, scores = [], [], []
+        for (_, phrase), n in phrase_ids.items():
+            base = counts[n] * _PROJECT_WEIGHT + min(supporters[n], _MAX_SUPPORTERS)
+            offset = 0
+            for i, word in enumerate(phrase.split(" ")):
+                keys.append(phrase[offset:])
+                owners.append(n)
+                scores.append(base + (_START_BONUS if i == 0 else 0.0))
+                offset += len(word) + 1
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.keys = PackedStrings.pack([keys[i] for i in order])
+        self.owners = np.array(owners, dtype=np.int64)[order] if keys else np.empty(0, np.int64)
+        self.scores = np.array(scores, dtype=np.float64)[order] if keys else np.empty(0)
+        self._build_short(short_prefix)
+
+    def _build_short(self, short_prefix: int):
+        self._short: Dict[str, List[int]] = {}
+        for length in range(1, short_prefix + 1):
+            for prefix in {key[:length] for key in self.keys if len(key) >= length}:
+                self._short[prefix] = self._rank(prefix, MAX_SUGGESTIONS, None)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            **self.texts.to_arrays("texts"),
+            **self.keys.to_arrays("keys"),
+            "project_ids": self.project_ids,
+            "counts": self.counts,
+            "type_codes": self.type_codes,
+            "owners": self.owners,
+            "scores": self.scores,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], short_prefix: int = 2) -> "PrefixIndex":
+        index = cls.__new__(cls)
+        index.texts = PackedStrings.from_arrays(arrays, "texts")
+        index.keys = PackedStrings.from_arrays(arrays, "keys")
+        for name in ("project_ids", "counts", "type_codes", "owners", "scores"):
+            setattr(index, name, arrays[name])
+        index._build_short(short_prefix)
+        return index
+
+    @property
+    def size(self) -> int:
+        return len(self.texts)
+
+    def _rank(self, prefix: str, limit: int, types: Optional[List[str]]) -> List[int]:
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + _PREFIX_END, lo)
+        if lo == hi:
+            return []
+        owners = self.owners[lo:hi]
+        scores = self.scores[lo:hi]
+        if types:
+            wanted = np.isin(self.type_codes[owners], [SUGGEST_TYPES.index(t) for t in types])
+            owners, scores = owners[wanted], scores[wanted]
+        # A phrase can match on several of its words, so keep spares for duplicates
+        take = min(len(scores), limit * 4)
+        if take < len(scores):
+            top = np.argpartition(-scores, take - 1)[:take]
+            top = top[np.argsort(-scores[top], kind="stable")]
+        else:
+            top = np.argsort(-scores, kind="stable")
+        ranked: List[int] = []
+        for n in owners[top].tolist():
+            if n not in ranked:
+                ranked.append(n)
+                if len(ranked) == limit:
+                    break
+        return ranked
+
+    def complete(
+        self, text: str, limit: int = 8, types: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """
+        Up to ``limit`` phrases containing a word that starts with ``text``, best first.
+
+        Phrase-start matches rank above later-word matches, then phrases shared
+        by more projects, then those with more supporters. ``types`` restricts
+        the result to some of ``SUGGEST_TYPES``.
+        """
+        prefix = normalize_phrase(text)
+        limit = min(limit, MAX_SUGGESTIONS)
+        if not prefix or limit <= 0:
+            return []
+        if not types and prefix in self._short:
+            ranked = self._short[prefix][:limit]
+        else:
+            ranked = self._rank(prefix, limit, types)
+        suggestions = []
+        for n in ranked:
+            kind = SUGGEST_TYPES[self.type_codes[n]]
+            suggestion = {"text": self.texts[n], "type": kind, "count": int(self.counts[n])}
+            if kind == "title":
+                suggestion["project_id"] = int(self.project_ids[n])
+            suggestions.append(suggestion)
+        return suggestions
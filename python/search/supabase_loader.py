@@ -0,0 +1,83 @@
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+from search.metadata_store import NESTED_FIELDS, RESULT_FIELDS
+
+# Environment variables the Supabase client is configured from, shared with
+# the Next.js app; benchmarks/fakes.py exports the same names
+SUPABASE_URL_ENV = "NEXT_PUBLIC_SUPABASE_URL"
+SUPABASE_KEY_ENV = "NEXT_PUBLIC_SUPABASE_ANON_KEY"
+
+# Large JSON fields that are only ever displayed: fetched separately, and only
+# for rows that need them, rather than with every page of the catalogue scan
+DISPLAY_COLUMNS = tuple(field for field in NESTED_FIELDS if field != "category")
+# Everything the index itself needs: embedding text, filter and keyword
+# fields, and the small scalars shown with every result
+INDEX_COLUMNS = tuple(field for field in RESULT_FIELDS if field not in DISPLAY_COLUMNS)
+
+
+class SupabaseCatalogue:
+    """
+    Keyset-paginated reads of the ``charity_projects`` table.
+
+    ``index_pages`` walks the table in ``id`` order, ``page_size`` rows at a
+    time (``id > last_id ORDER BY id LIMIT page_size``), selecting only
+    ``INDEX_COLUMNS``, so no single response holds the whole table and pages
+    stay cheap however deep the scan goes, unlike ``OFFSET`` paging.
+    ``display_fields`` fetches the ``DISPLAY_COLUMNS`` for given ids, or for
+    every row, in bounded chunks.
+    """
+
+    def __init__(
+        self,
+        client: Callable,
+        table: str = "charity_projects",
+        page_size: int = 1000,
+        hydrate_chunk: int = 200,
+    ):
+        self.client = client
+        self.table = table
+        self.page_size = max(1, page_size)
+        # Ids go in the URL (id=in.(...)), so keep the lists short
+        self.hydrate_chunk = max(1, hydrate_chunk)
+
+    def pages(self, columns: Sequence[str]) -> Iterator[List[Dict]]:
+        last_id = None
+        while True:
+            query = (
+                self.client()
+                .table(self.table)
+                .select(",".join(columns))
+                .order("id")
+                .limit(self.page_size)
+            )
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            rows = query.execute().data or []
+            if rows:
+                yield rows
+            if len(rows) < self.page_size:
+                return
+            last_id = rows[-1]["id"]
+
+    def index_pages(self, extra_columns: Sequence[str] = ()) -> Iterator[List[Dict]]:
+        """The catalogue, page by page, with the columns the index needs plus ``extra_columns``."""
+        columns = INDEX_COLUMNS + tuple(c for c in extra_columns if c not in INDEX_COLUMNS)
+        return self.pages(columns)
+
+    def display_fields(self, ids: Optional[List[int]] = None) -> Iterator[Dict]:
+        """``id`` plus ``DISPLAY_COLUMNS`` for ``ids``, or for every row if None."""
+        columns = ("id",) + DISPLAY_COLUMNS
+        if ids is None:
+            for page in self.pages(columns):
+                yield from page
+            return
+        for start in range(0, len(ids), self.hydrate_chunk):
+            chunk = ids[start : start + self.hydrate_chunk]
+            response = (
+                self.client()
+                .table(self.table)
+                .select(",".join(columns))
+                .in_("id", chunk)
+                .execute()
+            )
+            yield from response.data or []
@@ -0,0 +1,302 @@
+import json
+import os
+import random
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional, Set
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from starlette.routing import Mount
+
+# One JSON line per request on stdout; set REQUEST_LOG=0 to silence
+REQUEST_LOG = os.getenv("REQUEST_LOG", "1") == "1"
+# Fraction of requests profiled with pyinstrument (optional), written to PROFILE_DIR
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+STAGE_SECONDS = Histogram(
+    "dermanow_stage_seconds",
+    "Time spent in one stage of a search or chat request",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_SECONDS = Histogram(
+    "dermanow_http_request_seconds",
+    "HTTP request latency, until the last body byte is sent",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+IN_FLIGHT = Gauge(
+    "dermanow_http_requests_in_flight",
+    "Requests currently being handled",
+    ["route"],
+    multiprocess_mode="livesum",
+)
+SEARCH_BATCH_SIZE = Histogram(
+    "dermanow_search_batch_size",
+    "Searches coalesced into one encode and FAISS call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+OPENAI_TOKENS = Counter(
+    "dermanow_openai_tokens_total",
+    "OpenAI tokens used, by operation and kind",
+    ["operation", "kind"],
+)
+
+# Stage timings of the request being handled, for its log line
+_trace: ContextVar[Optional[Dict[str, float]]] = ContextVar("trace", default=None)
+
+
+@contextmanager
+def span(stage: str):
+    """
+    Time a block as ``stage``: observed in ``dermanow_stage_seconds`` and added
+    to the current request's log line.
+
+    Work done on the search batcher's threads belongs to a batch rather than
+    a request, so it only reaches the histogram; the request sees the time it
+    waited for its batch as ``search.batch``.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        trace = _trace.get()
+        if trace is not None:
+            trace[stage] = trace.get(stage, 0.0) + elapsed
+
+
+def record_tokens(operation: str, usage):
+    """Count an OpenAI ``usage`` object's tokens under ``operation``."""
+    if usage is None:
+        return
+    OPENAI_TOKENS.labels(operation, "prompt").inc(usage.prompt_tokens or 0)
+    OPENAI_TOKENS.labels(operation, "completion").inc(usage.completion_tokens or 0)
+
+
+def log_event(event: str, **fields):
+    """Print one structured (JSON) log line."""
+    print(json.dumps({"event": event, "ts": round(time.time(), 3), **fields}, default=str))
+
+
+class StatsCollector:
+    """
+    Exposes the existing ``stats()``/``status()`` dicts as metrics at scrape time.
+
+    ``caches`` maps a cache name to its ``stats`` callable; hit, miss and
+    eviction counts become counters and sizes and hit rates gauges.
+    ``status`` is ``SearchService.status``, for readiness and index size.
+    """
+
+    COUNTERS = ("hits", "misses", "evictions", "errors")
+    GAUGES = ("size", "bytes", "hit_rate")
+
+    def __init__(self, caches: Dict[str, Callable[[], Dict]], status: Callable[[], Dict]):
+        self.caches = caches
+        self.status = status
+
+    def _families(self) -> Dict:
+        families = {
+            name: CounterMetricFamily(
+                f"dermanow_cache_{name}", f"Cache {name}", labels=["cache"]
+            )
+            for name in self.COUNTERS
+        }
+        families.update(
+            {
+                name: GaugeMetricFamily(
+                    f"dermanow_cache_{name}", f"Cache {name.replace('_', ' ')}", labels=["cache"]
+                )
+                for name in self.GAUGES
+            }
+        )
+        return families
+
+    def describe(self):
+        """
+        The metric names, without calling any ``stats()``.
+
+        The registry calls this instead of ``collect`` when the collector is
+        registered at import, so importing the app doesn't resolve lazy
+        state such as the chat token counter's tiktoken encoding.
+        """
+        yield from self._families().values()
+        for name in ("search_ready", "index_size", "index_generation"):
+            yield GaugeMetricFamily(f"dermanow_{name}", name)
+
+    def collect(self):
+        families = self._families()
+        for cache, stats in self.caches.items():
+            values = stats()
+            for name, family in families.items():
+                if isinstance(values.get(name), (int, float)):
+                    family.add_metric([cache], values[name])
+        yield from families.values()
+
+        status = self.status()
+        yield GaugeMetricFamily(
+            "dermanow_search_ready", "1 once the search index is built", value=int(status["ready"])
+        )
+        if "index_size" in status:
+            yield GaugeMetricFamily(
+                "dermanow_index_size", "Projects in the served index", value=status["index_size"]
+            )
+            yield GaugeMetricFamily(
+                "dermanow_index_generation",
+                "Generation of the served index",
+                value=status["generation"],
+            )
+
+
+_collectors = []
+
+
+def register_collector(collector):
+    REGISTRY.register(collector)
+    _collectors.append(collector)
+
+
+def render_metrics():
+    """
+    The Prometheus exposition and its content type.
+
+    Under gunicorn with ``PROMETHEUS_MULTIPROC_DIR`` set, histograms and
+    counters are aggregated across workers; collector stats (caches, index)
+    describe the worker that answered the scrape.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        for collector in _collectors:
+            registry.register(collector)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def static_paths(app) -> Set[str]:
+    """
+    Every route path of ``app``, including mounted sub-apps (``/chatbot/chat``).
+
+    No route takes path parameters, so these double as the bounded set of
+    ``route`` label values; any other path is labelled ``unmatched``.
+    """
+    paths = set()
+    for route in getattr(app, "routes", []):
+        sub_app = getattr(route, "app", None)
+        if isinstance(route, Mount) and sub_app is not None:
+            paths.update(route.path + path for path in static_paths(sub_app))
+        elif hasattr(route, "path"):
+            paths.add(route.path)
+    return paths
+
+
+class TelemetryMiddleware:
+    """
+    ASGI middleware timing every HTTP request end to end, streams included.
+
+    Records ``dermanow_http_request_seconds`` and the in-flight gauge, tags
+    the response with ``X-Request-ID`` (the caller's, or a new one), collects
+    the request's ``span`` timings into one structured log line, and profiles
+    a ``PROFILE_SAMPLE_RATE`` fraction of requests when pyinstrument is
+    installed.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._paths: Optional[Set[str]] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        request_id = (
+            headers.get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex[:16]
+        )
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"x-request-id", request_id.encode())
+                ]
+            await send(message)
+
+        trace: Dict[str, float] = {}
+        token = _trace.set(trace)
+        profiler = start_profiler()
+        if self._paths is None:
+            # Routes are all registered by the first request
+            self._paths = static_paths(scope.get("app"))
+        route = scope["path"] if scope["path"] in self._paths else "unmatched"
+        in_flight = IN_FLIGHT.labels(route)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight.dec()
+            _trace.reset(token)
+            REQUEST_SECONDS.labels(scope["method"], route, str(status["code"])).observe(elapsed)
+            if profiler is not None:
+                save_profile(profiler, route, request_id)
+            # Scrapes and probes would drown out the requests worth reading
+            if REQUEST_LOG and route != "/metrics" and not route.startswith("/health"):
+                log_event(
+                    "request",
+                    request_id=request_id,
+                    method=scope["method"],
+                    route=route,
+                    status=status["code"],
+                    duration_ms=round(elapsed * 1000, 2),
+                    stages_ms={k: round(v * 1000, 2) for k, v in trace.items()},
+                )
+
+
+def start_profiler():
+    """A running pyinstrument profiler for a sampled request, else None."""
+    if PROFILE_SAMPLE_RATE <= 0 or random.random() >= PROFILE_SAMPLE_RATE:
+        return None
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        return None
+    profiler = Profiler(async_mode="enabled")
+    profiler.start()
+    return profiler
+
+
+def save_profile(profiler, route: str, request_id: str):
+    profiler.stop()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    # The request id may come from the caller; keep it out of the path structure
+    safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", request_id)
+    name = f"{int(time.time())}-{route.strip('/').replace('/', '_') or 'root'}-{safe_id}.html"
+    path = os.path.join(PROFILE_DIR, name)
+    with open(path, "w") as f:
+        f.write(profiler.output_html())
+    log_event("profile", request_id=request_id, route=route, path=path)
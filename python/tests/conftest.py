@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+# api.chatbot builds its OpenAI client at import time; tests point it at the fake
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from search import search_charities  # noqa: E402
+from search.batcher import SearchBatcher  # noqa: E402
+from search.index_manager import CharityIndexManager  # noqa: E402
+from search.result_cache import MemoryResultCache  # noqa: E402
+from search.service import SearchComponents  # noqa: E402
+from tests.support import FakePages, StubEncoder  # noqa: E402
+
+
+@pytest.fixture
+def encoder():
+    return StubEncoder()
+
+
+@pytest.fixture
+def search_stack(encoder, monkeypatch):
+    """Installs a search service over the given rows, as the app's warm-up would."""
+
+    def install(rows, passage_config=None, **components):
+        manager = CharityIndexManager(
+            encoder, FakePages(rows), encoder.model_id, passage_config=passage_config
+        )
+        manager.refresh()
+        # Other modules hold the service itself, so swap what it serves, not the object
+        service = search_charities.search_service
+        monkeypatch.setattr(
+            service, "initialize", lambda: SearchComponents(encoder, manager, **components)
+        )
+        monkeypatch.setattr(service, "refresh_interval", 0)
+        monkeypatch.setattr(service, "_components", None)
+        monkeypatch.setattr(service, "state", "idle")
+        service.warm_up()
+        # Fresh caches and batcher per test; the batcher binds to the loop it first runs on
+        monkeypatch.setattr(search_charities, "result_cache", MemoryResultCache())
+        batcher = SearchBatcher(search_charities.search_charities_batch, max_wait_ms=1)
+        monkeypatch.setattr(search_charities, "search_batcher", batcher)
+        return manager
+
+    return install
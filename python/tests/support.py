@@ -0,0 +1,82 @@
+import hashlib
+import re
+from typing import Dict, List
+
+import numpy as np
+
+from search.encoders import Encoder
+
+DIMENSION = 32
+
+
+class StubEncoder(Encoder):
+    """
+    Deterministic bag-of-words encoder, so tests run without model weights.
+
+    Each word adds a fixed pseudo-random vector, so texts sharing words land
+    close together and identical texts encode identically.
+    """
+
+    backend = "stub"
+
+    def __init__(self, dimension: int = DIMENSION):
+        super().__init__("stub-encoder")
+        self.dimension = dimension
+        self.calls: List[List[str]] = []
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def word_vector(self, word: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.sha1(word.encode("utf-8")).digest()[:4], "little")
+        return np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32)
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        self.calls.append(texts)
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                vectors[i] += self.word_vector(word)
+        return vectors[0] if single else vectors
+
+    @property
+    def encoded(self) -> int:
+        """Texts encoded so far."""
+        return sum(len(texts) for texts in self.calls)
+
+
+def project(pid: int, title: str = None, description: str = None, **fields) -> Dict:
+    """A charity_projects row with the fields search and display read."""
+    row = {
+        "id": pid,
+        "created_at": f"2024-01-{pid % 28 + 1:02d}T00:00:00Z",
+        "title": title if title is not None else f"Project {pid}",
+        "description": description if description is not None else f"Description {pid}",
+        "image": None,
+        "funding_percentage": 10,
+        "supporters": pid,
+        "amount": 1000,
+        "category": ["Education"],
+        "in_progress": True,
+        "progress_percentage": 10,
+        "funding_complete": False,
+        "location": "Kuala Lumpur",
+        "organization_name": "Org",
+    }
+    row.update(fields)
+    return row
+
+
+class FakePages:
+    """``fetch_pages`` source over an editable in-memory table."""
+
+    def __init__(self, rows: List[Dict], page_size: int = 3):
+        self.rows = {row["id"]: row for row in rows}
+        self.page_size = page_size
+
+    def __call__(self):
+        rows = [dict(self.rows[pid]) for pid in sorted(self.rows)]
+        for start in range(0, len(rows), self.page_size):
+            yield rows[start : start + self.page_size]
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+
+import pytest
+
+from search.batcher import SearchBatcher, SearchJob
+from search.service import SearchNotReady
+
+
+def echo(jobs):
+    return [[job.query] for job in jobs]
+
+
+def test_concurrent_searches_share_a_batch():
+    batches = []
+
+    def process(jobs):
+        batches.append([job.query for job in jobs])
+        return echo(jobs)
+
+    async def run():
+        batcher = SearchBatcher(process, max_batch_size=8, max_wait_ms=20)
+        try:
+            return await asyncio.gather(*(batcher.submit(SearchJob(q)) for q in "abc"))
+        finally:
+            await batcher.stop()
+
+    assert asyncio.run(run()) == [["a"], ["b"], ["c"]]
+    assert batches == [["a", "b", "c"]]
+
+
+def test_batch_errors_reach_every_caller():
+    def process(jobs):
+        raise ValueError("index exploded")
+
+    async def run():
+        batcher = SearchBatcher(process, max_wait_ms=1)
+        try:
+            return await asyncio.gather(
+                batcher.submit(SearchJob("a")),
+                batcher.submit(SearchJob("b")),
+                return_exceptions=True,
+            )
+        finally:
+            await batcher.stop()
+
+    assert [type(e) for e in asyncio.run(run())] == [ValueError, ValueError]
+
+
+def test_stop_fails_queued_and_in_flight_searches():
+    release = threading.Event()
+
+    def process(jobs):
+        release.wait(5)
+        return echo(jobs)
+
+    async def run():
+        # One worker: the first batch blocks it, the rest wait in the queue
+        batcher = SearchBatcher(process, max_batch_size=1, max_wait_ms=0, max_workers=1)
+        waiting = [asyncio.ensure_future(batcher.submit(SearchJob(q))) for q in "abcd"]
+        await asyncio.sleep(0.05)
+        await batcher.stop()
+        release.set()
+        return await asyncio.wait_for(asyncio.gather(*waiting, return_exceptions=True), 1)
+
+    results = asyncio.run(run())
+    assert [type(result) for result in results] == [SearchNotReady] * 4
+
+
+def test_cancelled_dispatch_returns_its_worker_slot():
+    async def run():
+        batcher = SearchBatcher(echo, max_batch_size=1, max_wait_ms=0, max_workers=1)
+        batcher.start()
+        loop = asyncio.get_running_loop()
+        # Cancel each batch as soon as it is dispatched, before it runs
+        original = loop.create_task
+
+        def cancel_first(coro, **kwargs):
+            task = original(coro, **kwargs)
+            if coro.__qualname__.endswith("_dispatch") and not cancelled:
+                cancelled.append(task)
+                task.cancel()
+            return task
+
+        cancelled = []
+        loop.create_task = cancel_first
+        try:
+            with pytest.raises(SearchNotReady):
+                await asyncio.wait_for(batcher.submit(SearchJob("a")), 1)
+            # The only slot came back, so the next batch still runs
+            return await asyncio.wait_for(batcher.submit(SearchJob("b")), 1)
+        finally:
+            loop.create_task = original
+            await batcher.stop()
+
+    assert asyncio.run(run()) == ["b"]
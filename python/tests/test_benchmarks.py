@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+
+from benchmarks.fakes import FakeSupabase
+from benchmarks.load import NO_CACHE_ENV
+from search.supabase_loader import SUPABASE_KEY_ENV, SUPABASE_URL_ENV
+
+
+def test_fake_supabase_exports_the_variables_the_server_reads():
+    fake = FakeSupabase(rows_count=1)
+    assert set(fake.env()) == {SUPABASE_URL_ENV, SUPABASE_KEY_ENV}
+
+
+def test_no_caches_turns_off_every_cache_the_server_sizes():
+    # Read the sizes the way a spawned server would, in a fresh interpreter
+    script = (
+        "from search import search_charities as s; from api import chatbot as c; "
+        "print(s.query_cache.max_size, s.result_cache.max_bytes, "
+        "c.completion_cache.max_entries, c.chat_embedding_cache.max_size)"
+    )
+    env = {**NO_CACHE_ENV, "OPENAI_API_KEY": "test", "PATH": ""}
+    sizes = subprocess.run(
+        [sys.executable, "-c", script],
+        env=env,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert sizes.stdout.split() == ["0", "0", "0", "0"]
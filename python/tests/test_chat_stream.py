@@ -0,0 +1,167 @@
+import asyncio
+import json
+from dataclasses import replace
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from openai import AsyncOpenAI
+
+from api import chatbot
+from api.completion_cache import SemanticCompletionCache
+from benchmarks.fakes import FAKE_OPENAI_KEY, FakeOpenAI
+from search import search_charities
+from tests.support import project
+
+ROWS = [
+    project(1, "Clean water wells", "Wells for villages without clean water"),
+    project(2, "School books", "Textbooks for rural schools"),
+    project(3, "Flood relief", "Food and shelter after the floods"),
+]
+
+
+@pytest.fixture
+def fake_openai():
+    fake = FakeOpenAI(latency_ms=0, answer_words=4).start()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture
+def chat(search_stack, fake_openai, monkeypatch):
+    search_stack(ROWS)
+    monkeypatch.setattr(
+        chatbot,
+        "client",
+        AsyncOpenAI(base_url=f"{fake_openai.url}/v1", api_key=FAKE_OPENAI_KEY, max_retries=0),
+    )
+    monkeypatch.setattr(chatbot, "completion_cache", SemanticCompletionCache())
+    # Four-characters-per-token estimate instead of fetching a tiktoken encoding
+    monkeypatch.setattr(chatbot.token_counter, "_resolved", True)
+    with TestClient(chatbot.chatbot_app) as client:
+        yield client
+
+
+def stream_events(
+    client, message: str, history=None, session_id=None
+) -> List[Tuple[str, Dict]]:
+    body = {"message": message, "history": history or [], "session_id": session_id}
+    with client.stream("POST", "/chat/stream", json=body) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def kinds(events) -> List[str]:
+    """Event names with runs of the same event collapsed."""
+    collapsed = []
+    for name, _ in events:
+        if not collapsed or collapsed[-1] != name:
+            collapsed.append(name)
+    return collapsed
+
+
+def test_donation_turn_streams_events_in_order(chat):
+    events = stream_events(chat, "I want to donate to clean water")
+
+    assert kinds(events) == ["tool_call", "tool_result", "charities", "token", "done"]
+    charities = dict(events)["charities"]["charities"]
+    assert [charity["id"] for charity in charities] == [1]
+
+    done = events[-1][1]
+    tokens = "".join(data["content"] for name, data in events if name == "token")
+    assert done["message"] == tokens == "lorem lorem lorem lorem "
+    assert done["donation_intent"] is True
+    assert done["charities"] == charities
+    assert done["usage"]["completion_tokens"] > 0
+
+
+def test_plain_turn_streams_tokens_then_done(chat):
+    events = stream_events(chat, "Hello!")
+
+    assert kinds(events) == ["token", "done"]
+    assert events[-1][1]["donation_intent"] is False
+
+
+def test_tool_calls_run_concurrently(chat, monkeypatch):
+    running = {"now": 0, "most": 0}
+    original = chatbot.run_tool_call
+
+    async def slow_tool_call(tool_call, user_message):
+        running["now"] += 1
+        running["most"] = max(running["most"], running["now"])
+        await asyncio.sleep(0.05)
+        running["now"] -= 1
+        return await original(tool_call, user_message)
+
+    monkeypatch.setattr(chatbot, "run_tool_call", slow_tool_call)
+    events = stream_events(chat, "Tell me about DermaNow and help me donate to schools")
+
+    calls = [data["name"] for name, data in events if name == "tool_call"]
+    results = [data["name"] for name, data in events if name == "tool_result"]
+    assert calls == results == ["fetch_dermanow_info", "search_charities"]
+    assert running["most"] == 2
+    assert events[-1][0] == "done"
+
+
+def test_failed_completion_ends_with_an_error_event(chat, monkeypatch):
+    # Nothing listens on port 9, so the completion request fails
+    monkeypatch.setattr(
+        chatbot,
+        "client",
+        AsyncOpenAI(base_url="http://127.0.0.1:9/v1", api_key=FAKE_OPENAI_KEY, max_retries=0),
+    )
+    events = stream_events(chat, "I want to donate to clean water")
+
+    assert [name for name, _ in events] == ["error"]
+    assert events[0][1]["detail"].startswith("Error processing chat")
+
+
+def test_oversized_message_ends_with_an_error_event(chat):
+    events = stream_events(chat, "water " * 40_000)
+
+    assert [name for name, _ in events] == ["error"]
+    assert "budget" in events[0][1]["detail"]
+
+
+def test_repeated_message_replays_the_cached_turn_within_its_session(chat):
+    first = stream_events(chat, "I want to donate to clean water", session_id="a")
+    replayed = stream_events(chat, "i want to  donate to clean water", session_id="a")
+    other_session = stream_events(chat, "I want to donate to clean water", session_id="b")
+
+    assert first[-1][1]["usage"]["completion_tokens"] > 0
+    assert replayed[-1][1]["usage"]["completion_tokens"] == 0
+    assert replayed[-1][1]["message"] == first[-1][1]["message"]
+    assert replayed[-1][1]["charities"] == first[-1][1]["charities"]
+    assert other_session[-1][1]["usage"]["completion_tokens"] > 0
+
+
+def test_decisions_replay_only_for_the_same_message(chat):
+    vector = np.ones(8, dtype=np.float32)
+    turn = chatbot.TurnContext(vector=vector, window=[], scope="", message="donate to kids")
+    search = chatbot.new_tool_call("search_charities", json.dumps({"query": "kids"}))
+    chatbot.remember_plan(turn, chatbot.TurnPlan(None, [search]))
+    request = chatbot.ChatRequest(message="donate to kids")
+
+    same = chatbot.plan_without_model(request, turn)
+    assert [call["function"]["arguments"] for call in same.tool_calls] == ['{"query": "kids"}']
+    assert same.tool_calls[0]["id"] != search["id"]
+
+    # Same embedding, different words: the cached arguments would be wrong here
+    similar = replace(turn, message="donate to orphans")
+    assert chatbot.plan_without_model(request, similar) is None
+    assert chatbot.plan_without_model(request, replace(turn, scope="other")) is None
+
+
+def test_chat_messages_use_their_own_embedding_cache(chat):
+    stream_events(chat, "Hello there, DermaBot!")
+
+    model_id = search_charities.search_service.components.model.model_id
+    assert chatbot.chat_embedding_cache.get(model_id, "Hello there, DermaBot!") is not None
+    assert search_charities.query_cache.get(model_id, "Hello there, DermaBot!") is None
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from search import search_charities
+from search.filters import FilterBitmaps
+from search.search_charities import search_charities as search
+from tests.support import project
+
+ROWS = [
+    project(1, "Flood relief", category=["Disaster Relief"], location="Kelantan", verified=True),
+    project(2, "School books", category=["Education"], location="Penang"),
+    project(3, "Clean water", category=["Water", "Health"], location="Kelantan", verified=True),
+    project(4, "Orphan meals", category=["Food"], location="Selangor", funding_complete=True),
+    project(5, "Mosque roof", category=["Education", "Food"], location="penang "),
+]
+
+
+@pytest.fixture
+def bitmaps():
+    return FilterBitmaps(np.array([row["id"] for row in ROWS]), {row["id"]: row for row in ROWS})
+
+
+def selected(bitmaps, filters):
+    mask = bitmaps.mask(filters)
+    return [row["id"] for row, keep in zip(ROWS, mask) if keep]
+
+
+def test_no_filters_means_no_mask(bitmaps):
+    assert bitmaps.mask(None) is None
+    assert bitmaps.mask({}) is None
+    assert bitmaps.mask({"category": None, "verified": None}) is None
+
+
+def test_value_filters_ignore_case_and_whitespace(bitmaps):
+    assert selected(bitmaps, {"location": "PENANG"}) == [2, 5]
+    assert selected(bitmaps, {"category": "education"}) == [2, 5]
+
+
+def test_value_lists_match_any(bitmaps):
+    assert selected(bitmaps, {"category": ["Water", "Food"]}) == [3, 4, 5]
+    assert selected(bitmaps, {"category": ["Unknown"]}) == []
+
+
+def test_flags_match_true_and_false(bitmaps):
+    assert selected(bitmaps, {"verified": True}) == [1, 3]
+    assert selected(bitmaps, {"funding_complete": False}) == [1, 2, 3, 5]
+
+
+def test_filters_combine_with_and(bitmaps):
+    assert selected(bitmaps, {"location": "kelantan", "category": "health"}) == [3]
+    assert selected(bitmaps, {"location": "kelantan", "verified": False}) == []
+
+
+@pytest.fixture(params=["semantic", "hybrid"])
+def catalogue(request, search_stack, monkeypatch):
+    monkeypatch.setattr(search_charities, "RETRIEVAL_MODE", request.param)
+    rows = ROWS + [
+        project(pid, f"Relief project {pid}", location="Kelantan") for pid in range(6, 30)
+    ]
+    return search_stack(rows)
+
+
+def test_search_applies_filters(catalogue):
+    results = search("relief", k=10, filters={"location": "Kelantan", "verified": True})
+    assert sorted(result["id"] for result in results) == [1, 3]
+
+
+def test_pages_tile_the_ranking(catalogue):
+    everything = [result["id"] for result in search("relief project", k=29)]
+    assert sorted(everything) == list(range(1, 30))
+
+    paged = []
+    for offset in range(0, 29, 4):
+        page = search("relief project", k=4, offset=offset)
+        assert len(page) == min(4, 29 - offset)
+        paged += [result["id"] for result in page]
+    # No overlaps or gaps between consecutive pages
+    assert paged == everything
+
+
+def test_pages_past_the_end_are_empty(catalogue):
+    assert search("relief", k=5, offset=100) == []
+    assert search("relief", k=0) == []
+
+
+def test_results_carry_confidence(catalogue):
+    results = search("flood relief", k=5)
+    assert all(0.0 <= result["confidence"] <= 1.0 for result in results)
+    assert search("flood relief", k=5, min_confidence=1.01) == []
@@ -0,0 +1,92 @@
+import asyncio
+
+from api.history import HistoryManager, TokenCounter
+
+
+class CharEncoding:
+    """tiktoken-like encoding with one token per character, to exercise the exact path."""
+
+    def encode(self, text, disallowed_special=()):
+        return [ord(c) for c in text]
+
+    def decode(self, tokens):
+        return "".join(chr(t) for t in tokens)
+
+
+def estimate_counter():
+    counter = TokenCounter("gpt-4o-mini")
+    # Four-characters-per-token estimate instead of fetching a tiktoken encoding
+    counter._resolved = True
+    return counter
+
+
+def exact_counter():
+    counter = estimate_counter()
+    counter._encoding = CharEncoding()
+    return counter
+
+
+def turns(count):
+    return [
+        {"role": "user" if n % 2 == 0 else "assistant", "content": f"message {n}"}
+        for n in range(count)
+    ]
+
+
+def test_truncate_fits_the_budget_with_either_counter():
+    text = "the quick brown fox jumps over the lazy dog " * 10
+    for counter in (estimate_counter(), exact_counter()):
+        cut = counter.truncate(text, 20)
+        assert counter.count(cut) <= 20
+        assert text.startswith(cut) and len(cut) > 0
+        assert counter.truncate("short", 20) == "short"
+
+
+def test_older_turns_are_summarized_and_recent_ones_kept():
+    calls = []
+
+    async def summarize(previous, messages, usage):
+        calls.append((previous, [m["content"] for m in messages]))
+        return f"{len(messages)} turns"
+
+    manager = HistoryManager(estimate_counter(), summarize, window_turns=2)
+    fixed = [{"role": "system", "content": "system"}]
+    message = {"role": "user", "content": "now"}
+
+    compacted = asyncio.run(manager.compact(turns(5), fixed, message))
+    assert compacted.summary == "3 turns"
+    assert [m["content"] for m in compacted.recent] == ["message 3", "message 4"]
+    assert compacted.summarized_turns == 3
+
+    # The next turn only summarizes what newly slid out, on top of the cached summary
+    asyncio.run(manager.compact(turns(6), fixed, message))
+    assert calls[-1] == ("3 turns", ["message 3"])
+
+
+def test_an_overlong_summary_is_truncated_not_dropped():
+    async def summarize(previous, messages, usage):
+        return "Donor asked about water projects in Kelantan. " * 50
+
+    counter = exact_counter()
+    manager = HistoryManager(counter, summarize, window_turns=1, summary_tokens=40)
+
+    compacted = asyncio.run(
+        manager.compact(turns(4), [], {"role": "user", "content": "and schools?"})
+    )
+
+    assert compacted.summary.startswith("Donor asked about water projects")
+    assert counter.count(compacted.summary) <= 40
+    assert compacted.summarized_turns == 3
+    assert compacted.dropped_turns == 0
+
+
+def test_failed_summary_drops_the_older_turns():
+    async def summarize(previous, messages, usage):
+        raise RuntimeError("model unavailable")
+
+    manager = HistoryManager(estimate_counter(), summarize, window_turns=1)
+    compacted = asyncio.run(manager.compact(turns(3), [], {"role": "user", "content": "hi"}))
+
+    assert compacted.summary is None
+    assert compacted.dropped_turns == 2
+    assert len(compacted.recent) == 1
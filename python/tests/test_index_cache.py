@@ -0,0 +1,168 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from search.index_cache import (
+    CURRENT_FILE,
+    MANIFEST_FILE,
+    current_entry,
+    load_index_cache,
+    save_index_cache,
+)
+from search.index_manager import CharityIndexManager
+from search.passages import PassageConfig
+from search.shared_index import SharedIndexReader
+from tests.support import DIMENSION, FakePages, project
+
+
+@pytest.fixture
+def pages():
+    return FakePages([project(pid) for pid in range(1, 6)])
+
+
+def make_manager(encoder, pages, cache_dir):
+    return CharityIndexManager(encoder, pages, encoder.model_id, cache_dir=str(cache_dir))
+
+
+def rewrite_manifest(cache_dir, **changes):
+    path = os.path.join(cache_dir, current_entry(cache_dir), MANIFEST_FILE)
+    with open(path) as f:
+        manifest = json.load(f)
+    manifest.update(changes)
+    with open(path, "w") as f:
+        json.dump(manifest, f)
+
+
+def test_refresh_writes_a_loadable_entry(encoder, pages, tmp_path):
+    manager = make_manager(encoder, pages, tmp_path)
+    manager.refresh()
+
+    cached = load_index_cache(str(tmp_path), manager.cache_key, DIMENSION)
+
+    snapshot = manager.snapshot
+    assert cached["ids"].tolist() == snapshot.ids.tolist()
+    assert cached["hashes"] == snapshot.hashes
+    assert cached["generation"] == snapshot.generation
+    assert cached["rows"][3]["title"] == "Project 3"
+    assert np.array_equal(cached["embeddings"], snapshot.embeddings)
+    assert cached["index"].ntotal == 5
+
+
+def test_load_cache_skips_re_encoding(encoder, pages, tmp_path):
+    make_manager(encoder, pages, tmp_path).refresh()
+    encoded = encoder.encoded
+
+    restarted = make_manager(encoder, pages, tmp_path)
+    assert restarted.load_cache()
+    stats = restarted.refresh()
+
+    assert stats["unchanged"] == 5
+    assert encoder.encoded == encoded
+
+
+def test_current_pointer_keeps_only_the_previous_entry(encoder, pages, tmp_path):
+    manager = make_manager(encoder, pages, tmp_path)
+    entries = []
+    for pid in (10, 11, 12):
+        pages.rows[pid] = project(pid)
+        manager.refresh()
+        entries.append(current_entry(str(tmp_path)))
+
+    assert len(set(entries)) == 3
+    kept = {name for name in os.listdir(tmp_path) if os.path.isdir(tmp_path / name)}
+    assert kept == set(entries[1:])
+    with open(tmp_path / CURRENT_FILE) as f:
+        assert f.read() == entries[-1]
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [{"version": -1}, {"model_name": "other-model"}, {"dimension": DIMENSION + 1}],
+    ids=["version", "model", "dimension"],
+)
+def test_mismatched_manifest_is_ignored(encoder, pages, tmp_path, changes):
+    manager = make_manager(encoder, pages, tmp_path)
+    manager.refresh()
+    rewrite_manifest(str(tmp_path), **changes)
+
+    assert load_index_cache(str(tmp_path), manager.cache_key, DIMENSION) is None
+    assert not make_manager(encoder, pages, tmp_path).load_cache()
+
+
+def test_manifest_ids_must_match_the_index(encoder, pages, tmp_path):
+    manager = make_manager(encoder, pages, tmp_path)
+    manager.refresh()
+    rewrite_manifest(str(tmp_path), ids=[1, 2, 3, 4, 99])
+
+    assert load_index_cache(str(tmp_path), manager.cache_key, DIMENSION) is None
+
+
+def test_missing_cache_loads_nothing(encoder, pages, tmp_path):
+    assert load_index_cache(str(tmp_path / "empty"), "model", DIMENSION) is None
+    assert not make_manager(encoder, pages, tmp_path / "empty").load_cache()
+
+
+def test_shared_reader_keeps_the_previous_entry_when_the_new_one_is_broken(
+    encoder, pages, tmp_path
+):
+    manager = make_manager(encoder, pages, tmp_path)
+    reader = SharedIndexReader(str(tmp_path), manager.cache_key, DIMENSION)
+    with pytest.raises(RuntimeError):
+        reader.refresh()
+
+    manager.refresh()
+    assert reader.refresh() == {"generation": 1, "size": 5}
+
+    pages.rows[6] = project(6)
+    manager.refresh()
+    rewrite_manifest(str(tmp_path), dimension=DIMENSION + 1)
+    # The broken generation is skipped and the attached one keeps serving
+    assert reader.refresh() == {"generation": 1, "size": 5}
+    assert reader.snapshot.ids.tolist() == [1, 2, 3, 4, 5]
+
+
+def test_shared_reader_maps_the_derived_stores_instead_of_parsing_rows(encoder, tmp_path):
+    rows = [
+        project(1, "Clean water wells", category=["Health"], location="Kelantan"),
+        project(2, "School books", supporters=40),
+        project(3, "Flood relief", "Food parcels after the floods", location="Kelantan"),
+    ]
+    manager = make_manager(encoder, FakePages(rows), tmp_path)
+    manager.refresh()
+    reader = SharedIndexReader(str(tmp_path), manager.cache_key, DIMENSION)
+    reader.refresh()
+
+    built, shared = manager.snapshot, reader.snapshot
+    assert shared.rows == {}
+    assert isinstance(shared.metadata.fragments.blob, np.memmap)
+    assert isinstance(shared.lexical.weights, np.memmap)
+    assert shared.cache_token == built.cache_token
+    assert shared.metadata.page_json([2, 0], [0.5, 0.25]) == built.metadata.page_json(
+        [2, 0], [0.5, 0.25]
+    )
+    kelantan = {"location": "Kelantan", "category": ["Health", "Education"]}
+    assert shared.filters.mask(kelantan).tolist() == [True, False, True]
+    assert built.filters.mask(kelantan).tolist() == [True, False, True]
+    assert shared.lexical.search("flood food", 5)[1].tolist() == [2]
+    assert shared.suggestions.complete("sch") == built.suggestions.complete("sch")
+
+
+@pytest.mark.parametrize("multi_vector", [False, True])
+def test_passages_load_only_when_the_reader_uses_them(encoder, pages, tmp_path, multi_vector):
+    manager = CharityIndexManager(
+        encoder,
+        pages,
+        encoder.model_id,
+        cache_dir=str(tmp_path),
+        passage_config=PassageConfig(),
+    )
+    manager.refresh()
+
+    reader = SharedIndexReader(
+        str(tmp_path), manager.cache_key, DIMENSION, load_passages=multi_vector
+    )
+    reader.refresh()
+
+    assert (reader.snapshot.passages is not None) == multi_vector
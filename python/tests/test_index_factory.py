@@ -0,0 +1,71 @@
+import faiss
+import numpy as np
+import pytest
+
+from search.index_factory import IndexConfig, index_ids, index_kind, search_parameters
+from search.index_manager import CharityIndexManager
+from tests.support import FakePages, project
+
+# Small enough codebooks that IVF-PQ trains on a test-sized catalogue
+CONFIGS = {
+    "flat": IndexConfig("flat"),
+    "hnsw": IndexConfig("hnsw", ef_search=256),
+    "ivfpq": IndexConfig("ivfpq", nprobe=64, pq_m=4, pq_bits=4),
+}
+ROWS = 120
+
+
+def search_everything(snapshot, config, selector=None):
+    """Labels of an exhaustive search for every stored embedding."""
+    params = search_parameters(snapshot.index, config, selector)
+    _, labels = snapshot.index.search(
+        np.ascontiguousarray(snapshot.embeddings), snapshot.size, params=params
+    )
+    return labels
+
+
+@pytest.mark.parametrize("index_type", sorted(CONFIGS))
+def test_labels_survive_edits_and_deletes(encoder, index_type):
+    config = CONFIGS[index_type]
+    pages = FakePages(
+        [project(pid, title=f"Project {pid} topic{pid % 7}") for pid in range(1, ROWS + 1)]
+    )
+    manager = CharityIndexManager(encoder, pages, encoder.model_id, index_config=config)
+    manager.refresh()
+    assert index_kind(manager.snapshot.index) == index_type
+
+    for pid in range(1, 11):
+        del pages.rows[pid]
+    for pid in range(11, 21):
+        pages.rows[pid]["description"] = f"Rewritten appeal {pid}"
+    stats = manager.refresh()
+    assert (stats["removed"], stats["updated"]) == (10, 10)
+
+    snapshot = manager.snapshot
+    assert index_kind(snapshot.index) == index_type
+    expected = set(range(11, ROWS + 1))
+    assert set(index_ids(snapshot.index).tolist()) == expected
+    assert snapshot.index.ntotal == len(expected)
+
+    labels = search_everything(snapshot, config)
+    for row in labels.tolist():
+        assert set(row) == expected
+    if index_type != "ivfpq":
+        # Flat and HNSW store exact vectors, so every row finds itself first
+        assert labels[:, 0].tolist() == snapshot.ids.tolist()
+
+
+@pytest.mark.parametrize("index_type", sorted(CONFIGS))
+def test_id_selector_after_deletes(encoder, index_type):
+    config = CONFIGS[index_type]
+    pages = FakePages([project(pid) for pid in range(1, ROWS + 1)])
+    manager = CharityIndexManager(encoder, pages, encoder.model_id, index_config=config)
+    manager.refresh()
+    for pid in range(1, ROWS + 1, 3):
+        del pages.rows[pid]
+    manager.refresh()
+
+    allowed = np.array([pid for pid in pages.rows if pid % 2 == 0], dtype=np.int64)
+    labels = search_everything(manager.snapshot, config, faiss.IDSelectorBatch(allowed))
+    for row in labels.tolist():
+        assert set(row) - {-1} == set(allowed.tolist())
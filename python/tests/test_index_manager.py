@@ -0,0 +1,203 @@
+import numpy as np
+
+from search.index_manager import CharityIndexManager, content_hash
+from tests.support import FakePages, project
+
+
+def make_manager(encoder, pages, **kwargs):
+    return CharityIndexManager(encoder, pages, encoder.model_id, encode_batch_size=2, **kwargs)
+
+
+def test_first_refresh_adds_every_row(encoder):
+    pages = FakePages([project(pid) for pid in range(1, 8)])
+    manager = make_manager(encoder, pages)
+
+    stats = manager.refresh()
+
+    assert stats == {"added": 7, "updated": 0, "removed": 0, "unchanged": 0, "generation": 1}
+    snapshot = manager.snapshot
+    assert snapshot.ids.tolist() == list(range(1, 8))
+    assert snapshot.index.ntotal == 7
+    assert snapshot.hashes == [content_hash(pages.rows[pid]) for pid in range(1, 8)]
+    # Batches of encode_batch_size as pages arrive
+    assert max(len(texts) for texts in encoder.calls) <= 2
+    assert encoder.encoded == 7
+
+
+def test_unchanged_rows_are_not_re_encoded(encoder):
+    pages = FakePages([project(pid) for pid in range(1, 6)])
+    manager = make_manager(encoder, pages)
+    manager.refresh()
+    encoded = encoder.encoded
+    index = manager.snapshot.index
+
+    # Display-only fields don't feed the embedding
+    pages.rows[3]["supporters"] = 999
+    stats = manager.refresh()
+
+    assert stats["unchanged"] == 5
+    assert encoder.encoded == encoded
+    assert manager.snapshot.index is index
+    assert manager.snapshot.rows[3]["supporters"] == 999
+    assert manager.snapshot.generation == 2
+
+
+def test_refresh_applies_adds_edits_and_deletes(encoder):
+    pages = FakePages([project(pid) for pid in range(1, 6)])
+    manager = make_manager(encoder, pages)
+    manager.refresh()
+    before = manager.snapshot
+    encoded = encoder.encoded
+
+    del pages.rows[2]
+    pages.rows[4]["title"] = "Flood relief for Kelantan"
+    pages.rows[6] = project(6, title="Clean water wells")
+    stats = manager.refresh()
+
+    assert {k: stats[k] for k in ("added", "updated", "removed", "unchanged")} == {
+        "added": 1,
+        "updated": 1,
+        "removed": 1,
+        "unchanged": 3,
+    }
+    # Only the edited and the new row went through the encoder
+    assert encoder.encoded - encoded == 2
+    snapshot = manager.snapshot
+    assert snapshot.ids.tolist() == [1, 3, 4, 5, 6]
+    assert 2 not in snapshot.rows
+    assert snapshot.rows[4]["title"] == "Flood relief for Kelantan"
+
+    # Unchanged rows keep their vectors, edited ones get new ones
+    assert np.array_equal(
+        snapshot.embeddings[snapshot.positions[3]], before.embeddings[before.positions[3]]
+    )
+    expected = encoder.encode(["Flood relief for Kelantan Description 4"])[0]
+    assert np.allclose(snapshot.embeddings[snapshot.positions[4]], expected)
+
+    _, labels = snapshot.index.search(expected[None, :], 1)
+    assert labels[0, 0] == 4
+
+
+def test_search_keeps_its_snapshot_during_a_refresh(encoder):
+    pages = FakePages([project(pid) for pid in range(1, 5)])
+    manager = make_manager(encoder, pages)
+    manager.refresh()
+    held = manager.snapshot
+    held_ids = held.ids.tolist()
+    query = held.embeddings[:1].copy()
+
+    del pages.rows[1]
+    pages.rows[9] = project(9)
+    manager.refresh()
+
+    # The old snapshot still answers consistently after the swap
+    assert manager.snapshot is not held
+    assert held.ids.tolist() == held_ids
+    assert held.index.ntotal == 4
+    _, labels = held.index.search(query, 4)
+    assert sorted(labels[0].tolist()) == [1, 2, 3, 4]
+    assert 1 in held.rows
+    assert manager.snapshot.ids.tolist() == [2, 3, 4, 9]
+
+
+def test_duplicate_rows_across_pages_are_indexed_once(encoder):
+    pages = FakePages([project(pid) for pid in range(1, 4)], page_size=2)
+
+    def overlapping():
+        yield from pages()
+        yield [dict(pages.rows[1])]
+
+    manager = make_manager(encoder, overlapping)
+    manager.refresh()
+
+    assert manager.snapshot.ids.tolist() == [1, 2, 3]
+    assert manager.snapshot.index.ntotal == 3
+
+
+def test_hydrate_fills_display_fields(encoder):
+    rows = [project(pid) for pid in range(1, 4)]
+    pages = FakePages([{k: v for k, v in row.items() if k != "overview"} for row in rows])
+    requested = []
+
+    def hydrate(ids):
+        requested.append(ids)
+        wanted = ids if ids is not None else sorted(pages.rows)
+        return [{"id": pid, "overview": f"Overview {pid}"} for pid in wanted]
+
+    manager = make_manager(encoder, pages, hydrate=hydrate, full_hydrate_every=0)
+    manager.refresh()
+    assert requested == [None]
+    assert manager.snapshot.rows[2]["overview"] == "Overview 2"
+
+    pages.rows[3]["description"] = "Edited"
+    manager.refresh()
+    # Only the edited row is fetched again; the rest keep their values
+    assert requested[-1] == [3]
+    assert manager.snapshot.rows[1]["overview"] == "Overview 1"
+
+
+def test_growing_catalogue_keeps_every_vector_in_place(encoder):
+    pages = FakePages([project(pid) for pid in range(1, 4)], page_size=2)
+    manager = make_manager(encoder, pages)
+    manager.refresh()
+
+    # More rows than the buffer sized for the last catalogue holds
+    for pid in range(4, 12):
+        pages.rows[pid] = project(pid)
+    pages.rows[2]["title"] = "Edited"
+    manager.refresh()
+
+    snapshot = manager.snapshot
+    texts = [f"{row['title']} {row['description']}" for _, row in sorted(pages.rows.items())]
+    assert snapshot.ids.tolist() == list(range(1, 12))
+    assert np.allclose(snapshot.embeddings, encoder.encode(texts))
+
+
+def test_unchanged_rows_are_shared_and_hydrate_copies_on_write(encoder):
+    pages = FakePages([project(pid) for pid in range(1, 4)])
+    overview = {"n": 0}
+
+    def hydrate(ids):
+        wanted = ids if ids is not None else sorted(pages.rows)
+        return [{"id": pid, "overview": f"Overview {overview['n']}"} for pid in wanted]
+
+    manager = make_manager(encoder, pages, hydrate=hydrate, full_hydrate_every=2)
+    manager.refresh()
+    held = manager.snapshot
+
+    manager.refresh()
+    # Nothing changed, so the new snapshot reuses the row dicts
+    assert all(manager.snapshot.rows[pid] is held.rows[pid] for pid in range(1, 4))
+
+    overview["n"] = 1
+    manager.refresh()
+    assert manager.snapshot.rows[1]["overview"] == "Overview 1"
+    # The full re-hydrate replaced the shared rows instead of editing them
+    assert held.rows[1]["overview"] == "Overview 0"
+
+
+def test_rows_restored_from_the_cache_are_not_hydrated_again(encoder, tmp_path):
+    pages = FakePages([project(pid) for pid in range(1, 4)])
+    requested = []
+
+    def hydrate(ids):
+        requested.append(ids)
+        wanted = ids if ids is not None else sorted(pages.rows)
+        return [{"id": pid, "overview": f"Overview {pid}"} for pid in wanted]
+
+    def restarted():
+        return make_manager(
+            encoder, pages, cache_dir=str(tmp_path), hydrate=hydrate, full_hydrate_every=4
+        )
+
+    restarted().refresh()
+    assert requested == [None]
+
+    manager = restarted()
+    assert manager.load_cache()
+    pages.rows[4] = project(4)
+    manager.refresh()
+
+    # Only the new row is fetched; the cached ones kept their fields
+    assert requested[1:] == [[4]]
+    assert manager.snapshot.rows[2]["overview"] == "Overview 2"
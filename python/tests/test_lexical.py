@@ -0,0 +1,90 @@
+import numpy as np
+
+from search import search_charities
+from search.lexical import BM25Index, reciprocal_rank_fusion, tokenize
+from tests.support import project
+
+ROWS = [
+    project(1, "Clean water wells", "Hand pumps for villages", location="Kelantan"),
+    project(2, "School books", "Textbooks and water bottles for pupils"),
+    project(3, "Flood relief", "Food parcels", organization_name="Kelantan Aid"),
+    project(4, "Orphan meals", "Daily meals for orphans"),
+]
+
+
+def bm25():
+    return BM25Index(np.array([row["id"] for row in ROWS]), {row["id"]: row for row in ROWS})
+
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("I want to help the Orphans, in Kelantan!") == ["help", "orphans", "kelantan"]
+
+
+def test_bm25_ranks_matching_rows_and_leaves_out_the_rest():
+    scores, positions = bm25().search("clean water", 10)
+
+    # Row 1 has both terms, in its title; row 2 only "water", in the description
+    assert positions.tolist() == [0, 1]
+    assert scores[0] > scores[1] > 0
+
+
+def test_bm25_weights_title_above_description():
+    _, positions = bm25().search("water", 10)
+    assert positions.tolist() == [0, 1]
+
+
+def test_bm25_indexes_organization_and_location():
+    _, positions = bm25().search("kelantan", 10)
+    assert sorted(positions.tolist()) == [0, 2]
+
+
+def test_bm25_respects_mask_and_top_k():
+    index = bm25()
+    mask = np.array([False, True, True, True])
+    _, positions = index.search("water kelantan", 10, mask)
+    assert sorted(positions.tolist()) == [1, 2]
+    assert len(index.search("water kelantan", 1)[1]) == 1
+    assert len(index.search("unknownword", 10)[1]) == 0
+
+
+def test_rrf_sums_reciprocal_ranks():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 4]], k=60)
+
+    # 3 is in both lists, so it overtakes 1, which tops only one; ties keep first-seen order
+    assert fused == [3, 1, 2, 4]
+
+
+def test_rrf_rewards_agreement_over_a_single_first_place():
+    assert reciprocal_rank_fusion([[7, 8], [8, 9]], k=1)[0] == 8
+    assert reciprocal_rank_fusion([[5], []]) == [5]
+
+
+def test_fusion_adds_keyword_only_hits_with_their_embedding_score(search_stack):
+    manager = search_stack(ROWS)
+    snapshot = manager.snapshot
+    query_vec = search_charities.encode_queries(["orphans meals"])[0]
+    # A semantic ranking that missed row 4 entirely
+    distances = np.array([0.5, 0.7], dtype=np.float32)
+    labels = np.array([1, 2], dtype=np.int64)
+
+    fused_distances, fused_labels = search_charities.fuse_keyword_hits(
+        snapshot, "orphans meals", query_vec, distances, labels, 10
+    )
+
+    assert fused_labels.tolist()[:3] == [1, 4, 2]
+    expected = ((snapshot.embeddings[snapshot.positions[4]] - query_vec) ** 2).sum()
+    assert np.isclose(fused_distances[1], expected)
+    assert fused_distances[0] == 0.5
+
+
+def test_fusion_without_keyword_hits_keeps_the_semantic_ranking(search_stack):
+    manager = search_stack(ROWS)
+    distances = np.array([0.1, 0.2], dtype=np.float32)
+    labels = np.array([3, 1], dtype=np.int64)
+
+    fused = search_charities.fuse_keyword_hits(
+        manager.snapshot, "zzz", np.zeros(4, dtype=np.float32), distances, labels, 10
+    )
+
+    assert fused[1].tolist() == [3, 1]
+    assert fused[0].tolist() == distances.tolist()
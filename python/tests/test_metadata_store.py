@@ -0,0 +1,87 @@
+import json
+
+import numpy as np
+
+from search.metadata_store import RESULT_FIELDS, CharityMetadataStore, dumps, loads
+from tests.support import project
+
+ROWS = [
+    project(
+        1,
+        "Clean water",
+        "Wells, pumps & “quoted” text",
+        timeline=[{"date": "2024-01-01", "event": "Launched"}],
+        impact_stats={"families": 120},
+        funding_percentage=42.5,
+    ),
+    project(2, "School books", supporters=None, verified=True),
+]
+
+
+def store(rows=ROWS, ids=(1, 2)):
+    return CharityMetadataStore(np.array(ids, dtype=np.int64), {row["id"]: row for row in rows})
+
+
+def test_result_json_is_the_row_plus_confidence():
+    result = json.loads(store().result_json(0, 0.875))
+
+    assert list(result) == list(RESULT_FIELDS) + ["confidence"]
+    expected = {field: ROWS[0].get(field) for field in RESULT_FIELDS}
+    assert result == {**expected, "confidence": 0.875}
+
+
+def test_nested_fields_and_missing_values_round_trip():
+    results = loads(store().page_json([1, 0], [0.5, 0.25]))
+
+    assert [r["id"] for r in results] == [2, 1]
+    assert results[1]["timeline"] == ROWS[0]["timeline"]
+    assert results[1]["impact_stats"] == {"families": 120}
+    assert results[0]["supporters"] is None
+    assert results[0]["verified"] is True
+    assert results[0]["overview"] is None
+
+
+def test_numeric_columns_serialize_as_plain_numbers():
+    first, second = loads(store().page_json([0, 1], [0.5, 0.5]))
+    assert first["id"] == 1 and type(first["id"]) is int
+    assert first["funding_percentage"] == 42.5
+    # A missing value in the column still comes out as null, not NaN
+    assert second["supporters"] is None
+    assert first["supporters"] == 1
+
+
+def test_array_round_trip_serves_the_same_bytes():
+    metadata = store(ids=(1, 2, 3))
+    restored = CharityMetadataStore.from_arrays(metadata.to_arrays())
+
+    assert restored.size == 3
+    assert restored.fingerprint == metadata.fingerprint
+    assert restored.present.tolist() == [True, True, False]
+    assert restored.page_json([1, 0], [0.5, 0.25]) == metadata.page_json([1, 0], [0.5, 0.25])
+
+
+def test_result_dict_is_a_fresh_copy():
+    metadata = store()
+    first = metadata.result_dict(0, 0.5)
+    first["title"] = "changed"
+    assert metadata.result_dict(0, 0.5)["title"] == "Clean water"
+
+
+def test_empty_page_and_rows_without_metadata():
+    metadata = store(ids=(1, 2, 3))
+    assert metadata.page_json([], []) == b"[]"
+    assert metadata.present.tolist() == [True, True, False]
+
+
+def test_fingerprint_follows_served_fields():
+    base = store().fingerprint
+    assert store().fingerprint == base
+
+    edited = [dict(ROWS[0], supporters=999), ROWS[1]]
+    assert store(edited).fingerprint != base
+    assert store(ids=(2, 1)).fingerprint != base
+
+
+def test_dumps_matches_json():
+    value = {"a": [1, 2.5, None], "b": "ünïcode"}
+    assert json.loads(dumps(value)) == value
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import re
+import sys
+import types
+
+import pytest
+
+from search import search_charities
+from search.passages import PassageConfig
+from search.rerank import CrossEncoderReranker
+from tests.support import project
+
+ROWS = [
+    project(1, "Clean water wells", "Hand pumps for villages"),
+    project(2, "Water tanks", "Rain tanks for schools"),
+    project(3, "Water filters", "Filters for clinics"),
+    project(4, "Clean rivers", "River cleanups"),
+    project(5, "School books", "Textbooks for pupils"),
+    project(6, "Orphan meals", "Daily meals"),
+]
+
+
+class WordOverlapModel:
+    """CrossEncoder stand-in scoring a pair by the query words the text contains."""
+
+    def __init__(self, model_name, max_length=256):
+        self.pairs = []
+
+    def predict(self, pairs, **kwargs):
+        self.pairs.append(list(pairs))
+        return [
+            len(set(re.findall(r"\w+", query.lower())) & set(re.findall(r"\w+", text.lower())))
+            for query, text in pairs
+        ]
+
+
+@pytest.fixture
+def reranker(monkeypatch):
+    module = types.ModuleType("sentence_transformers")
+    module.CrossEncoder = WordOverlapModel
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+    return CrossEncoderReranker("word-overlap", top_n=4)
+
+
+def ids(page):
+    return [result["id"] for result in page]
+
+
+def test_pages_share_one_fixed_head_scored_once(search_stack, reranker):
+    search_stack(ROWS, reranker=reranker)
+    query = "clean water pumps"
+
+    full = ids(search_charities.search_charities(query, k=6))
+    pages = [ids(search_charities.search_charities(query, k=2, offset=n)) for n in (0, 2, 4)]
+
+    assert sum(pages, []) == full
+    assert len(set(full)) == 6
+    # Project 1 matches every query word, so the cross-encoder puts it first
+    assert full[0] == 1
+    # The first search scored the head; every later page reused its order
+    assert len(reranker.model.pairs) == 1
+    assert len(reranker.model.pairs[0]) == reranker.top_n
+
+
+def test_order_cache_follows_the_query_and_filters(search_stack, reranker):
+    search_stack(ROWS, reranker=reranker)
+
+    search_charities.search_charities("clean water", k=2)
+    search_charities.search_charities("Clean  Water", k=2, offset=2)
+    assert len(reranker.model.pairs) == 1
+
+    search_charities.search_charities("clean water", k=2, filters={"location": "Kuala Lumpur"})
+    search_charities.search_charities("school books", k=2)
+    assert len(reranker.model.pairs) == 3
+
+
+def test_cross_encoder_reads_the_matching_passage(search_stack, reranker, monkeypatch):
+    config = PassageConfig(chunk_words=4, overlap_words=0)
+    monkeypatch.setattr(search_charities, "PASSAGE_CONFIG", config)
+    rows = [
+        project(1, "Village aid", "Seeds for farmers in dry seasons and then solar water pumps"),
+        project(2, "Town aid", "Books for pupils"),
+    ]
+    search_stack(rows, passage_config=config, reranker=reranker)
+
+    search_charities.search_charities("solar water pumps", k=2)
+
+    texts = [text for _, text in reranker.model.pairs[0]]
+    assert "Village aid: solar water pumps" in texts
+    assert not any("Seeds" in text for text in texts)
+
+
+def test_fallback_ranking_has_its_own_key_and_is_not_cached(search_stack, monkeypatch):
+    search_stack(ROWS, passage_config=PassageConfig())
+    job = search_charities.SearchJob("clean water", k=2)
+    preferred = search_charities.search_result_key(job)
+
+    body, key = asyncio.run(search_charities.cached_search(job))
+    assert key == preferred
+    assert search_charities.result_cache.stats()["size"] == 1
+
+    search_charities.result_cache.clear()
+    monkeypatch.setattr(search_charities.passage_budget, "items_within", lambda wanted: 0)
+    body, key = asyncio.run(search_charities.cached_search(job))
+
+    assert key == search_charities.search_result_key(job, "vector") != preferred
+    assert search_charities.result_cache.stats()["size"] == 0
+    assert len(json.loads(body)) == 2
@@ -0,0 +1,120 @@
+import threading
+
+import pytest
+
+from search.batcher import SearchJob
+from search.result_cache import (
+    KEY_PREFIX,
+    MemoryResultCache,
+    RedisResultCache,
+    result_cache_key,
+)
+
+
+@pytest.fixture(params=["memory", "redis"])
+def cache(request):
+    if request.param == "memory":
+        return MemoryResultCache()
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisResultCache(fakeredis.FakeRedis(), ttl_seconds=60)
+
+
+def test_put_then_get_is_a_hit(cache):
+    assert cache.get("search:a") is None
+    cache.put("search:a", b"[1]")
+
+    assert cache.get("search:a") == b"[1]"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["errors"]) == (1, 1, 0)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_clear_drops_every_page(cache):
+    for n in range(7):
+        cache.put(f"{KEY_PREFIX}{n}", b"[]")
+    cache.clear()
+
+    assert all(cache.get(f"{KEY_PREFIX}{n}") is None for n in range(7))
+
+
+def test_redis_clear_leaves_other_keys_and_deletes_in_chunks():
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeRedis()
+    cache = RedisResultCache(client)
+    for n in range(5):
+        cache.put(f"{KEY_PREFIX}{n}", b"[]")
+    client.set("session:1", b"keep")
+
+    cache.clear(chunk_size=2)
+
+    assert client.keys(f"{KEY_PREFIX}*") == []
+    assert client.get("session:1") == b"keep"
+
+
+def test_redis_pages_expire_after_the_ttl():
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeRedis()
+    RedisResultCache(client, ttl_seconds=60).put("search:a", b"[]")
+    assert 0 < client.ttl("search:a") <= 60
+
+
+def test_redis_errors_count_as_misses():
+    class Down:
+        def get(self, key):
+            raise ConnectionError("down")
+
+        def set(self, key, value, ex=None):
+            raise ConnectionError("down")
+
+    cache = RedisResultCache(Down())
+    cache.put("search:a", b"[]")
+    assert cache.get("search:a") is None
+    assert cache.stats()["errors"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_memory_cache_evicts_least_recently_used_by_bytes():
+    cache = MemoryResultCache(max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    cache.get("a")
+    cache.put("c", b"1234")
+
+    # "b" was the least recently used, and 12 bytes don't fit in 10
+    assert cache.get("b") is None
+    assert cache.get("a") == cache.get("c") == b"1234"
+    assert cache.stats()["bytes"] == 8
+    assert cache.stats()["evictions"] == 1
+
+    cache.put("huge", b"x" * 11)
+    assert cache.get("huge") is None
+    assert cache.stats()["size"] == 2
+
+
+def test_stats_stay_exact_under_concurrent_lookups(cache):
+    cache.put("search:hit", b"[]")
+
+    def lookups():
+        for _ in range(500):
+            cache.get("search:hit")
+            cache.get("search:miss")
+
+    threads = [threading.Thread(target=lookups) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2000, 2000)
+
+
+def test_key_follows_snapshot_token_and_normalized_request():
+    filters = {"location": "Kelantan"}
+    job = SearchJob("Clean  Water", k=5, filters=filters)
+
+    key = result_cache_key("tag.aaaa", job)
+    assert key.startswith(f"{KEY_PREFIX}tag.aaaa:")
+    assert result_cache_key("tag.aaaa", SearchJob("clean water", k=5, filters=filters)) == key
+    assert result_cache_key("tag.bbbb", job) != key
+    assert result_cache_key("tag.aaaa", SearchJob("Clean  Water", k=5, offset=5)) != key
@@ -0,0 +1,59 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from search import search_charities
+from tests.support import project
+
+ROWS = [
+    project(1, "Clean water wells", "Wells for villages without clean water"),
+    project(2, "School books", "Textbooks for rural schools"),
+]
+
+
+@pytest.fixture
+def api(search_stack, monkeypatch):
+    manager = search_stack(ROWS)
+    # The lifespan starts and stops the batcher main imported, so hand it the test one
+    monkeypatch.setattr(main, "search_batcher", search_charities.search_batcher)
+    with TestClient(main.app) as client:
+        yield client, manager
+
+
+def search(client, etag=None, **body):
+    headers = {"If-None-Match": etag} if etag else {}
+    return client.post("/search", json={"query": "clean water", **body}, headers=headers)
+
+
+def test_matching_etag_gets_a_304_without_searching(api, monkeypatch):
+    client, _ = api
+    first = search(client)
+    assert first.status_code == 200
+    assert first.json()[0]["id"] == 1
+    etag = first.headers["ETag"]
+
+    async def no_search(*args, **kwargs):
+        raise AssertionError("a 304 must not run the search")
+
+    monkeypatch.setattr(main, "cached_search", no_search)
+    revalidated = search(client, etag=etag)
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == etag
+    assert revalidated.content == b""
+    assert search(client, etag=f"W/{etag}, \"other\"").status_code == 304
+
+
+def test_etag_follows_the_request_and_the_catalogue(api):
+    client, manager = api
+    etag = search(client).headers["ETag"]
+
+    other_page = search(client, etag=etag, offset=1)
+    assert other_page.status_code == 200
+    assert other_page.headers["ETag"] != etag
+
+    manager.fetch_pages.rows[1] = project(1, "Clean water wells", "Now with solar pumps")
+    manager.refresh()
+    refreshed = search(client, etag=etag)
+    assert refreshed.status_code == 200
+    assert refreshed.headers["ETag"] != etag
+    assert "solar" in refreshed.json()[0]["description"]
@@ -178,6 +178,8 @@ export function CharityChat() {
 
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const chatContainerRef = useRef<HTMLDivElement>(null);
+  // Keeps this conversation's cached bot replies apart from other users'
+  const sessionIdRef = useRef<string>(crypto.randomUUID());
 
   // Fetch current ETH price
   const fetchEthPrice = async () => {
@@ -328,7 +330,11 @@ export function CharityChat() {
       const response = await fetch(CHAT_ENDPOINT, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ message, history }),
+        body: JSON.stringify({
+          message,
+          history,
+          session_id: sessionIdRef.current,
+        }),
       });
 
       if (!response.ok) {